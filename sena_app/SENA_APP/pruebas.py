@@ -0,0 +1,52 @@
+"""Utilidades compartidas por las pruebas de las aplicaciones"""
+import threading
+import time
+from django.db import OperationalError, connections
+
+# Reintentos por hilo cuando SQLite en memoria reporta la tabla bloqueada
+INTENTOS_BLOQUEO = 100
+
+# Segundos que un hilo espera a los demás en la barrera
+ESPERA_BARRERA = 10
+
+
+def competir(accion, hilos, preparar=None, intentos=INTENTOS_BLOQUEO):
+    """
+    Ejecuta accion(dato) en `hilos` hilos que arrancan a la vez tras una
+    barrera. Cada hilo obtiene su dato con preparar(número de hilo) antes
+    de la barrera (sin preparar, el dato es el número de hilo).
+
+    Un OperationalError (tabla bloqueada por otro hilo) se reintenta hasta
+    `intentos` veces; si se agotan, o si un hilo falla por otra causa, se
+    lanza AssertionError en el hilo que llama. Devuelve los resultados en
+    el orden en que terminaron los hilos.
+    """
+    barrera = threading.Barrier(hilos, timeout=ESPERA_BARRERA)
+    resultados = []
+    fallos = []
+
+    def ejecutar(numero):
+        try:
+            dato = preparar(numero) if preparar else numero
+            barrera.wait()
+            for _ in range(intentos):
+                try:
+                    resultados.append(accion(dato))
+                    return
+                except OperationalError:
+                    time.sleep(0.01)
+            fallos.append(f'hilo {numero}: tabla bloqueada tras {intentos} intentos')
+        except Exception as e:
+            barrera.abort()
+            fallos.append(f'hilo {numero}: {e!r}')
+        finally:
+            connections.close_all()
+
+    trabajadores = [threading.Thread(target=ejecutar, args=(numero,)) for numero in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    if fallos:
+        raise AssertionError('\n'.join(fallos))
+    return resultados
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -84,6 +85,24 @@ DATABASES = {
 }
 
 
+# Caché compartida por todos los procesos del servidor, para el listado de
+# empresas y las estadísticas de notas. Ambos se invalidan incrementando una
+# versión guardada en la propia caché: con una caché por proceso
+# (LocMemCache, la de Django si no se configura otra) los demás trabajadores
+# seguirían sirviendo datos viejos. Con SENA_CACHE_URL (p. ej.
+# redis://localhost:6379/0, requiere el paquete redis) se usa Redis; sin
+# ella no se guarda nada en caché. Si se configura CACHES con otro backend
+# compartido (Memcached, base de datos), CACHE_COMPARTIDA debe ser True.
+SENA_CACHE_URL = os.environ.get("SENA_CACHE_URL", "")
+if SENA_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": SENA_CACHE_URL,
+        }
+    }
+CACHE_COMPARTIDA = bool(SENA_CACHE_URL)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,3 +143,7 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Días sin confirmar tras los cuales expirar_asignaciones cancela una
+# asignación PENDIENTE o ASIGNADO
+ETP_DIAS_EXPIRACION_ASIGNACION = 30
@@ -109,10 +109,9 @@ class CursoAdmin(admin.ModelAdmin):
     )
 
     def cupos_info(self, obj):
-        ocupados = obj.aprendices.count()
-        disponibles = obj.cupos_disponibles()
+        # Lee el contador Curso.inscritos: ninguna consulta extra por fila
         porcentaje = obj.porcentaje_ocupacion()
-        return f"{ocupados}/{obj.cupos_maximos} ({porcentaje:.1f}%)"
+        return f"{obj.inscritos}/{obj.cupos_maximos} ({porcentaje:.1f}%)"
     cupos_info.short_description = 'Ocupación'
 
 
@@ -0,0 +1,113 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from django.db import transaction
+from .estadisticas_notas import invalidar_estadisticas
+from .models import AprendizCurso, Curso
+
+NOTA_MINIMA = Decimal('0.0')
+NOTA_MAXIMA = Decimal('5.0')
+
+ESTADOS_VALIDOS = {codigo for codigo, _ in AprendizCurso.ESTADO_CHOICES}
+
+
+def limpiar_nota(valor):
+    """
+    '4,25' -> Decimal('4.3'); vacío -> None. Lanza ValueError si no es un
+    número entre NOTA_MINIMA y NOTA_MAXIMA.
+    """
+    if valor is None or str(valor).strip() == '':
+        return None
+    try:
+        nota = Decimal(str(valor).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError('La nota debe ser un número.')
+    if not nota.is_finite() or not NOTA_MINIMA <= nota <= NOTA_MAXIMA:
+        raise ValueError(f'La nota debe estar entre {NOTA_MINIMA} y {NOTA_MAXIMA}.')
+    return nota.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+
+def registrar_notas(curso, cambios):
+    """
+    Aplica la planilla de notas de un curso en una transacción.
+
+    cambios: {id de AprendizCurso: {'nota_final': valor, 'estado': código}};
+    las claves que falten conservan el valor actual. Solo se escriben las
+    inscripciones que cambian, con un bulk_update(['nota_final', 'estado']).
+
+    bulk_update no pasa por save(): los cupos de Curso.inscritos se ajustan
+    aquí según los cambios de estado (si no alcanzan los cupos para los
+    que vuelven a ocupar uno, esas filas se rechazan) y se invalidan las
+    estadísticas del curso.
+
+    Devuelve {'actualizadas': n, 'errores': [{'inscripcion_id', 'aprendiz',
+    'mensaje'}]}.
+    """
+    errores = []
+    with transaction.atomic():
+        inscripciones = {
+            inscripcion.id: inscripcion
+            for inscripcion in AprendizCurso.objects.filter(curso=curso, id__in=list(cambios))
+            .select_related('aprendiz')
+            .only('id', 'curso_id', 'estado', 'nota_final', 'aprendiz__nombre', 'aprendiz__apellido')
+        }
+
+        modificadas = []
+        entran = []
+        salen = 0
+        for inscripcion_id, valores in cambios.items():
+            inscripcion = inscripciones.get(inscripcion_id)
+            if inscripcion is None:
+                errores.append({
+                    'inscripcion_id': inscripcion_id,
+                    'aprendiz': '',
+                    'mensaje': 'La inscripción no pertenece al curso'
+                })
+                continue
+
+            try:
+                nota = limpiar_nota(valores['nota_final']) if 'nota_final' in valores else inscripcion.nota_final
+                estado = valores.get('estado') or inscripcion.estado
+                if estado not in ESTADOS_VALIDOS:
+                    raise ValueError(f'Estado no válido: {estado}')
+            except ValueError as e:
+                errores.append({
+                    'inscripcion_id': inscripcion_id,
+                    'aprendiz': inscripcion.aprendiz.nombre_completo(),
+                    'mensaje': str(e)
+                })
+                continue
+
+            if nota == inscripcion.nota_final and estado == inscripcion.estado:
+                continue
+            ocupaba = inscripcion.estado in AprendizCurso.ESTADOS_CON_CUPO
+            ocupa = estado in AprendizCurso.ESTADOS_CON_CUPO
+            inscripcion.nota_final = nota
+            inscripcion.estado = estado
+            if ocupa and not ocupaba:
+                entran.append(inscripcion)
+                continue
+            if ocupaba and not ocupa:
+                salen += 1
+            modificadas.append(inscripcion)
+
+        # Reingresos (p. ej. un desertor que vuelve): necesitan cupo
+        neto = len(entran) - salen
+        if neto > 0 and not Curso.reservar_cupos(curso.pk, neto):
+            errores.extend(
+                {
+                    'inscripcion_id': inscripcion.id,
+                    'aprendiz': inscripcion.aprendiz.nombre_completo(),
+                    'mensaje': 'El curso no tiene cupos disponibles'
+                }
+                for inscripcion in entran
+            )
+            entran = []
+            neto = -salen
+        if neto < 0:
+            Curso.liberar_cupos(curso.pk, -neto)
+
+        modificadas += entran
+        AprendizCurso.objects.bulk_update(modificadas, ['nota_final', 'estado'], batch_size=500)
+        if modificadas:
+            invalidar_estadisticas([curso.pk])
+
+    return {'actualizadas': len(modificadas), 'errores': errores}
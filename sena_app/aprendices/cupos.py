@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import AprendizCurso, Curso
+
+# Cursos actualizados por cada UPDATE al conciliar
+TAMANO_LOTE_CONCILIACION = 500
+
+
+def inscritos_reales():
+    """{curso_id: inscripciones que ocupan cupo} contadas en AprendizCurso"""
+    return dict(
+        AprendizCurso.objects.filter(estado__in=AprendizCurso.ESTADOS_CON_CUPO)
+        .order_by()
+        .values_list('curso_id')
+        .annotate(cantidad=Count('id'))
+    )
+
+
+def _inscritos_contados():
+    """Expresión con las inscripciones que ocupan cupo en cada curso"""
+    return Coalesce(
+        Subquery(
+            AprendizCurso.objects.filter(curso=OuterRef('pk'), estado__in=AprendizCurso.ESTADOS_CON_CUPO)
+            .order_by()
+            .values('curso')
+            .annotate(cantidad=Count('id'))
+            .values('cantidad')
+        ),
+        0
+    )
+
+
+def conciliar_cupos(aplicar=True):
+    """
+    Compara Curso.inscritos con las inscripciones y corrige los cursos
+    distintos. Devuelve las diferencias como tuplas (curso_id, codigo,
+    guardado, real).
+
+    La corrección no escribe los valores contados en la comparación: por
+    lotes, bloquea las filas de los cursos (las inscripciones reservan y
+    liberan cupos con un UPDATE sobre esas filas, así que esperan) y las
+    recalcula con un único UPDATE con subconsulta. Una inscripción
+    confirmada entre la comparación y la corrección no se pierde.
+    """
+    reales = inscritos_reales()
+    diferencias = []
+    for curso in Curso.objects.order_by('id').only('id', 'codigo', 'inscritos').iterator():
+        real = reales.get(curso.id, 0)
+        if curso.inscritos != real:
+            diferencias.append((curso.id, curso.codigo, curso.inscritos, real))
+
+    if aplicar:
+        ids = [curso_id for curso_id, *_ in diferencias]
+        for inicio in range(0, len(ids), TAMANO_LOTE_CONCILIACION):
+            lote = ids[inicio:inicio + TAMANO_LOTE_CONCILIACION]
+            with transaction.atomic():
+                list(Curso.objects.select_for_update().filter(pk__in=lote).values_list('id', flat=True))
+                Curso.objects.filter(pk__in=lote).update(inscritos=_inscritos_contados())
+    return diferencias
@@ -0,0 +1,170 @@
+import time
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import AprendizCurso, Curso
+
+# Nota mínima para aprobar (escala de 0.0 a 5.0)
+NOTA_APROBACION = 3.0
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Segundos que se conserva un resultado en caché; se invalida antes cada
+# vez que cambian las inscripciones o las notas del curso
+DURACION_CACHE_ESTADISTICAS = 3600
+
+_PREFIJO = 'aprendices:estadisticas_notas'
+
+ESTADOS = [codigo for codigo, _ in AprendizCurso.ESTADO_CHOICES]
+
+
+def _clave_version(tipo, identificador):
+    return f'{_PREFIJO}:version:{tipo}:{identificador}'
+
+
+def _version(tipo, identificador):
+    """
+    Versión vigente de las estadísticas de un curso o programa; forma
+    parte de la clave, así que incrementarla las invalida. Un cálculo que
+    empezó antes de la invalidación guarda su resultado bajo la versión
+    anterior, que ya nadie consulta. Si la clave se pierde se reinicia
+    con la hora para no reutilizar versiones viejas.
+    """
+    clave = _clave_version(tipo, identificador)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, time.time_ns(), None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar_versiones(claves):
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.add(clave, time.time_ns(), None)
+
+
+def _clave(tipo, identificador):
+    return f'{_PREFIJO}:{tipo}:{identificador}:{_version(tipo, identificador)}'
+
+
+def invalidar_estadisticas(curso_ids, programa_ids=None):
+    """
+    Invalida al confirmar la transacción en curso las estadísticas de los
+    cursos y de sus programas. Si no se indican los programas se buscan
+    ahora, con una consulta.
+    """
+    curso_ids = set(curso_ids)
+    if programa_ids is None:
+        programa_ids = Curso.objects.filter(pk__in=curso_ids).order_by().values_list('programa_id', flat=True)
+    programa_ids = set(programa_ids)
+    if not curso_ids and not programa_ids:
+        return
+    claves = [_clave_version('curso', curso_id) for curso_id in curso_ids]
+    claves += [_clave_version('programa', programa_id) for programa_id in programa_ids]
+    transaction.on_commit(lambda: _incrementar_versiones(claves))
+
+
+def _resumen(estados, notas):
+    """
+    Estadísticas de un grupo de inscripciones a partir de los arreglos
+    de códigos de estado (índices de ESTADOS) y notas (NaN sin nota).
+    """
+    total = len(estados)
+    conteos = np.bincount(estados, minlength=len(ESTADOS))
+    calificadas = notas[~np.isnan(notas)]
+
+    resumen = {
+        'inscritos': total,
+        'por_estado': {estado: int(cantidad) for estado, cantidad in zip(ESTADOS, conteos)},
+        'tasa_desercion': round(float(conteos[ESTADOS.index('DES')] / total), 4) if total else None,
+        'calificados': len(calificadas),
+        'media': None,
+        'desviacion': None,
+        'minima': None,
+        'maxima': None,
+        'percentiles': {},
+        'tasa_aprobacion': None,
+    }
+    if len(calificadas):
+        resumen.update({
+            'media': round(float(calificadas.mean()), 2),
+            'desviacion': round(float(calificadas.std()), 2),
+            'minima': float(calificadas.min()),
+            'maxima': float(calificadas.max()),
+            'percentiles': {
+                f'p{percentil}': round(float(valor), 2)
+                for percentil, valor in zip(PERCENTILES, np.percentile(calificadas, PERCENTILES))
+            },
+            'tasa_aprobacion': round(float((calificadas >= NOTA_APROBACION).mean()), 4),
+        })
+    return resumen
+
+
+def _arreglos(inscripciones):
+    """
+    Una sola consulta (curso_id, estado, nota_final) convertida en tres
+    arreglos de NumPy: cursos, códigos de estado y notas (NaN sin nota).
+    """
+    filas = list(inscripciones.order_by().values_list('curso_id', 'estado', 'nota_final'))
+    codigos = {estado: indice for indice, estado in enumerate(ESTADOS)}
+    cursos = np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas))
+    estados = np.fromiter((codigos[fila[1]] for fila in filas), dtype=np.int64, count=len(filas))
+    notas = np.fromiter(
+        (np.nan if fila[2] is None else float(fila[2]) for fila in filas),
+        dtype=np.float64,
+        count=len(filas)
+    )
+    return cursos, estados, notas
+
+
+def _cacheado(calcular, tipo, identificador):
+    """
+    calcular() guardado en caché bajo la versión vigente del curso o
+    programa. Solo con una caché compartida por todos los procesos
+    (CACHE_COMPARTIDA en settings): con una por proceso, las
+    invalidaciones de un trabajador no llegarían a los demás, así que se
+    calcula en cada llamada.
+    """
+    if not getattr(settings, 'CACHE_COMPARTIDA', False):
+        return calcular()
+    clave = _clave(tipo, identificador)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, DURACION_CACHE_ESTADISTICAS)
+    return datos
+
+
+def estadisticas_curso(curso_id):
+    """
+    Media, desviación, percentiles y tasa de aprobación de las notas
+    finales del curso, con el conteo por estado y la tasa de deserción.
+    """
+    def calcular():
+        _, estados, notas = _arreglos(AprendizCurso.objects.filter(curso_id=curso_id))
+        return {'curso_id': curso_id, **_resumen(estados, notas)}
+
+    return _cacheado(calcular, 'curso', curso_id)
+
+
+def estadisticas_programa(programa_id):
+    """
+    Las estadísticas de estadisticas_curso sobre todas las inscripciones
+    del programa, más el resumen de cada uno de sus cursos calculado
+    sobre los mismos arreglos (sin una consulta por curso).
+    """
+    def calcular():
+        cursos, estados, notas = _arreglos(AprendizCurso.objects.filter(curso__programa_id=programa_id))
+        resumen = {'programa_id': programa_id, **_resumen(estados, notas), 'cursos': []}
+
+        orden = np.argsort(cursos, kind='stable')
+        ids, inicios = np.unique(cursos[orden], return_index=True)
+        for curso_id, indices in zip(ids.tolist(), np.split(orden, inicios[1:])):
+            resumen['cursos'].append({'curso_id': curso_id, **_resumen(estados[indices], notas[indices])})
+        return resumen
+
+    return _cacheado(calcular, 'programa', programa_id)
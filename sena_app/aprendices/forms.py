@@ -1,5 +1,15 @@
 from django import forms
-from .models import Aprendiz
+from .models import Aprendiz, AprendizCurso
+
+def validar_documento(documento):
+    if not documento.isdigit():
+        raise forms.ValidationError("El documento debe contener solo números")
+
+
+def validar_telefono(telefono):
+    if telefono and not telefono.isdigit():
+        raise forms.ValidationError("El teléfono debe contener solo números.")
+
 
 class AprendizForm(forms.Form):
     documento_identidad = forms.CharField(max_length=20, label="Documento de Identidad")
@@ -23,14 +33,12 @@ class AprendizForm(forms.Form):
     
     def clean_documento_identidad(self):
         documento = self.cleaned_data['documento_identidad']
-        if not documento.isdigit():
-            raise forms.ValidationError("El documento debe contener solo números")
+        validar_documento(documento)
         return documento
     
     def clean_telefono(self):
         telefono = self.cleaned_data.get('telefono')
-        if telefono and not telefono.isdigit():
-            raise forms.ValidationError("El teléfono debe contener solo números.")
+        validar_telefono(telefono)
         return telefono
     
     def save(self):
@@ -42,4 +50,40 @@ class AprendizForm(forms.Form):
             correo=self.cleaned_data.get('correo'),
             fecha_nacimiento=self.cleaned_data['fecha_nacimiento'],
             ciudad=self.cleaned_data.get('ciudad')
-        )
\ No newline at end of file
+        )
+
+
+class InscripcionMasivaForm(forms.Form):
+    documentos = forms.CharField(
+        required=False,
+        label="Documentos",
+        help_text="Documentos de identidad separados por comas, espacios o saltos de línea",
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 6})
+    )
+    archivo = forms.FileField(
+        required=False,
+        label="Archivo CSV",
+        help_text="CSV con una columna documento_identidad",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+    estado = forms.ChoiceField(
+        choices=AprendizCurso.ESTADO_CHOICES,
+        initial='INS',
+        label="Estado en el Curso",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("documentos") and not cleaned_data.get("archivo"):
+            raise forms.ValidationError("Escriba los documentos o adjunte un archivo CSV")
+        return cleaned_data
+
+
+class ImportarAprendicesForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo",
+        help_text="CSV o JSON-lines (.jsonl) con documento_identidad, nombre, apellido, telefono, "
+                  "correo, fecha_nacimiento y ciudad",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'})
+    )
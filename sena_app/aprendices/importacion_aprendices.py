@@ -0,0 +1,231 @@
+import csv
+import json
+import time
+import unicodedata
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .forms import AprendizForm, validar_documento, validar_telefono
+from .models import Aprendiz
+
+# Aprendices insertados por cada INSERT y por cada punto de control
+TAMANO_LOTE_IMPORTACION = 2000
+
+COLUMNAS_APRENDIZ = [
+    'documento_identidad', 'nombre', 'apellido', 'telefono', 'correo', 'fecha_nacimiento', 'ciudad'
+]
+
+# Reglas adicionales de AprendizForm (clean_documento_identidad, clean_telefono)
+VALIDADORES = {
+    'documento_identidad': validar_documento,
+    'telefono': validar_telefono,
+}
+
+# Columnas con pocos valores distintos: se valida cada valor una sola vez
+# por importación (la fecha es la regla más costosa de AprendizForm)
+COLUMNAS_REPETIDAS = ('fecha_nacimiento', 'ciudad')
+
+FORMATOS = ('csv', 'jsonl')
+
+
+def _normalizar_encabezado(encabezado):
+    """'Teléfono ' -> 'telefono': sin tildes, espacios ni mayúsculas"""
+    descompuesto = unicodedata.normalize('NFKD', (encabezado or '').strip().lower())
+    return ''.join(letra for letra in descompuesto if not unicodedata.combining(letra))
+
+
+def formato_archivo(nombre):
+    """'jsonl' para .jsonl/.ndjson; 'csv' para cualquier otro nombre"""
+    return 'jsonl' if nombre.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def _validar_columna(columna, valor):
+    """Valor limpio de la columna; lanza ValidationError"""
+    limpio = AprendizForm.base_fields[columna].clean(valor)
+    if columna in VALIDADORES:
+        VALIDADORES[columna](limpio)
+    return limpio
+
+
+def validar_aprendiz(datos, memoria=None):
+    """
+    Aplica a una fila las reglas de AprendizForm (obligatorios, longitudes,
+    correo, fecha y solo números en documento y teléfono) sin construir un
+    formulario por fila ni consultar la base de datos. Devuelve (datos
+    limpios, errores).
+
+    `memoria` es un diccionario compartido entre filas donde se guarda el
+    resultado de las COLUMNAS_REPETIDAS por valor recibido.
+    """
+    limpios = {}
+    errores = []
+    for columna in COLUMNAS_APRENDIZ:
+        valor = datos.get(columna)
+        clave = (columna, valor)
+        try:
+            if memoria is not None and columna in COLUMNAS_REPETIDAS:
+                if clave not in memoria:
+                    try:
+                        memoria[clave] = _validar_columna(columna, valor)
+                    except ValidationError as e:
+                        memoria[clave] = e
+                if isinstance(memoria[clave], ValidationError):
+                    raise memoria[clave]
+                limpios[columna] = memoria[clave]
+            else:
+                limpios[columna] = _validar_columna(columna, valor)
+        except ValidationError as e:
+            errores.extend(f'{columna}: {mensaje}' for mensaje in e.messages)
+    if 'ciudad' in limpios and not limpios['ciudad']:
+        limpios['ciudad'] = None
+    return limpios, errores
+
+
+def _filas_csv(archivo):
+    """(número de fila, datos) por cada fila del CSV; la fila 1 es el encabezado"""
+    lector = csv.DictReader(archivo)
+    encabezados = {_normalizar_encabezado(nombre): nombre for nombre in lector.fieldnames or []}
+    faltantes = [columna for columna in COLUMNAS_APRENDIZ if columna not in encabezados and columna != 'ciudad']
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    for numero, fila in enumerate(lector, start=2):
+        yield numero, {
+            columna: (fila.get(encabezados[columna]) or '').strip()
+            for columna in COLUMNAS_APRENDIZ if columna in encabezados
+        }
+
+
+def _filas_jsonl(archivo):
+    """(número de línea, datos) por cada objeto JSON; las líneas vacías se omiten"""
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            objeto = json.loads(linea)
+        except ValueError:
+            yield numero, None
+            continue
+        if not isinstance(objeto, dict):
+            yield numero, None
+            continue
+        yield numero, {
+            _normalizar_encabezado(clave): str(valor).strip()
+            for clave, valor in objeto.items() if valor is not None
+        }
+
+
+def _guardar_lote(lote):
+    """
+    Inserta el lote omitiendo los documentos que ya existen (una consulta
+    por lote). Devuelve (creados, existentes).
+
+    Si otro escritor (el formulario u otra importación) crea uno de los
+    documentos entre esa consulta y el INSERT, ignore_conflicts omite la
+    fila en lugar de abortar la importación. Para contarla como existente
+    se releen los documentos insertados: una fila es nuestra si conserva
+    la fecha_actualizacion que bulk_create asignó a la instancia.
+    """
+    with transaction.atomic():
+        existentes = set(
+            Aprendiz.objects.filter(
+                documento_identidad__in=[aprendiz.documento_identidad for aprendiz in lote]
+            ).values_list('documento_identidad', flat=True)
+        )
+        nuevos = {
+            aprendiz.documento_identidad: aprendiz
+            for aprendiz in lote if aprendiz.documento_identidad not in existentes
+        }
+        Aprendiz.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+        creados = sum(
+            1 for documento, fecha in Aprendiz.objects.filter(documento_identidad__in=list(nuevos))
+            .values_list('documento_identidad', 'fecha_actualizacion')
+            if fecha == nuevos[documento].fecha_actualizacion
+        )
+    return creados, len(lote) - creados
+
+
+def importar_aprendices(
+    archivo,
+    formato='csv',
+    tamano_lote=TAMANO_LOTE_IMPORTACION,
+    desde_fila=0,
+    punto_control=None
+):
+    """
+    Lee un CSV o JSON-lines (archivo de texto abierto) con las columnas de
+    COLUMNAS_APRENDIZ y crea los aprendices cuyo documento no exista.
+
+    Las filas se validan con validar_aprendiz y se guardan por lotes de
+    `tamano_lote`, cada uno en su propia transacción. Tras confirmar un
+    lote se llama a punto_control(número de la última fila del lote);
+    para reanudar una importación interrumpida se pasa ese número como
+    `desde_fila` y se omiten las filas anteriores sin validarlas. Un
+    documento repetido dentro del archivo se reporta como error y se
+    conserva la primera aparición.
+
+    Devuelve un diccionario con filas (procesadas en esta ejecución),
+    creados, existentes, errores (lista de {'fila', 'documento',
+    'mensaje'}), ultima_fila y duracion en segundos. Lanza ValueError si
+    el formato no es válido o faltan columnas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (use {' o '.join(FORMATOS)})")
+
+    inicio = time.monotonic()
+    filas = _filas_csv(archivo) if formato == 'csv' else _filas_jsonl(archivo)
+    resultado = {'filas': 0, 'creados': 0, 'existentes': 0, 'errores': [], 'ultima_fila': desde_fila}
+    vistos = {}
+    memoria = {}
+    lote = []
+
+    def guardar(ultima_fila):
+        if lote:
+            creados, existentes = _guardar_lote(lote)
+            resultado['creados'] += creados
+            resultado['existentes'] += existentes
+            lote.clear()
+        resultado['ultima_fila'] = ultima_fila
+        if punto_control:
+            punto_control(ultima_fila)
+
+    numero = desde_fila
+    procesadas_lote = 0
+    for numero, datos in filas:
+        if numero <= desde_fila:
+            continue
+        resultado['filas'] += 1
+        procesadas_lote += 1
+
+        if datos is None:
+            resultado['errores'].append({
+                'fila': numero,
+                'documento': '',
+                'mensaje': 'La línea no es un objeto JSON válido'
+            })
+        else:
+            limpios, errores = validar_aprendiz(datos, memoria)
+            documento = limpios.get('documento_identidad') or datos.get('documento_identidad', '')
+            if errores:
+                resultado['errores'].append({
+                    'fila': numero,
+                    'documento': documento,
+                    'mensaje': '; '.join(errores)
+                })
+            elif documento in vistos:
+                resultado['errores'].append({
+                    'fila': numero,
+                    'documento': documento,
+                    'mensaje': f'Documento repetido en el archivo (ver fila {vistos[documento]})'
+                })
+            else:
+                vistos[documento] = numero
+                lote.append(Aprendiz(**limpios))
+
+        # El punto de control avanza también con lotes de filas rechazadas
+        if procesadas_lote >= tamano_lote:
+            guardar(numero)
+            procesadas_lote = 0
+    if procesadas_lote:
+        guardar(numero)
+
+    resultado['duracion'] = time.monotonic() - inicio
+    return resultado
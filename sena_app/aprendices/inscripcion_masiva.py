@@ -0,0 +1,179 @@
+import csv
+import re
+import unicodedata
+from django.db import IntegrityError, transaction
+from .estadisticas_notas import invalidar_estadisticas
+from .models import Aprendiz, AprendizCurso, Curso
+
+# Máximo de documentos por solicitud de inscripción masiva
+MAXIMO_INSCRIPCION_MASIVA = 5000
+
+# Resultados posibles por fila
+INSCRITO = 'INSCRITO'
+NO_EXISTE = 'NO_EXISTE'
+YA_INSCRITO = 'YA_INSCRITO'
+SIN_CUPO = 'SIN_CUPO'
+REPETIDO = 'REPETIDO'
+
+MENSAJES_RESULTADO = {
+    INSCRITO: 'Inscrito en el curso',
+    NO_EXISTE: 'No hay un aprendiz con ese documento',
+    YA_INSCRITO: 'El aprendiz ya está inscrito en el curso',
+    SIN_CUPO: 'El curso no tiene cupos disponibles',
+    REPETIDO: 'Documento repetido en la lista',
+}
+
+# Encabezados aceptados para la columna de documentos del CSV
+COLUMNAS_DOCUMENTO = ('documento_identidad', 'documento')
+
+
+def separar_documentos(texto):
+    """'123, 456\n789' -> ['123', '456', '789'] (comas, espacios o saltos de línea)"""
+    return [documento for documento in re.split(r'[\s,;]+', texto or '') if documento]
+
+
+def leer_documentos_csv(archivo):
+    """
+    Documentos de un CSV (archivo de texto abierto) con una columna
+    documento_identidad o documento; las filas sin documento se omiten.
+    Lanza ValueError si falta la columna.
+    """
+    lector = csv.DictReader(archivo)
+    columna = None
+    for nombre in lector.fieldnames or []:
+        descompuesto = unicodedata.normalize('NFKD', (nombre or '').strip().lower())
+        if ''.join(letra for letra in descompuesto if not unicodedata.combining(letra)) in COLUMNAS_DOCUMENTO:
+            columna = nombre
+            break
+    if columna is None:
+        raise ValueError('Falta la columna documento_identidad en el archivo.')
+    return [documento for fila in lector if (documento := (fila.get(columna) or '').strip())]
+
+
+def _reservar(curso, cantidad):
+    """
+    Reserva hasta `cantidad` cupos del curso y devuelve cuántos obtuvo.
+    Si otra inscripción ocupa cupos entre la lectura y la reserva, el
+    UPDATE condicionado no aplica y se vuelve a leer lo disponible.
+    """
+    while cantidad:
+        disponibles = Curso.objects.only('cupos_maximos', 'inscritos').get(pk=curso.pk).cupos_disponibles()
+        cantidad = min(cantidad, disponibles)
+        if not cantidad or Curso.reservar_cupos(curso.pk, cantidad):
+            return cantidad
+    return 0
+
+
+def _insertar(curso, candidatos, estado):
+    """
+    Inserta las inscripciones de los candidatos con bulk_create dentro de
+    un savepoint y devuelve los candidatos que no se insertaron. Si otra
+    solicitud inscribió al mismo aprendiz después de la consulta inicial,
+    el INSERT falla completo: se descartan los pares que ya existen y se
+    reintenta con el resto, así las filas insertadas son exactamente las
+    de los candidatos restantes.
+    """
+    pendientes = list(candidatos)
+    omitidos = []
+    while pendientes:
+        try:
+            with transaction.atomic():
+                AprendizCurso.objects.bulk_create(
+                    [
+                        AprendizCurso(aprendiz_id=resultado['aprendiz_id'], curso=curso, estado=estado)
+                        for resultado in pendientes
+                    ],
+                    batch_size=500
+                )
+            break
+        except IntegrityError:
+            existentes = set(
+                AprendizCurso.objects.filter(
+                    curso=curso, aprendiz_id__in=[resultado['aprendiz_id'] for resultado in pendientes]
+                ).values_list('aprendiz_id', flat=True)
+            )
+            if not existentes:
+                raise
+            omitidos += [resultado for resultado in pendientes if resultado['aprendiz_id'] in existentes]
+            pendientes = [resultado for resultado in pendientes if resultado['aprendiz_id'] not in existentes]
+    return omitidos
+
+
+def inscribir_aprendices(curso, documentos, estado='INS'):
+    """
+    Inscribe en el curso a los aprendices de la lista de documentos, en
+    el orden recibido y hasta llenar los cupos, en una sola transacción.
+
+    Los documentos se resuelven con una consulta (in_bulk), las
+    inscripciones existentes con otra y las nuevas se insertan con
+    bulk_create tras reservar sus cupos en Curso.inscritos con un único
+    UPDATE condicionado. Los aprendices que otra solicitud inscribe entre
+    la consulta y la inserción se reportan como YA_INSCRITO y se libera
+    el cupo reservado para ellos.
+
+    Devuelve una lista con un resultado por documento: {'fila' (posición
+    en la lista, desde 1), 'documento', 'aprendiz_id', 'resultado',
+    'mensaje'}. Lanza ValueError si la lista supera
+    MAXIMO_INSCRIPCION_MASIVA.
+    """
+    documentos = [str(documento).strip() for documento in documentos]
+    if len(documentos) > MAXIMO_INSCRIPCION_MASIVA:
+        raise ValueError(
+            f'No se pueden inscribir más de {MAXIMO_INSCRIPCION_MASIVA} aprendices por solicitud.'
+        )
+
+    with transaction.atomic():
+        aprendices = Aprendiz.objects.order_by().only('id', 'documento_identidad').in_bulk(
+            set(documentos), field_name='documento_identidad'
+        )
+        ya_inscritos = set(
+            AprendizCurso.objects.filter(
+                curso=curso, aprendiz_id__in=[aprendiz.id for aprendiz in aprendices.values()]
+            ).values_list('aprendiz_id', flat=True)
+        )
+
+        resultados = []
+        candidatos = []
+        vistos = {}
+        for fila, documento in enumerate(documentos, start=1):
+            aprendiz = aprendices.get(documento)
+            resultado = {
+                'fila': fila,
+                'documento': documento,
+                'aprendiz_id': aprendiz.id if aprendiz else None,
+            }
+            if documento in vistos:
+                resultado['resultado'] = REPETIDO
+                resultado['mensaje'] = f"{MENSAJES_RESULTADO[REPETIDO]} (ver fila {vistos[documento]})"
+            else:
+                vistos[documento] = fila
+                if aprendiz is None:
+                    resultado['resultado'] = NO_EXISTE
+                elif aprendiz.id in ya_inscritos:
+                    resultado['resultado'] = YA_INSCRITO
+                else:
+                    candidatos.append(resultado)
+                    resultado['resultado'] = INSCRITO
+            resultados.append(resultado)
+
+        # Un desertor no ocupa cupo: no hace falta reservar
+        if estado in AprendizCurso.ESTADOS_CON_CUPO:
+            reservados = _reservar(curso, len(candidatos))
+        else:
+            reservados = len(candidatos)
+        for resultado in candidatos[reservados:]:
+            resultado['resultado'] = SIN_CUPO
+
+        # bulk_create no pasa por save(): los cupos ya se reservaron arriba
+        omitidos = _insertar(curso, candidatos[:reservados], estado)
+        for resultado in omitidos:
+            resultado['resultado'] = YA_INSCRITO
+        if omitidos and estado in AprendizCurso.ESTADOS_CON_CUPO:
+            Curso.liberar_cupos(curso.pk, len(omitidos))
+        if reservados > len(omitidos):
+            invalidar_estadisticas([curso.pk])
+
+    for resultado in resultados:
+        if 'mensaje' not in resultado:
+            resultado['mensaje'] = MENSAJES_RESULTADO[resultado['resultado']]
+    return resultados
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from aprendices.importacion_aprendices import (
+    FORMATOS,
+    TAMANO_LOTE_IMPORTACION,
+    formato_archivo,
+    importar_aprendices
+)
+
+
+class Command(BaseCommand):
+    help = "Crea aprendices desde un archivo CSV o JSON-lines, omitiendo los documentos existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archivo',
+            help='CSV o JSON-lines con documento_identidad, nombre, apellido, telefono, correo, '
+                 'fecha_nacimiento y ciudad'
+        )
+        parser.add_argument(
+            '--formato',
+            choices=FORMATOS,
+            help='Formato del archivo (por defecto según la extensión)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_IMPORTACION,
+            help='Filas por lote de inserción y por punto de control'
+        )
+        parser.add_argument(
+            '--punto-control',
+            dest='punto_control',
+            help='Archivo donde se guarda la última fila confirmada; si existe, la importación continúa desde ahí'
+        )
+        parser.add_argument(
+            '--errores',
+            help='Escribe el reporte de filas rechazadas en este CSV'
+        )
+
+    def _leer_punto_control(self, ruta, archivo):
+        if not ruta or not os.path.exists(ruta):
+            return 0
+        with open(ruta, encoding='utf-8') as entrada:
+            punto = json.load(entrada)
+        if punto.get('archivo') != os.path.abspath(archivo):
+            raise CommandError(f"El punto de control {ruta} corresponde a otro archivo: {punto.get('archivo')}")
+        self.stdout.write(f"Reanudando después de la fila {punto['fila']}.")
+        return punto['fila']
+
+    def _guardar_punto_control(self, ruta, archivo, fila):
+        # Se escribe aparte y se reemplaza para no dejar un archivo a medias
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as salida:
+            json.dump({'archivo': os.path.abspath(archivo), 'fila': fila}, salida)
+        os.replace(temporal, ruta)
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        ruta_control = options['punto_control']
+        desde_fila = self._leer_punto_control(ruta_control, archivo)
+        punto_control = None
+        if ruta_control:
+            punto_control = lambda fila: self._guardar_punto_control(ruta_control, archivo, fila)
+
+        try:
+            with open(archivo, encoding='utf-8-sig', newline='') as entrada:
+                resultado = importar_aprendices(
+                    entrada,
+                    options['formato'] or formato_archivo(archivo),
+                    options['lote'],
+                    desde_fila=desde_fila,
+                    punto_control=punto_control
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # Terminada la importación el punto de control ya no hace falta
+        if ruta_control and os.path.exists(ruta_control):
+            os.remove(ruta_control)
+
+        errores = resultado['errores']
+        if options['errores']:
+            with open(options['errores'], 'w', encoding='utf-8', newline='') as salida:
+                escritor = csv.DictWriter(salida, fieldnames=['fila', 'documento', 'mensaje'])
+                escritor.writeheader()
+                escritor.writerows(errores)
+        else:
+            for error in errores:
+                self.stdout.write(f"Fila {error['fila']} (documento {error['documento'] or '-'}): {error['mensaje']}")
+
+        duracion = resultado['duracion']
+        velocidad = resultado['filas'] / duracion if duracion else 0
+        resumen = (
+            f"{resultado['filas']} fila(s) en {duracion:.2f}s ({velocidad:.0f} filas/s): "
+            f"{resultado['creados']} creado(s), {resultado['existentes']} ya existía(n), "
+            f"{len(errores)} con errores."
+        )
+        self.stdout.write(self.style.WARNING(resumen) if errores else self.style.SUCCESS(resumen))
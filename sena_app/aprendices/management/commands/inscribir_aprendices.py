@@ -0,0 +1,73 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from aprendices.inscripcion_masiva import INSCRITO, inscribir_aprendices, leer_documentos_csv
+from aprendices.models import AprendizCurso, Curso
+
+
+class Command(BaseCommand):
+    help = "Inscribe en un curso a los aprendices de un CSV (columna documento_identidad)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('curso', help='Código del curso')
+        parser.add_argument('archivo', nargs='?', help='CSV con una columna documento_identidad')
+        parser.add_argument(
+            '--documento',
+            action='append',
+            dest='documentos',
+            default=[],
+            help='Documento a inscribir (se puede repetir)'
+        )
+        parser.add_argument(
+            '--estado',
+            default='INS',
+            choices=[codigo for codigo, _ in AprendizCurso.ESTADO_CHOICES],
+            help='Estado inicial de las inscripciones'
+        )
+        parser.add_argument(
+            '--reporte',
+            help='Escribe el resultado por fila en este CSV'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            curso = Curso.objects.get(codigo=options['curso'])
+        except Curso.DoesNotExist:
+            raise CommandError(f"No existe el curso {options['curso']}")
+
+        documentos = list(options['documentos'])
+        if options['archivo']:
+            try:
+                with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                    documentos += leer_documentos_csv(archivo)
+            except OSError as e:
+                raise CommandError(f'No se pudo leer el archivo: {e}')
+            except ValueError as e:
+                raise CommandError(str(e))
+        if not documentos:
+            raise CommandError('Indique un archivo o al menos un --documento.')
+
+        inicio = time.monotonic()
+        try:
+            resultados = inscribir_aprendices(curso, documentos, options['estado'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        duracion = time.monotonic() - inicio
+
+        rechazados = [fila for fila in resultados if fila['resultado'] != INSCRITO]
+        if options['reporte']:
+            with open(options['reporte'], 'w', encoding='utf-8', newline='') as salida:
+                escritor = csv.DictWriter(
+                    salida, fieldnames=['fila', 'documento', 'aprendiz_id', 'resultado', 'mensaje']
+                )
+                escritor.writeheader()
+                escritor.writerows(resultados)
+        else:
+            for fila in rechazados:
+                self.stdout.write(f"Fila {fila['fila']} ({fila['documento']}): {fila['mensaje']}")
+
+        resumen = (
+            f"{len(resultados)} documento(s) en {duracion:.2f}s: "
+            f"{len(resultados) - len(rechazados)} inscrito(s), {len(rechazados)} no inscrito(s)."
+        )
+        self.stdout.write(self.style.WARNING(resumen) if rechazados else self.style.SUCCESS(resumen))
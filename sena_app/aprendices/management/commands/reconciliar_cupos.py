@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from aprendices.cupos import conciliar_cupos
+
+
+class Command(BaseCommand):
+    help = "Recalcula Curso.inscritos desde AprendizCurso y reporta las diferencias encontradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta las diferencias sin corregirlas'
+        )
+
+    def handle(self, *args, **options):
+        aplicar = not options['dry_run']
+        inicio = time.monotonic()
+
+        with transaction.atomic():
+            diferencias = conciliar_cupos(aplicar=aplicar)
+
+        for curso_id, codigo, guardado, real in diferencias:
+            self.stdout.write(f'Curso {curso_id} ({codigo}): inscritos guardado={guardado} real={real}')
+
+        duracion = time.monotonic() - inicio
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS(f'Sin diferencias ({duracion:.2f}s).'))
+        elif aplicar:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} curso(s) corregido(s) ({duracion:.2f}s).'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} curso(s) con diferencias; use sin --dry-run para corregir.'
+            ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                fields=["apellido", "nombre"], name="aprendices__apellid_e82ed0_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(fields=["nombre"], name="aprendices__nombre_40b94e_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                fields=["ciudad", "apellido", "nombre"],
+                name="aprendices__ciudad_8b7185_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+ESTADOS_CON_CUPO = ["INS", "ACT", "SUS", "GRA"]
+
+
+def poblar_inscritos(apps, schema_editor):
+    Curso = apps.get_model("aprendices", "Curso")
+    AprendizCurso = apps.get_model("aprendices", "AprendizCurso")
+    inscritos = (
+        AprendizCurso.objects.filter(estado__in=ESTADOS_CON_CUPO)
+        .order_by()
+        .values_list("curso_id")
+        .annotate(cantidad=Count("id"))
+    )
+    Curso.objects.bulk_update(
+        [Curso(id=curso_id, inscritos=cantidad) for curso_id, cantidad in inscritos],
+        ["inscritos"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0003_indices_aprendiz"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="curso",
+            name="inscritos",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Aprendices que ocupan cupo; lo mantiene AprendizCurso (ver reconciliar_cupos)",
+                verbose_name="Inscritos",
+            ),
+        ),
+        migrations.RunPython(poblar_inscritos, migrations.RunPython.noop),
+    ]
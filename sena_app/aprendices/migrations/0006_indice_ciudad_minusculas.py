@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:32
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0005_aprendiz_fecha_actualizacion"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="aprendiz",
+            name="aprendices__ciudad_8b7185_idx",
+        ),
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                django.db.models.functions.text.Lower("ciudad"),
+                models.F("apellido"),
+                models.F("nombre"),
+                name="aprendiz_ciudad_minusculas_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:47
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0006_indice_ciudad_minusculas"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                django.db.models.functions.text.Lower("documento_identidad"),
+                name="aprendiz_documento_min_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                django.db.models.functions.text.Lower("apellido"),
+                name="aprendiz_apellido_min_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="aprendiz",
+            index=models.Index(
+                django.db.models.functions.text.Lower("nombre"),
+                name="aprendiz_nombre_min_idx",
+            ),
+        ),
+    ]
@@ -1,6 +1,14 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Lower
 
 # Create your models here.
+
+# Marca un valor que no se cargó de la base de datos
+_DESCONOCIDO = object()
+
+
 class Aprendiz(models.Model):
     documento_identidad = models.CharField(max_length=20, unique=True)
     nombre = models.CharField(max_length=100)
@@ -10,11 +18,22 @@ class Aprendiz(models.Model):
     fecha_nacimiento = models.DateField()
     ciudad = models.CharField(max_length=100, null=True)
     # programa = models.CharField(max_length=100)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Aprendiz"
         verbose_name_plural = "Aprendices"
         ordering = ['apellido', 'nombre']
+        indexes = [
+            models.Index(fields=['apellido', 'nombre']),
+            models.Index(fields=['nombre']),
+            # Filtro por ciudad sin distinguir mayúsculas, ya en el orden del listado
+            models.Index(Lower('ciudad'), F('apellido'), F('nombre'), name='aprendiz_ciudad_minusculas_idx'),
+            # Búsqueda por prefijo sin distinguir mayúsculas (rangos sobre Lower)
+            models.Index(Lower('documento_identidad'), name='aprendiz_documento_min_idx'),
+            models.Index(Lower('apellido'), name='aprendiz_apellido_min_idx'),
+            models.Index(Lower('nombre'), name='aprendiz_nombre_min_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellido} - {self.documento_identidad}"
@@ -44,6 +63,12 @@ class Curso(models.Model):
     horario = models.CharField(max_length=100, verbose_name="Horario")
     aula = models.CharField(max_length=50, verbose_name="Aula/Ambiente")
     cupos_maximos = models.PositiveIntegerField(verbose_name="Cupos Máximos")
+    inscritos = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Inscritos",
+        help_text="Aprendices que ocupan cupo; lo mantiene AprendizCurso (ver reconciliar_cupos)"
+    )
     estado = models.CharField(max_length=3, choices=ESTADO_CHOICES, default='PRO', verbose_name="Estado del Curso")
     observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones")
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Registro")
@@ -56,14 +81,50 @@ class Curso(models.Model):
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Programa en base de datos: moverlo cambia las estadísticas de ambos (ver signals.py)
+        instancia._programa_guardado = instancia.__dict__.get('programa_id', _DESCONOCIDO)
+        return instancia
+
+    def save(self, *args, **kwargs):
+        # inscritos lo cambian reservar_cupos y liberar_cupos con UPDATE
+        # atómicos: al actualizar no se escribe, porque una instancia leída
+        # antes de una reserva la revertiría
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'inscritos' and campo.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
     def cupos_disponibles(self):
-        return self.cupos_maximos - self.aprendices.count()
+        return max(self.cupos_maximos - self.inscritos, 0)
 
     def porcentaje_ocupacion(self):
         if self.cupos_maximos > 0:
-            return (self.aprendices.count() / self.cupos_maximos) * 100
+            return (self.inscritos / self.cupos_maximos) * 100
         return 0
 
+    @classmethod
+    def reservar_cupos(cls, curso_id, cantidad=1):
+        """
+        Ocupa `cantidad` cupos con un UPDATE condicionado
+        (inscritos + cantidad <= cupos_maximos). La fila queda bloqueada
+        solo durante la transacción que lo ejecuta, así que dos
+        inscripciones concurrentes no pueden exceder el cupo. Devuelve
+        False, sin cambiar nada, si no hay cupos suficientes.
+        """
+        return cls.objects.filter(
+            pk=curso_id, inscritos__lte=F('cupos_maximos') - cantidad
+        ).update(inscritos=F('inscritos') + cantidad) == 1
+
+    @classmethod
+    def liberar_cupos(cls, curso_id, cantidad=1):
+        cls.objects.filter(pk=curso_id).update(inscritos=Greatest(F('inscritos') - cantidad, Value(0)))
+
 
 class InstructorCurso(models.Model):
     instructor = models.ForeignKey('instructores.Instructor', on_delete=models.CASCADE)
@@ -96,6 +157,62 @@ class AprendizCurso(models.Model):
     nota_final = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True, verbose_name="Nota Final")
     observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones")
 
+    # Estados que ocupan cupo en Curso.inscritos (un desertor lo libera)
+    ESTADOS_CON_CUPO = ('INS', 'ACT', 'SUS', 'GRA')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._recordar_cupo_guardado()
+        return instancia
+
+    def _recordar_cupo_guardado(self):
+        # Con curso o estado diferidos (.only/.defer) no se conoce el valor
+        # en base de datos y el save() no toca Curso.inscritos
+        if 'curso_id' in self.__dict__ and 'estado' in self.__dict__:
+            self._cupo_guardado = self.cupo()
+        else:
+            self._cupo_guardado = _DESCONOCIDO
+        self._curso_guardado = self.__dict__.get('curso_id')
+
+    def cupo(self):
+        """curso_id si la inscripción ocupa cupo; si no, None"""
+        return self.curso_id if self.estado in self.ESTADOS_CON_CUPO else None
+
+    def cupo_para_inscritos(self):
+        """Curso cuyo cupo ocupa la inscripción según la base de datos"""
+        cupo = getattr(self, '_cupo_guardado', _DESCONOCIDO)
+        return self.cupo() if cupo is _DESCONOCIDO else cupo
+
+    def clean(self):
+        super().clean()
+        # Aviso temprano para los formularios; el save() es el que reserva
+        anterior = None if self._state.adding else self.cupo_para_inscritos()
+        if self.curso_id and self.cupo() is not None and self.cupo() != anterior:
+            curso = Curso.objects.filter(pk=self.curso_id).only('cupos_maximos', 'inscritos').first()
+            if curso and not curso.cupos_disponibles():
+                raise ValidationError({'curso': 'El curso no tiene cupos disponibles.'})
+
+    def save(self, *args, **kwargs):
+        """
+        Reserva el cupo en el curso nuevo antes de escribir y libera el del
+        anterior, todo en una transacción. Lanza ValidationError si el
+        curso está lleno. Los borrados liberan el cupo con la señal
+        post_delete (ver signals.py); bulk_create y QuerySet.update() no
+        pasan por aquí y se corrigen con reconciliar_cupos.
+        """
+        anterior = None if self._state.adding else getattr(self, '_cupo_guardado', _DESCONOCIDO)
+        actual = self.cupo()
+
+        with transaction.atomic():
+            if anterior is not _DESCONOCIDO and anterior != actual:
+                if actual is not None and not Curso.reservar_cupos(actual):
+                    raise ValidationError({'curso': 'El curso no tiene cupos disponibles.'})
+                if anterior is not None:
+                    Curso.liberar_cupos(anterior)
+            super().save(*args, **kwargs)
+        self._recordar_cupo_guardado()
+
     class Meta:
         verbose_name = "Aprendiz por Curso"
         verbose_name_plural = "Aprendices por Curso"
@@ -0,0 +1,86 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .estadisticas_notas import invalidar_estadisticas
+from .models import _DESCONOCIDO, Aprendiz, AprendizCurso, Curso
+
+
+def _modelo_origen(origin):
+    """Modelo sobre el que se llamó delete() (instancia o queryset); None si no se conoce"""
+    if origin is None:
+        return None
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _curso_se_elimina(origin):
+    """
+    Indica si el borrado que llega a una inscripción elimina también su
+    curso. A AprendizCurso solo se llega en cascada desde Aprendiz o
+    desde Curso (directamente o desde Programa o Instructor), así que si
+    el origen no es una inscripción ni un aprendiz, el curso cae con ella.
+    """
+    return _modelo_origen(origin) not in (None, AprendizCurso, Aprendiz)
+
+
+@receiver(post_delete, sender=AprendizCurso)
+def liberar_cupo(sender, instance, origin=None, **kwargs):
+    """
+    Libera el cupo de la inscripción eliminada (también en cascada desde
+    el aprendiz). Si el curso se elimina con ella no hay nada que liberar.
+    """
+    if _curso_se_elimina(origin):
+        return
+    curso_id = instance.cupo_para_inscritos()
+    if curso_id is not None:
+        Curso.liberar_cupos(curso_id)
+
+
+@receiver(post_save, sender=AprendizCurso)
+def invalidar_estadisticas_notas(sender, instance, raw=False, **kwargs):
+    """Las notas y estados del curso (y del anterior, si cambió) alimentan las estadísticas"""
+    if not raw:
+        cursos = {instance.curso_id, getattr(instance, '_curso_guardado', None)}
+        invalidar_estadisticas(cursos - {None})
+
+
+@receiver(post_delete, sender=AprendizCurso)
+def invalidar_estadisticas_borrado(sender, instance, origin=None, **kwargs):
+    """
+    En los borrados en cascada las estadísticas las invalida una sola vez
+    el curso o el aprendiz que se elimina, sin una consulta por inscripción.
+    """
+    if _modelo_origen(origin) in (None, AprendizCurso):
+        invalidar_estadisticas([instance.curso_id])
+
+
+@receiver(pre_delete, sender=Aprendiz)
+def invalidar_estadisticas_aprendiz(sender, instance, **kwargs):
+    """Los cursos del aprendiz pierden sus inscripciones (una consulta)"""
+    cursos = dict(Curso.objects.filter(aprendizcurso__aprendiz=instance).values_list('id', 'programa_id'))
+    invalidar_estadisticas(cursos, cursos.values())
+
+
+@receiver(pre_save, sender=Curso)
+def recordar_programa_guardado(sender, instance, raw=False, **kwargs):
+    """Sin el programa leído de la base de datos, se consulta antes de guardar"""
+    if raw or instance._state.adding:
+        return
+    if getattr(instance, '_programa_guardado', _DESCONOCIDO) is _DESCONOCIDO:
+        instance._programa_guardado = (
+            Curso.objects.filter(pk=instance.pk).values_list('programa_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Curso)
+def invalidar_estadisticas_programas(sender, instance, created, raw=False, **kwargs):
+    """Mover el curso a otro programa cambia las estadísticas de ambos"""
+    anterior = getattr(instance, '_programa_guardado', None)
+    if not raw and not created and anterior not in (None, _DESCONOCIDO, instance.programa_id):
+        invalidar_estadisticas([], [anterior, instance.programa_id])
+    instance._programa_guardado = instance.programa_id
+
+
+@receiver(post_delete, sender=Curso)
+def invalidar_estadisticas_curso(sender, instance, **kwargs):
+    """El programa se conoce por la instancia: no hace falta consultarlo"""
+    invalidar_estadisticas([instance.pk], [instance.programa_id])
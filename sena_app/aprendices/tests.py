@@ -1,3 +1,640 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from SENA_APP.pruebas import competir
+from instructores.models import Instructor
+from programas.models import Programa
+from . import estadisticas_notas, inscripcion_masiva
+from .calificaciones import registrar_notas
+from .cupos import conciliar_cupos, inscritos_reales
+from .estadisticas_notas import estadisticas_curso, estadisticas_programa
+from .importacion_aprendices import importar_aprendices
+from .inscripcion_masiva import inscribir_aprendices
+from .models import Aprendiz, AprendizCurso, Curso
+from .views import APRENDICES_POR_PAGINA
 
-# Create your tests here.
+
+def crear_aprendiz(documento, **kwargs):
+    datos = {
+        'documento_identidad': documento,
+        'nombre': f'Aprendiz {documento}',
+        'apellido': 'Prueba',
+        'fecha_nacimiento': date(2000, 1, 1),
+        'ciudad': 'Bogotá',
+    }
+    datos.update(kwargs)
+    return Aprendiz.objects.create(**datos)
+
+
+def crear_curso(codigo, **kwargs):
+    programa, _ = Programa.objects.get_or_create(
+        codigo='PRG-1',
+        defaults={
+            'nombre': 'Programa de prueba',
+            'nivel_formacion': 'TGL',
+            'duracion_meses': 24,
+            'duracion_horas': 3120,
+            'descripcion': 'N/A',
+            'competencias': 'N/A',
+            'perfil_egreso': 'N/A',
+            'requisitos_ingreso': 'N/A',
+            'centro_formacion': 'Centro de prueba',
+            'regional': 'Distrito Capital',
+            'fecha_creacion': date(2020, 1, 1),
+        }
+    )
+    instructor, _ = Instructor.objects.get_or_create(
+        documento_identidad='INS-1',
+        defaults={
+            'nombre': 'Instructor',
+            'apellido': 'Prueba',
+            'fecha_nacimiento': date(1980, 1, 1),
+            'especialidad': 'Software',
+            'anios_experiencia': 10,
+            'fecha_vinculacion': date(2015, 1, 1),
+        }
+    )
+    datos = {
+        'codigo': codigo,
+        'nombre': f'Curso {codigo}',
+        'programa': programa,
+        'instructor_coordinador': instructor,
+        'fecha_inicio': date(2025, 1, 20),
+        'fecha_fin': date(2026, 12, 18),
+        'horario': 'Diurno',
+        'aula': 'A-101',
+        'cupos_maximos': 30,
+    }
+    datos.update(kwargs)
+    return Curso.objects.create(**datos)
+
+
+class ListaAprendicesTests(TestCase):
+    def test_consultas_constantes_por_pagina(self):
+        cursos = [crear_curso(f'C{numero}') for numero in range(3)]
+        for numero in range(APRENDICES_POR_PAGINA + 5):
+            aprendiz = crear_aprendiz(f'{1000 + numero}', apellido=f'Apellido {numero:02d}')
+            for curso in cursos:
+                AprendizCurso.objects.create(aprendiz=aprendiz, curso=curso)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('aprendices:lista_aprendices'))
+        self.assertEqual(respuesta.status_code, 200)
+        # Conteo, página y cursos de la página
+        self.assertEqual(len(consultas), 3)
+
+        pagina = respuesta.context['lista_aprendices']
+        self.assertEqual(len(pagina), APRENDICES_POR_PAGINA)
+        self.assertEqual(pagina[0].apellido, 'Apellido 00')
+        self.assertEqual(
+            [inscripcion.curso.nombre for inscripcion in pagina[0].aprendizcurso_set.all()],
+            ['Curso C0', 'Curso C1', 'Curso C2']
+        )
+        self.assertContains(respuesta, 'Curso C2')
+
+        respuesta = self.client.get(reverse('aprendices:lista_aprendices'), {'page': 2})
+        self.assertEqual(len(respuesta.context['lista_aprendices']), 5)
+
+    def test_busqueda(self):
+        crear_aprendiz('1012345678', nombre='Laura', apellido='Gómez', ciudad='Medellín')
+        crear_aprendiz('1098765432', nombre='Andrés', apellido='López', ciudad='Bogotá')
+        crear_aprendiz('2012345678', nombre='Gabriel', apellido='Zapata', ciudad='Medellín')
+        # La ciudad se guarda tal como se escribió
+        crear_aprendiz('3012345678', nombre='Sofía', apellido='Ríos', ciudad='bogotá')
+        crear_aprendiz('4012345678', nombre='JUAN', apellido='PEREZ', ciudad='Cali')
+
+        def documentos(**parametros):
+            respuesta = self.client.get(reverse('aprendices:lista_aprendices'), parametros)
+            return [aprendiz.documento_identidad for aprendiz in respuesta.context['lista_aprendices']]
+
+        self.assertEqual(documentos(q='10'), ['1012345678', '1098765432'])
+        # Sin distinguir la mayúscula inicial, por nombre o por apellido
+        self.assertEqual(documentos(q='gómez'), ['1012345678'])
+        self.assertEqual(documentos(q='Ga'), ['2012345678'])
+        # Sin distinguir mayúsculas en ninguna posición
+        self.assertEqual(documentos(q='GÓMEZ'), ['1012345678'])
+        self.assertEqual(documentos(q='zAP'), ['2012345678'])
+        self.assertEqual(documentos(q='perez'), ['4012345678'])
+        self.assertEqual(documentos(q='jUaN'), ['4012345678'])
+        self.assertEqual(documentos(ciudad='medellín'), ['1012345678', '2012345678'])
+        self.assertEqual(documentos(q='2012', ciudad='Medellín'), ['2012345678'])
+        self.assertEqual(documentos(ciudad='bogotá'), ['1098765432', '3012345678'])
+        self.assertEqual(documentos(ciudad='Bogotá'), ['1098765432', '3012345678'])
+        self.assertEqual(documentos(ciudad='BOGOTÁ'), ['1098765432', '3012345678'])
+        self.assertEqual(documentos(q='Pérez'), [])
+
+    def test_busqueda_usa_los_indices(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('aprendices:lista_aprendices'), {'q': 'Gom'})
+        conteo = next(consulta['sql'] for consulta in consultas.captured_queries if 'COUNT' in consulta['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {conteo}')
+            plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+        for indice in ('aprendiz_documento_min_idx', 'aprendiz_apellido_min_idx', 'aprendiz_nombre_min_idx'):
+            self.assertIn(indice, plan)
+
+
+class CursoInscritosTests(TestCase):
+    def setUp(self):
+        self.curso = crear_curso('C1', cupos_maximos=2)
+
+    def inscritos(self, curso=None):
+        return Curso.objects.get(pk=(curso or self.curso).pk).inscritos
+
+    def test_guardar_curso_leido_antes_no_revierte_inscritos(self):
+        obsoleto = Curso.objects.get(pk=self.curso.pk)
+        AprendizCurso.objects.create(aprendiz=crear_aprendiz('1'), curso=self.curso)
+        self.assertTrue(Curso.reservar_cupos(self.curso.pk))
+
+        obsoleto.aula = 'Aula 2'
+        obsoleto.save()
+        curso = Curso.objects.get(pk=self.curso.pk)
+        self.assertEqual(curso.inscritos, 2)
+        self.assertEqual(curso.aula, 'Aula 2')
+
+        diferido = Curso.objects.only('nombre').get(pk=self.curso.pk)
+        diferido.nombre = 'Renombrado'
+        diferido.save()
+        curso = Curso.objects.get(pk=self.curso.pk)
+        self.assertEqual((curso.nombre, curso.aula, curso.inscritos), ('Renombrado', 'Aula 2', 2))
+
+    def test_contador_sigue_las_inscripciones(self):
+        primera = AprendizCurso.objects.create(aprendiz=crear_aprendiz('1'), curso=self.curso)
+        AprendizCurso.objects.create(aprendiz=crear_aprendiz('2'), curso=self.curso, estado='ACT')
+        self.assertEqual(self.inscritos(), 2)
+
+        curso = Curso.objects.get(pk=self.curso.pk)
+        self.assertEqual(curso.cupos_disponibles(), 0)
+        self.assertEqual(curso.porcentaje_ocupacion(), 100)
+
+        # Desertar libera el cupo y volver lo ocupa de nuevo
+        primera.estado = 'DES'
+        primera.save()
+        self.assertEqual(self.inscritos(), 1)
+        primera = AprendizCurso.objects.get(pk=primera.pk)
+        primera.estado = 'ACT'
+        primera.save()
+        self.assertEqual(self.inscritos(), 2)
+
+        # Cambiar de curso mueve el cupo
+        otro = crear_curso('C2')
+        primera.curso = otro
+        primera.save()
+        self.assertEqual((self.inscritos(), self.inscritos(otro)), (1, 1))
+
+        primera.delete()
+        self.assertEqual(self.inscritos(otro), 0)
+        self.curso.aprendices.all().delete()
+        self.assertEqual(self.inscritos(), 0)
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+    def test_curso_lleno(self):
+        for documento in ('1', '2'):
+            AprendizCurso.objects.create(aprendiz=crear_aprendiz(documento), curso=self.curso)
+
+        tercero = AprendizCurso(aprendiz=crear_aprendiz('3'), curso=self.curso)
+        with self.assertRaises(ValidationError):
+            tercero.full_clean()
+        with self.assertRaises(ValidationError):
+            tercero.save()
+        self.assertEqual(AprendizCurso.objects.count(), 2)
+        self.assertEqual(self.inscritos(), 2)
+
+        # Un desertor no ocupa cupo
+        tercero.estado = 'DES'
+        tercero.save()
+        self.assertEqual(self.inscritos(), 2)
+
+    def test_reconciliar_cupos(self):
+        inscripcion = AprendizCurso.objects.create(aprendiz=crear_aprendiz('1'), curso=self.curso)
+        AprendizCurso.objects.create(aprendiz=crear_aprendiz('2'), curso=self.curso)
+        # QuerySet.update() no pasa por save()
+        AprendizCurso.objects.filter(pk=inscripcion.pk).update(estado='DES')
+        self.assertEqual(conciliar_cupos(aplicar=False), [(self.curso.pk, 'C1', 2, 1)])
+
+        salida = StringIO()
+        call_command('reconciliar_cupos', stdout=salida)
+        self.assertIn('guardado=2 real=1', salida.getvalue())
+        self.assertEqual(self.inscritos(), 1)
+
+        salida = StringIO()
+        call_command('reconciliar_cupos', '--dry-run', stdout=salida)
+        self.assertIn('Sin diferencias', salida.getvalue())
+
+    def test_reconciliar_no_pisa_inscripciones_posteriores(self):
+        inscripcion = AprendizCurso.objects.create(aprendiz=crear_aprendiz('1'), curso=self.curso)
+        AprendizCurso.objects.filter(pk=inscripcion.pk).update(estado='DES')
+
+        def contar_e_inscribir():
+            # Una inscripción confirmada entre el conteo y la corrección
+            reales = inscritos_reales()
+            AprendizCurso.objects.create(aprendiz=crear_aprendiz('2'), curso=self.curso)
+            return reales
+
+        with mock.patch('aprendices.cupos.inscritos_reales', contar_e_inscribir):
+            self.assertEqual(conciliar_cupos(), [(self.curso.pk, 'C1', 2, 0)])
+        self.assertEqual(self.inscritos(), 1)
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+    def test_borrar_curso_no_libera_cupo_por_inscripcion(self):
+        for documento in ('1', '2'):
+            AprendizCurso.objects.create(aprendiz=crear_aprendiz(documento), curso=self.curso)
+        with CaptureQueriesContext(connection) as consultas:
+            Curso.objects.get(pk=self.curso.pk).delete()
+        actualizaciones = [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith(f'UPDATE "{Curso._meta.db_table}"')
+        ]
+        self.assertEqual(actualizaciones, [])
+        self.assertFalse(AprendizCurso.objects.exists())
+
+
+class InscripcionMasivaTests(TestCase):
+    def setUp(self):
+        self.curso = crear_curso('C1', cupos_maximos=3)
+        self.aprendices = [crear_aprendiz(str(100 + numero)) for numero in range(5)]
+
+    def test_reporte_por_fila(self):
+        AprendizCurso.objects.create(aprendiz=self.aprendices[0], curso=self.curso)
+
+        # Documentos, inscripciones existentes, cupos, reserva, inserción y
+        # programa del curso para invalidar sus estadísticas (más SAVEPOINT
+        # y RELEASE de la transacción y de la inserción)
+        with self.assertNumQueries(10):
+            resultados = inscribir_aprendices(self.curso, ['100', '101', '999', '101', '102', '103', '104'])
+
+        self.assertEqual(
+            [(fila['fila'], fila['documento'], fila['resultado']) for fila in resultados],
+            [
+                (1, '100', 'YA_INSCRITO'),
+                (2, '101', 'INSCRITO'),
+                (3, '999', 'NO_EXISTE'),
+                (4, '101', 'REPETIDO'),
+                (5, '102', 'INSCRITO'),
+                (6, '103', 'SIN_CUPO'),
+                (7, '104', 'SIN_CUPO'),
+            ]
+        )
+        self.assertIn('ver fila 2', resultados[3]['mensaje'])
+        self.assertEqual(
+            set(self.curso.aprendizcurso_set.values_list('aprendiz__documento_identidad', flat=True)),
+            {'100', '101', '102'}
+        )
+        self.assertEqual(Curso.objects.get(pk=self.curso.pk).inscritos, 3)
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+        # Los desertores no necesitan cupo
+        resultados = inscribir_aprendices(self.curso, ['103'], estado='DES')
+        self.assertEqual(resultados[0]['resultado'], 'INSCRITO')
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+    def test_inscripcion_concurrente_del_mismo_aprendiz(self):
+        reservar = inscripcion_masiva._reservar
+
+        def reservar_y_competir(curso, cantidad):
+            # Otra solicitud inscribe al aprendiz 101 después de la consulta inicial
+            reservados = reservar(curso, cantidad)
+            AprendizCurso.objects.create(aprendiz=self.aprendices[1], curso=self.curso)
+            return reservados
+
+        with mock.patch.object(inscripcion_masiva, '_reservar', reservar_y_competir):
+            resultados = inscribir_aprendices(self.curso, ['101', '102'])
+
+        self.assertEqual([fila['resultado'] for fila in resultados], ['YA_INSCRITO', 'INSCRITO'])
+        self.assertEqual(AprendizCurso.objects.filter(curso=self.curso).count(), 2)
+        self.assertEqual(Curso.objects.get(pk=self.curso.pk).inscritos, 2)
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+    def test_vista_con_csv(self):
+        archivo = SimpleUploadedFile('cohorte.csv', 'Documento\n100\n\n101\n'.encode('utf-8'))
+        respuesta = self.client.post(
+            reverse('aprendices:inscribir_aprendices', args=[self.curso.pk]),
+            {'documentos': '102, 999', 'archivo': archivo, 'estado': 'INS'}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            [fila['resultado'] for fila in respuesta.context['resultados']],
+            ['INSCRITO', 'NO_EXISTE', 'INSCRITO', 'INSCRITO']
+        )
+        self.assertEqual(respuesta.context['curso'].inscritos, 3)
+
+        respuesta = self.client.post(reverse('aprendices:inscribir_aprendices', args=[self.curso.pk]), {'estado': 'INS'})
+        self.assertTrue(respuesta.context['form'].errors)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('inscribir_aprendices', 'C1', '--documento', '100', '--documento', '998', stdout=salida)
+        self.assertIn('Fila 2 (998)', salida.getvalue())
+        self.assertIn('1 inscrito(s), 1 no inscrito(s)', salida.getvalue())
+
+
+class ImportarAprendicesTests(TestCase):
+    ENCABEZADO = 'Documento_Identidad,Nombre,Apellido,Teléfono,Correo,Fecha_Nacimiento,Ciudad\n'
+
+    def fila(self, documento, **kwargs):
+        datos = {
+            'nombre': 'Ana',
+            'apellido': 'Ruiz',
+            'telefono': '3001234567',
+            'correo': 'ana@example.com',
+            'fecha_nacimiento': '2001-05-04',
+            'ciudad': 'Cali',
+        }
+        datos.update(kwargs)
+        return ','.join([documento, *datos.values()]) + '\n'
+
+    def test_csv(self):
+        crear_aprendiz('500')
+        contenido = (
+            self.ENCABEZADO
+            + self.fila('501')
+            + self.fila('50A')
+            + self.fila('502', telefono='30O1')
+            + self.fila('503', nombre='', ciudad='')
+            + self.fila('501')
+            + self.fila('500')
+            + self.fila('504', ciudad='')
+        )
+        resultado = importar_aprendices(StringIO(contenido), tamano_lote=3)
+
+        self.assertEqual(resultado['filas'], 7)
+        self.assertEqual((resultado['creados'], resultado['existentes']), (2, 1))
+        self.assertEqual(
+            [(error['fila'], error['documento']) for error in resultado['errores']],
+            [(3, '50A'), (4, '502'), (5, '503'), (6, '501')]
+        )
+        self.assertIn('solo números', resultado['errores'][0]['mensaje'])
+        self.assertIn('ver fila 2', resultado['errores'][3]['mensaje'])
+        self.assertEqual(Aprendiz.objects.get(documento_identidad='501').fecha_nacimiento, date(2001, 5, 4))
+        self.assertIsNone(Aprendiz.objects.get(documento_identidad='504').ciudad)
+
+        with self.assertRaises(ValueError):
+            importar_aprendices(StringIO('documento_identidad,nombre\n1,Ana\n'))
+
+    def test_documento_creado_durante_el_lote(self):
+        bulk_create = Aprendiz.objects.bulk_create
+
+        def crear_y_competir(aprendices, **kwargs):
+            # El formulario crea el aprendiz 802 entre la consulta y el INSERT
+            crear_aprendiz('802')
+            return bulk_create(aprendices, **kwargs)
+
+        contenido = self.ENCABEZADO + self.fila('801') + self.fila('802') + self.fila('803')
+        with mock.patch.object(Aprendiz.objects, 'bulk_create', crear_y_competir):
+            resultado = importar_aprendices(StringIO(contenido))
+
+        self.assertEqual((resultado['creados'], resultado['existentes']), (2, 1))
+        self.assertEqual(Aprendiz.objects.filter(documento_identidad__startswith='80').count(), 3)
+
+    def test_jsonl_y_puntos_de_control(self):
+        lineas = [
+            json.dumps({'documento_identidad': 600 + numero, 'nombre': 'Ana', 'apellido': 'Ruiz',
+                        'telefono': '3001234567', 'correo': 'ana@example.com',
+                        'fecha_nacimiento': '2001-05-04'})
+            for numero in range(5)
+        ]
+        lineas.insert(2, '{no es json')
+        contenido = '\n'.join(lineas) + '\n'
+
+        puntos = []
+        resultado = importar_aprendices(StringIO(contenido), 'jsonl', tamano_lote=2, punto_control=puntos.append)
+        self.assertEqual(puntos, [2, 4, 6])
+        self.assertEqual(resultado['creados'], 5)
+        self.assertEqual(resultado['errores'][0]['fila'], 3)
+
+        # Al reanudar se omiten las filas ya confirmadas
+        Aprendiz.objects.filter(documento_identidad__in=['603', '604']).delete()
+        resultado = importar_aprendices(StringIO(contenido), 'jsonl', desde_fila=4)
+        self.assertEqual((resultado['filas'], resultado['creados'], resultado['errores']), (2, 2, []))
+        self.assertEqual(Aprendiz.objects.count(), 5)
+
+    def test_comando_reanuda_desde_punto_de_control(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'aprendices.csv')
+            control = os.path.join(directorio, 'aprendices.control')
+            with open(archivo, 'w', encoding='utf-8') as salida:
+                salida.write(self.ENCABEZADO + self.fila('701') + self.fila('702') + self.fila('703'))
+            with open(control, 'w', encoding='utf-8') as salida:
+                json.dump({'archivo': os.path.abspath(archivo), 'fila': 3}, salida)
+
+            salida = StringIO()
+            call_command('importar_aprendices', archivo, '--punto-control', control, stdout=salida)
+            self.assertIn('Reanudando después de la fila 3', salida.getvalue())
+            self.assertIn('1 creado(s)', salida.getvalue())
+            self.assertIn('filas/s', salida.getvalue())
+            self.assertFalse(os.path.exists(control))
+        self.assertEqual(list(Aprendiz.objects.values_list('documento_identidad', flat=True)), ['703'])
+
+    def test_vista(self):
+        archivo = SimpleUploadedFile('aprendices.csv', (self.ENCABEZADO + self.fila('801')).encode('utf-8'))
+        respuesta = self.client.post(reverse('aprendices:importar_aprendices'), {'archivo': archivo})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['resultado']['creados'], 1)
+        self.assertTrue(Aprendiz.objects.filter(documento_identidad='801').exists())
+
+
+@override_settings(CACHE_COMPARTIDA=True)
+class NotasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.curso = crear_curso('C1', cupos_maximos=4)
+        self.inscripciones = [
+            AprendizCurso.objects.create(aprendiz=crear_aprendiz(str(900 + numero)), curso=self.curso)
+            for numero in range(4)
+        ]
+
+    def ids(self):
+        return [inscripcion.id for inscripcion in self.inscripciones]
+
+    def test_registrar_notas(self):
+        primera, segunda, tercera, cuarta = self.ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = registrar_notas(self.curso, {
+                primera: {'nota_final': '4,25', 'estado': 'GRA'},
+                segunda: {'nota_final': '2.0'},
+                tercera: {'nota_final': '', 'estado': 'DES'},
+                cuarta: {'nota_final': '7'},
+                999999: {'nota_final': '3.0'},
+            })
+        self.assertEqual(resultado['actualizadas'], 3)
+        self.assertEqual(
+            [(error['inscripcion_id'], error['mensaje']) for error in resultado['errores']],
+            [(cuarta, 'La nota debe estar entre 0.0 y 5.0.'), (999999, 'La inscripción no pertenece al curso')]
+        )
+        notas = dict(AprendizCurso.objects.values_list('id', 'nota_final'))
+        self.assertEqual(notas[primera], Decimal('4.3'))
+        self.assertEqual(notas[segunda], Decimal('2.0'))
+        self.assertIsNone(notas[tercera])
+        self.assertEqual(AprendizCurso.objects.get(pk=tercera).estado, 'DES')
+        # El desertor liberó su cupo
+        self.assertEqual(Curso.objects.get(pk=self.curso.pk).inscritos, 3)
+
+        # Otro aprendiz toma el cupo: el desertor ya no puede volver
+        AprendizCurso.objects.create(aprendiz=crear_aprendiz('999'), curso=self.curso)
+        resultado = registrar_notas(self.curso, {tercera: {'estado': 'ACT'}})
+        self.assertEqual(resultado['actualizadas'], 0)
+        self.assertEqual(resultado['errores'][0]['mensaje'], 'El curso no tiene cupos disponibles')
+        self.assertEqual(conciliar_cupos(aplicar=False), [])
+
+    def test_estadisticas_y_cache(self):
+        primera, segunda, tercera, cuarta = self.ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_notas(self.curso, {
+                primera: {'nota_final': '4.0', 'estado': 'GRA'},
+                segunda: {'nota_final': '3.0', 'estado': 'GRA'},
+                tercera: {'nota_final': '2.0'},
+                cuarta: {'estado': 'DES'},
+            })
+
+        with self.assertNumQueries(1):
+            estadisticas = estadisticas_curso(self.curso.pk)
+        self.assertEqual(estadisticas['inscritos'], 4)
+        self.assertEqual(estadisticas['calificados'], 3)
+        self.assertEqual(estadisticas['media'], 3.0)
+        self.assertEqual(estadisticas['percentiles']['p50'], 3.0)
+        self.assertEqual(estadisticas['tasa_aprobacion'], 0.6667)
+        self.assertEqual(estadisticas['tasa_desercion'], 0.25)
+        self.assertEqual(estadisticas['por_estado']['GRA'], 2)
+
+        # En caché hasta que cambie una nota
+        with self.assertNumQueries(0):
+            estadisticas_curso(self.curso.pk)
+        inscripcion = AprendizCurso.objects.get(pk=tercera)
+        inscripcion.nota_final = Decimal('5.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion.save()
+        self.assertEqual(estadisticas_curso(self.curso.pk)['media'], 4.0)
+
+        otro = crear_curso('C2')
+        with self.captureOnCommitCallbacks(execute=True):
+            AprendizCurso.objects.create(aprendiz=crear_aprendiz('990'), curso=otro, nota_final=Decimal('1.0'))
+        with self.assertNumQueries(1):
+            programa = estadisticas_programa(self.curso.programa_id)
+        self.assertEqual(programa['inscritos'], 5)
+        self.assertEqual(programa['media'], 3.25)
+        self.assertEqual(
+            [(curso['curso_id'], curso['media']) for curso in programa['cursos']],
+            [(self.curso.pk, 4.0), (otro.pk, 1.0)]
+        )
+
+        respuesta = self.client.get(reverse('aprendices:api_estadisticas_programa', args=[self.curso.programa_id]))
+        self.assertEqual(respuesta.json()['media'], 3.25)
+        respuesta = self.client.get(reverse('aprendices:api_estadisticas_curso', args=[999999]))
+        self.assertEqual(respuesta.status_code, 404)
+
+    @override_settings(CACHE_COMPARTIDA=False)
+    def test_sin_cache_compartida_no_guarda_nada(self):
+        estadisticas_curso(self.curso.pk)
+        with self.assertNumQueries(1):
+            estadisticas_curso(self.curso.pk)
+
+    def test_calculo_anterior_a_la_invalidacion_no_queda_en_cache(self):
+        primera = self.ids()[0]
+        arreglos = estadisticas_notas._arreglos
+
+        def leer_y_cambiar(inscripciones):
+            # La nota cambia y se confirma después de leer, antes de guardar en caché
+            datos = arreglos(inscripciones)
+            with self.captureOnCommitCallbacks(execute=True):
+                registrar_notas(self.curso, {primera: {'nota_final': '5.0'}})
+            return datos
+
+        with mock.patch.object(estadisticas_notas, '_arreglos', leer_y_cambiar):
+            self.assertIsNone(estadisticas_curso(self.curso.pk)['media'])
+        self.assertEqual(estadisticas_curso(self.curso.pk)['media'], 5.0)
+
+    def test_mover_curso_de_programa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_notas(self.curso, {self.ids()[0]: {'nota_final': '4.0'}})
+        origen = self.curso.programa
+        destino = Programa.objects.get(pk=origen.pk)
+        destino.pk = None
+        destino.codigo = 'PRG-2'
+        destino.save()
+        self.assertEqual(estadisticas_programa(origen.pk)['inscritos'], 4)
+        self.assertEqual(estadisticas_programa(destino.pk)['inscritos'], 0)
+
+        curso = Curso.objects.get(pk=self.curso.pk)
+        curso.programa = destino
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.save()
+        self.assertEqual(estadisticas_programa(origen.pk)['inscritos'], 0)
+        self.assertEqual(estadisticas_programa(destino.pk)['media'], 4.0)
+
+    def test_borrados_en_cascada_invalidan_una_vez(self):
+        otro = crear_curso('C2')
+        AprendizCurso.objects.create(aprendiz=self.inscripciones[0].aprendiz, curso=otro)
+        self.assertEqual(estadisticas_programa(self.curso.programa_id)['inscritos'], 5)
+
+        # El aprendiz invalida sus dos cursos con una consulta
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as consultas:
+                self.inscripciones[0].aprendiz.delete()
+        lecturas_curso = [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('SELECT') and f'FROM "{Curso._meta.db_table}"' in consulta['sql']
+        ]
+        self.assertEqual(len(lecturas_curso), 1)
+        self.assertEqual(estadisticas_programa(self.curso.programa_id)['inscritos'], 3)
+
+        # El curso invalida sus estadísticas y las del programa sin consultarlas
+        curso = Curso.objects.get(pk=self.curso.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as consultas:
+                curso.delete()
+        self.assertFalse([
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('SELECT') and f'FROM "{Curso._meta.db_table}"' in consulta['sql']
+        ])
+        self.assertEqual(estadisticas_programa(otro.programa_id)['inscritos'], 0)
+
+    def test_planilla(self):
+        primera, segunda, _, _ = self.ids()
+        url = reverse('aprendices:planilla_notas', args=[self.curso.pk])
+        respuesta = self.client.get(url)
+        self.assertContains(respuesta, f'name="nota_final_{primera}"')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(url, {
+                f'nota_final_{primera}': '4.5',
+                f'estado_{primera}': 'GRA',
+                f'nota_final_{segunda}': 'abc',
+            })
+        self.assertEqual(respuesta.context['resultado']['actualizadas'], 1)
+        self.assertEqual(len(respuesta.context['resultado']['errores']), 1)
+        self.assertContains(respuesta, 'value="4.5"')
+        self.assertEqual(estadisticas_curso(self.curso.pk)['media'], 4.5)
+
+
+class ReservaCuposConcurrenteTests(TransactionTestCase):
+    """Varias inscripciones simultáneas no exceden los cupos del curso"""
+
+    HILOS = 8
+
+    def test_no_excede_cupos(self):
+        curso = crear_curso('C1', cupos_maximos=3)
+        aprendices = [crear_aprendiz(str(numero)) for numero in range(self.HILOS)]
+
+        def inscribir(numero):
+            try:
+                AprendizCurso.objects.create(aprendiz=aprendices[numero], curso_id=curso.pk)
+                return True
+            except ValidationError:
+                return False
+
+        resultados = competir(inscribir, self.HILOS)
+        self.assertEqual(resultados.count(True), 3)
+        self.assertEqual(AprendizCurso.objects.count(), 3)
+        self.assertEqual(Curso.objects.get(pk=curso.pk).inscritos, 3)
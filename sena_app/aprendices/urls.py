@@ -7,7 +7,12 @@ app_name = 'aprendices'
 urlpatterns = [
     path('aprendices/aprendiz/<int:aprendiz_id>', views.detalle_aprendiz, name='detalle_aprendiz'),
     path('aprendices/', views.aprendices, name='lista_aprendices'),
+    path('aprendices/importar/', views.importar_aprendices, name='importar_aprendices'),
     path('cursos/curso/<int:curso_id>', views.detalle_curso, name='detalle_curso'),
+    path('cursos/curso/<int:curso_id>/inscribir/', views.inscribir_aprendices, name='inscribir_aprendices'),
+    path('cursos/curso/<int:curso_id>/notas/', views.planilla_notas, name='planilla_notas'),
+    path('api/cursos/<int:curso_id>/estadisticas/', views.api_estadisticas_curso, name='api_estadisticas_curso'),
+    path('api/programas/<int:programa_id>/estadisticas/', views.api_estadisticas_programa, name='api_estadisticas_programa'),
     path('cursos/', views.lista_cursos, name='lista_cursos'),
     path('crear_aprendiz/', AprendizFormView.as_view(), name='crear_aprendiz'),
     path('', views.inicio, name='inicio'),
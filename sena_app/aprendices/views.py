@@ -1,18 +1,76 @@
-from django.http import HttpResponse
+import io
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import Prefetch, Q
+from django.db.models.functions import Lower
+from django.http import Http404, HttpResponse, JsonResponse
 from django.template import loader
-from .models import Aprendiz, Curso
-from django.shortcuts import get_object_or_404
-from aprendices.forms import AprendizForm
+from .models import Aprendiz, AprendizCurso, Curso
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.csrf import csrf_protect
+from aprendices.forms import AprendizForm, ImportarAprendicesForm, InscripcionMasivaForm
+from programas.models import Programa
+from . import inscripcion_masiva
+from .calificaciones import registrar_notas
+from .estadisticas_notas import estadisticas_curso, estadisticas_programa
+from .importacion_aprendices import formato_archivo, importar_aprendices as importar_aprendices_archivo
 from django.views import generic
 from django.urls import reverse_lazy
 
 # Create your views here.
+
+# Aprendices por página en lista_aprendices
+APRENDICES_POR_PAGINA = 24
+
+
+def _prefijo(campo, texto):
+    """
+    Valores de `campo` (un alias con Lower()) que empiezan por `texto` sin
+    distinguir mayúsculas, como un rango que recorre el índice funcional
+    del campo en cualquier motor, a diferencia de LIKE/ILIKE.
+    """
+    prefijo = texto.lower()
+    return Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': prefijo + '\U0010ffff'})
+
+
 def aprendices(request):
-    lista_aprendices = Aprendiz.objects.prefetch_related('aprendizcurso_set').order_by('apellido', 'nombre')
+    busqueda = request.GET.get('q', '').strip()
+    ciudad = request.GET.get('ciudad', '').strip()
+
+    lista_aprendices = Aprendiz.objects.order_by('apellido', 'nombre', 'id')
+    if busqueda:
+        # Cada alias coincide con un índice Lower() del modelo
+        lista_aprendices = lista_aprendices.alias(
+            documento_minusculas=Lower('documento_identidad'),
+            apellido_minusculas=Lower('apellido'),
+            nombre_minusculas=Lower('nombre'),
+        ).filter(
+            _prefijo('documento_minusculas', busqueda)
+            | _prefijo('apellido_minusculas', busqueda)
+            | _prefijo('nombre_minusculas', busqueda)
+        )
+    if ciudad:
+        # La ciudad se guarda tal como se escribió: se compara en minúsculas
+        # con el índice (Lower(ciudad), apellido, nombre), que ya entrega el orden
+        lista_aprendices = lista_aprendices.alias(ciudad_minusculas=Lower('ciudad')).filter(
+            ciudad_minusculas=ciudad.lower()
+        )
+
+    # Conteo, página y cursos de la página: tres consultas sin importar el
+    # tamaño de la tabla ni cuántos cursos tenga cada aprendiz
+    lista_aprendices = lista_aprendices.prefetch_related(Prefetch(
+        'aprendizcurso_set',
+        queryset=AprendizCurso.objects.select_related('curso').only('aprendiz', 'curso__nombre').order_by('id')
+    ))
+    pagina = Paginator(lista_aprendices, APRENDICES_POR_PAGINA).get_page(request.GET.get('page'))
+
     template = loader.get_template('lista_aprendices.html')
     context = {
-        'lista_aprendices': lista_aprendices,
-        'total_aprendices': lista_aprendices.count(),
+        'lista_aprendices': pagina,
+        'paginas': pagina.paginator.get_elided_page_range(pagina.number, on_each_side=2, on_ends=1),
+        'total_aprendices': pagina.paginator.count,
+        'q': busqueda,
+        'ciudad': ciudad,
     }
     return HttpResponse(template.render(context, request))
 
@@ -52,6 +110,120 @@ def detalle_curso(request, curso_id):
     }
     return HttpResponse(template.render(context, request))
 
+@csrf_protect
+def importar_aprendices(request):
+    """Carga de un CSV o JSON-lines de aprendices; omite los documentos existentes"""
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarAprendicesForm(request.POST, request.FILES)
+        if form.is_valid():
+            subido = form.cleaned_data['archivo']
+            # Se lee el archivo subido como texto sin cargarlo completo en memoria
+            archivo = io.TextIOWrapper(subido.file, encoding='utf-8-sig', newline='')
+            try:
+                resultado = importar_aprendices_archivo(archivo, formato_archivo(subido.name))
+            except (ValueError, UnicodeDecodeError) as e:
+                form.add_error('archivo', str(e))
+            else:
+                duracion = resultado['duracion']
+                resultado['velocidad'] = resultado['filas'] / duracion if duracion else 0
+                messages.success(
+                    request,
+                    f"{resultado['creados']} aprendiz(ces) creado(s) en {duracion:.1f}s "
+                    f"({resultado['velocidad']:.0f} filas/s)."
+                )
+                if resultado['errores']:
+                    messages.warning(request, f"{len(resultado['errores'])} fila(s) con errores.")
+    else:
+        form = ImportarAprendicesForm()
+
+    return render(request, 'importar_aprendices.html', {'form': form, 'resultado': resultado})
+
+@csrf_protect
+def inscribir_aprendices(request, curso_id):
+    """Inscribe una cohorte en el curso a partir de documentos o de un CSV"""
+    curso = get_object_or_404(Curso, id=curso_id)
+    resultados = None
+
+    if request.method == 'POST':
+        form = InscripcionMasivaForm(request.POST, request.FILES)
+        if form.is_valid():
+            documentos = inscripcion_masiva.separar_documentos(form.cleaned_data['documentos'])
+            try:
+                if form.cleaned_data['archivo']:
+                    archivo = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+                    documentos += inscripcion_masiva.leer_documentos_csv(archivo)
+                resultados = inscripcion_masiva.inscribir_aprendices(
+                    curso, documentos, form.cleaned_data['estado']
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                form.add_error(None, str(e))
+            else:
+                inscritos = sum(1 for fila in resultados if fila['resultado'] == inscripcion_masiva.INSCRITO)
+                if inscritos:
+                    messages.success(request, f'{inscritos} aprendiz(ces) inscrito(s) en el curso.')
+                if len(resultados) > inscritos:
+                    messages.warning(request, f'{len(resultados) - inscritos} documento(s) no se inscribieron.')
+                curso.refresh_from_db(fields=['inscritos'])
+    else:
+        form = InscripcionMasivaForm()
+
+    return render(request, 'inscripcion_masiva.html', {
+        'curso': curso,
+        'form': form,
+        'resultados': resultados,
+    })
+
+@csrf_protect
+def planilla_notas(request, curso_id):
+    """
+    Planilla con la nota final y el estado de todos los inscritos del
+    curso; el envío se aplica completo con registrar_notas.
+    """
+    curso = get_object_or_404(Curso, id=curso_id)
+    resultado = None
+
+    if request.method == 'POST':
+        # Campos nota_final_<id> y estado_<id> por inscripción
+        cambios = {}
+        for clave, valor in request.POST.items():
+            campo, _, inscripcion_id = clave.rpartition('_')
+            if campo in ('nota_final', 'estado') and inscripcion_id.isdigit():
+                cambios.setdefault(int(inscripcion_id), {})[campo] = valor
+        resultado = registrar_notas(curso, cambios)
+        if resultado['actualizadas']:
+            messages.success(request, f"{resultado['actualizadas']} inscripción(es) actualizada(s).")
+        if resultado['errores']:
+            messages.warning(request, f"{len(resultado['errores'])} fila(s) no se actualizaron.")
+        curso.refresh_from_db(fields=['inscritos'])
+
+    inscripciones = (
+        curso.aprendizcurso_set
+        .select_related('aprendiz')
+        .only('id', 'curso_id', 'estado', 'nota_final', 'aprendiz__documento_identidad',
+              'aprendiz__nombre', 'aprendiz__apellido')
+        .order_by('aprendiz__apellido', 'aprendiz__nombre', 'id')
+    )
+    return render(request, 'planilla_notas.html', {
+        'curso': curso,
+        'inscripciones': inscripciones,
+        'estados': AprendizCurso.ESTADO_CHOICES,
+        'resultado': resultado,
+        'estadisticas': estadisticas_curso(curso.id),
+    })
+
+def api_estadisticas_curso(request, curso_id):
+    """API endpoint con las estadísticas de notas y estados del curso"""
+    if not Curso.objects.filter(pk=curso_id).exists():
+        raise Http404('El curso no existe.')
+    return JsonResponse(estadisticas_curso(curso_id))
+
+def api_estadisticas_programa(request, programa_id):
+    """API endpoint con las estadísticas de notas del programa y de cada curso"""
+    if not Programa.objects.filter(pk=programa_id).exists():
+        raise Http404('El programa no existe.')
+    return JsonResponse(estadisticas_programa(programa_id))
+
 def detalle_aprendiz(request,aprendiz_id):
     aprendiz = get_object_or_404(Aprendiz, id=aprendiz_id)
     template = loader.get_template('detalle_aprendiz.html')
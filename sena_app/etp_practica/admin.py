@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Empresa, EtapaPractica, AsignacionAprendiz
+from .models import Empresa, EtapaPractica, AsignacionAprendiz, AsignacionEvento, BitacoraEntrada
 
 @admin.register(Empresa)
 class EmpresaAdmin(admin.ModelAdmin):
@@ -27,7 +27,7 @@ class AsignacionAprendizAdmin(admin.ModelAdmin):
     ]
     search_fields = [
         'aprendiz__nombre',
-        'aprendiz__documento', 
+        'aprendiz__documento_identidad',
         'empresa__nombre',
         'tutor_propuesto'
     ]
@@ -59,14 +59,11 @@ class AsignacionAprendizAdmin(admin.ModelAdmin):
     
     readonly_fields = ['fecha_asignacion', 'fecha_actualizacion', 'fecha_confirmacion']
     
-    actions = ['confirmar_asignaciones', 'rechazar_asignaciones']
+    actions = ['confirmar_asignaciones', 'rechazar_asignaciones', 'iniciar_etapas_practicas']
     
     def confirmar_asignaciones(self, request, queryset):
         """Acción para confirmar múltiples asignaciones"""
-        updated = 0
-        for asignacion in queryset.filter(estado='ASIGNADO'):
-            if asignacion.confirmar_asignacion():
-                updated += 1
+        updated = queryset.confirmar(request.user.get_username())
         
         self.message_user(
             request, 
@@ -76,16 +73,23 @@ class AsignacionAprendizAdmin(admin.ModelAdmin):
     
     def rechazar_asignaciones(self, request, queryset):
         """Acción para rechazar múltiples asignaciones"""
-        updated = 0
-        for asignacion in queryset.filter(estado__in=['PENDIENTE', 'ASIGNADO']):
-            if asignacion.rechazar_asignacion("Rechazado desde admin"):
-                updated += 1
+        updated = queryset.rechazar("Rechazado desde admin", request.user.get_username())
         
         self.message_user(
             request, 
             f'{updated} asignación(es) rechazada(s) exitosamente.'
         )
     rechazar_asignaciones.short_description = "Rechazar asignaciones seleccionadas"
+    
+    def iniciar_etapas_practicas(self, request, queryset):
+        """Acción para iniciar la etapa práctica de múltiples asignaciones confirmadas"""
+        etapas = queryset.iniciar(request.user.get_username())
+        
+        self.message_user(
+            request, 
+            f'{len(etapas)} etapa(s) práctica(s) iniciada(s) exitosamente.'
+        )
+    iniciar_etapas_practicas.short_description = "Iniciar etapa práctica de las asignaciones seleccionadas"
 
 @admin.register(EtapaPractica)
 class EtapaPracticaAdmin(admin.ModelAdmin):
@@ -104,7 +108,7 @@ class EtapaPracticaAdmin(admin.ModelAdmin):
     ]
     search_fields = [
         'aprendiz__nombre',
-        'aprendiz__documento',
+        'aprendiz__documento_identidad',
         'empresa__nombre',
         'tutor'
     ]
@@ -119,7 +123,7 @@ class EtapaPracticaAdmin(admin.ModelAdmin):
             'fields': ('fecha_inicio', 'fecha_fin')
         }),
         ('Detalles', {
-            'fields': ('tutor', 'objetivos', 'bitacora')
+            'fields': ('tutor', 'objetivos')
         }),
         ('Vinculación', {
             'fields': ('asignacion_origen',),
@@ -127,4 +131,32 @@ class EtapaPracticaAdmin(admin.ModelAdmin):
         })
     )
     
-    readonly_fields = ['asignacion_origen']
\ No newline at end of file
+    readonly_fields = ['asignacion_origen']
+
+@admin.register(BitacoraEntrada)
+class BitacoraEntradaAdmin(admin.ModelAdmin):
+    list_display = ['etapa', 'fecha', 'autor']
+    list_filter = ['fecha']
+    search_fields = [
+        'etapa__aprendiz__nombre',
+        'etapa__aprendiz__documento_identidad',
+        'autor'
+    ]
+    date_hierarchy = 'fecha'
+    ordering = ['-fecha']
+    raw_id_fields = ['etapa']
+    list_select_related = ['etapa__aprendiz', 'etapa__empresa']
+
+@admin.register(AsignacionEvento)
+class AsignacionEventoAdmin(admin.ModelAdmin):
+    list_display = ['asignacion', 'tipo', 'usuario', 'fecha']
+    list_filter = ['tipo', 'fecha']
+    search_fields = [
+        'asignacion__aprendiz__nombre',
+        'asignacion__aprendiz__documento_identidad',
+        'usuario'
+    ]
+    date_hierarchy = 'fecha'
+    ordering = ['-fecha']
+    raw_id_fields = ['asignacion']
+    list_select_related = ['asignacion__aprendiz', 'asignacion__empresa']
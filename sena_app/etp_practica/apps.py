@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class EtpPracticaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "etp_practica"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+        post_migrate.connect(signals.verificar_triggers_busqueda, sender=self)
@@ -0,0 +1,101 @@
+from django.db import IntegrityError, transaction
+from aprendices.models import Aprendiz
+from .models import (
+    CLAVES_ASIGNACION,
+    AsignacionAprendiz,
+    AsignacionActiva,
+    EmpresaEstadisticas,
+    OcupacionSemanal
+)
+
+# Máximo de aprendices por solicitud de asignación masiva
+MAXIMO_ASIGNACION_MASIVA = 1000
+
+# Resultados posibles por aprendiz
+ASIGNADO = 'ASIGNADO'
+NO_EXISTE = 'NO_EXISTE'
+OCUPADO = 'OCUPADO'
+
+MENSAJES_RESULTADO = {
+    ASIGNADO: 'Asignado a la empresa',
+    NO_EXISTE: 'El aprendiz no existe',
+    OCUPADO: 'El aprendiz ya tiene una asignación activa',
+}
+
+
+def _intentar_asignacion_masiva(empresa, aprendiz_ids, datos, creado_por):
+    # Existencia y disponibilidad de todo el grupo en una sola consulta
+    marcadores = dict(
+        Aprendiz.objects.filter(pk__in=aprendiz_ids)
+        .values_list('id', 'asignacion_activa')
+    )
+
+    resultados = []
+    nuevas = []
+    for aprendiz_id in aprendiz_ids:
+        if aprendiz_id not in marcadores:
+            resultado = NO_EXISTE
+        elif marcadores[aprendiz_id] is not None:
+            resultado = OCUPADO
+        else:
+            resultado = ASIGNADO
+            nuevas.append(AsignacionAprendiz(
+                aprendiz_id=aprendiz_id,
+                empresa=empresa,
+                estado='ASIGNADO',
+                creado_por=creado_por,
+                **datos
+            ))
+        resultados.append({
+            'aprendiz_id': aprendiz_id,
+            'resultado': resultado,
+            'mensaje': MENSAJES_RESULTADO[resultado],
+            'asignacion_id': None,
+        })
+
+    with transaction.atomic():
+        # bulk_create no pasa por save(): se mantienen aquí el marcador de
+        # asignación activa, los contadores y la ocupación de la empresa
+        creadas = AsignacionAprendiz.objects.bulk_create(nuevas)
+        AsignacionActiva.objects.bulk_create([
+            AsignacionActiva(aprendiz_id=asignacion.aprendiz_id, asignacion=asignacion)
+            for asignacion in creadas
+        ])
+        EmpresaEstadisticas.ajustar_contadores(
+            'asignaciones', CLAVES_ASIGNACION, {(empresa.id, 'ASIGNADO'): len(creadas)}
+        )
+        ocupacion = {}
+        for asignacion in creadas:
+            periodo = asignacion.periodo_ocupacion()
+            ocupacion[periodo] = ocupacion.get(periodo, 0) + 1
+        OcupacionSemanal.ajustar('asignaciones', ocupacion)
+
+    ids_creadas = {asignacion.aprendiz_id: asignacion.id for asignacion in creadas}
+    for fila in resultados:
+        fila['asignacion_id'] = ids_creadas.get(fila['aprendiz_id'])
+    return resultados
+
+
+def asignar_aprendices_masivo(empresa, aprendiz_ids, datos, creado_por=''):
+    """
+    Asigna varios aprendices a una empresa con los mismos datos
+    (fechas, modalidad, tutor...) en una sola transacción.
+
+    Los aprendices inexistentes u ocupados se rechazan individualmente y
+    el resto se inserta con bulk_create. Devuelve una lista con un
+    resultado por aprendiz: {'aprendiz_id', 'resultado', 'mensaje',
+    'asignacion_id'}.
+    """
+    # Conservar el orden recibido y descartar repetidos
+    aprendiz_ids = list(dict.fromkeys(aprendiz_ids))
+    if len(aprendiz_ids) > MAXIMO_ASIGNACION_MASIVA:
+        raise ValueError(
+            f'No se pueden asignar más de {MAXIMO_ASIGNACION_MASIVA} aprendices por solicitud.'
+        )
+
+    try:
+        return _intentar_asignacion_masiva(empresa, aprendiz_ids, datos, creado_por)
+    except IntegrityError:
+        # Otro proceso ocupó a algún aprendiz entre la consulta y la
+        # inserción: se vuelve a consultar la disponibilidad una vez
+        return _intentar_asignacion_masiva(empresa, aprendiz_ids, datos, creado_por)
@@ -0,0 +1,169 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Tabla FTS5 creada por la migración 0004 (solo en SQLite)
+TABLA_BUSQUEDA = 'etp_practica_busqueda_asignacion'
+
+_COLUMNAS = '(rowid, aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor)'
+
+_SELECT_ASIGNACION = """
+    SELECT s.id, a.nombre, a.apellido, a.documento_identidad, e.nombre, s.tutor_propuesto
+    FROM etp_practica_asignacionaprendiz s
+    JOIN aprendices_aprendiz a ON a.id = s.aprendiz_id
+    JOIN etp_practica_empresa e ON e.id = s.empresa_id
+"""
+
+_SQL_RECONSTRUIR = f'INSERT INTO {TABLA_BUSQUEDA} {_COLUMNAS} {_SELECT_ASIGNACION}'
+
+# Definición vigente de los triggers. Las migraciones que hacen que SQLite
+# reconstruya una tabla referenciada los retiran y reinstalan con su propia
+# copia congelada del SQL, no con esta
+_TRIGGERS = ['asignacion_ai', 'asignacion_au', 'asignacion_ad', 'aprendiz_au', 'empresa_au']
+
+_SQL_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ai
+    AFTER INSERT ON etp_practica_asignacionaprendiz
+    BEGIN
+        INSERT INTO {TABLA_BUSQUEDA} {_COLUMNAS} {_SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_au
+    AFTER UPDATE OF aprendiz_id, empresa_id, tutor_propuesto
+    ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA} {_COLUMNAS} {_SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ad
+    AFTER DELETE ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_aprendiz_au
+    AFTER UPDATE OF nombre, apellido, documento_identidad ON aprendices_aprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE aprendiz_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {_COLUMNAS} {_SELECT_ASIGNACION} WHERE s.aprendiz_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_empresa_au
+    AFTER UPDATE OF nombre ON etp_practica_empresa
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE empresa_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {_COLUMNAS} {_SELECT_ASIGNACION} WHERE s.empresa_id = new.id;
+    END
+    """,
+]
+
+# Disponibilidad del índice por alias de base de datos
+_indice_disponible = {}
+
+
+def indice_disponible(using='default'):
+    """Indica si la base de datos tiene el índice FTS5 de asignaciones"""
+    if using not in _indice_disponible:
+        connection = connections[using]
+        disponible = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [TABLA_BUSQUEDA]
+                )
+                disponible = cursor.fetchone() is not None
+        _indice_disponible[using] = disponible
+    return _indice_disponible[using]
+
+
+def consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta MATCH de FTS5: cada
+    palabra se busca como prefijo y todas deben aparecer. Las comillas y
+    operadores del usuario se descartan.
+    """
+    palabras = re.findall(r'\w+', texto)
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar_asignaciones(asignaciones, texto):
+    """
+    Filtra un queryset de AsignacionAprendiz por nombre, apellido y
+    documento del aprendiz, nombre de la empresa y tutor propuesto.
+    Usa el índice FTS5 (prefijos, sin distinguir tildes) cuando existe y
+    recurre a icontains en otras bases de datos.
+    """
+    if indice_disponible(asignaciones.db):
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return asignaciones
+        return asignaciones.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TABLA_BUSQUEDA} WHERE {TABLA_BUSQUEDA} MATCH %s',
+            [consulta]
+        ))
+
+    return asignaciones.filter(
+        Q(aprendiz__nombre__icontains=texto) |
+        Q(aprendiz__apellido__icontains=texto) |
+        Q(aprendiz__documento_identidad__icontains=texto) |
+        Q(empresa__nombre__icontains=texto) |
+        Q(tutor_propuesto__icontains=texto)
+    )
+
+
+def retirar_triggers(using='default'):
+    """Elimina los triggers del índice"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nombre in _TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {TABLA_BUSQUEDA}_{nombre}')
+
+
+def triggers_faltantes(using='default'):
+    """Nombres de los triggers del índice que no existen en la base de datos"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{TABLA_BUSQUEDA}_%']
+        )
+        existentes = {nombre for nombre, in cursor.fetchall()}
+    return [nombre for nombre in _TRIGGERS if f'{TABLA_BUSQUEDA}_{nombre}' not in existentes]
+
+
+def instalar_triggers(using='default'):
+    """
+    Crea los triggers que mantienen el índice si no existen. Devuelve
+    False si no hay índice y True si faltaba alguno y se creó.
+    """
+    _indice_disponible.pop(using, None)
+    if not indice_disponible(using) or not triggers_faltantes(using):
+        return False
+    with connections[using].cursor() as cursor:
+        for sql in _SQL_TRIGGERS:
+            cursor.execute(sql)
+    return True
+
+
+def reconstruir_indice(using='default'):
+    """Vacía y vuelve a llenar el índice. Devuelve el número de filas indexadas"""
+    instalar_triggers(using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_BUSQUEDA}')
+        cursor.execute(_SQL_RECONSTRUIR)
+        cursor.execute(f"INSERT INTO {TABLA_BUSQUEDA}({TABLA_BUSQUEDA}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {TABLA_BUSQUEDA}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,87 @@
+import hashlib
+from datetime import timezone as dt_timezone
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition
+from aprendices.models import Aprendiz
+from .models import AsignacionAprendiz, Empresa, EmpresaEstadisticas, EtapaPractica
+
+# Las subconsultas MAX() de asignaciones y etapas se resuelven con los
+# índices (empresa, fecha_actualizacion); la de aprendices recorre las
+# asignaciones y etapas de la empresa y busca cada aprendiz por id. Se
+# escribe en SQL porque compilar el equivalente con el ORM tarda más que
+# ejecutarlo y esta consulta corre en cada sondeo.
+_SQL_MARCA = f"""
+    SELECT e.fecha_actualizacion,
+           (SELECT MAX(a.fecha_actualizacion) FROM {AsignacionAprendiz._meta.db_table} a
+            WHERE a.empresa_id = e.id),
+           (SELECT MAX(p.fecha_actualizacion) FROM {EtapaPractica._meta.db_table} p
+            WHERE p.empresa_id = e.id),
+           (SELECT MAX(ap.fecha_actualizacion) FROM {Aprendiz._meta.db_table} ap
+            WHERE ap.id IN (SELECT a.aprendiz_id FROM {AsignacionAprendiz._meta.db_table} a
+                            WHERE a.empresa_id = e.id
+                            UNION
+                            SELECT p.aprendiz_id FROM {EtapaPractica._meta.db_table} p
+                            WHERE p.empresa_id = e.id)),
+           s.asignaciones_total,
+           s.etapas_total
+    FROM {Empresa._meta.db_table} e
+    LEFT JOIN {EmpresaEstadisticas._meta.db_table} s ON s.empresa_id = e.id
+    WHERE e.id = %s
+"""
+
+
+def _como_fecha(valor):
+    """Las funciones de agregación de SQLite devuelven texto en UTC"""
+    if isinstance(valor, str):
+        valor = parse_datetime(valor)
+    if valor is not None and timezone.is_naive(valor):
+        valor = timezone.make_aware(valor, dt_timezone.utc)
+    return valor
+
+
+def marca_empresa(empresa_id):
+    """
+    Marca de versión de todo lo que muestran las páginas de una empresa,
+    leída con una consulta: la última modificación de la empresa, de sus
+    asignaciones, de sus etapas y de los aprendices de ambas (las páginas
+    muestran sus nombres y documentos), más los totales de
+    EmpresaEstadisticas (un borrado no cambia los máximos pero sí los
+    totales).
+
+    Devuelve (última modificación, etag) o None si la empresa no existe.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_SQL_MARCA, [empresa_id])
+        fila = cursor.fetchone()
+    if fila is None:
+        return None
+    ultima = max(fecha for fecha in map(_como_fecha, fila[:4]) if fecha is not None)
+    etag = hashlib.md5(
+        '|'.join(str(valor) for valor in (empresa_id, *fila)).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    return ultima, etag
+
+
+def _marca(request, empresa_id):
+    # etag_func y last_modified_func comparten la misma consulta
+    if not hasattr(request, '_marca_empresa'):
+        request._marca_empresa = marca_empresa(empresa_id)
+    return request._marca_empresa
+
+
+def _etag(request, empresa_id, **kwargs):
+    marca = _marca(request, empresa_id)
+    return marca and marca[1]
+
+
+def _ultima(request, empresa_id, **kwargs):
+    marca = _marca(request, empresa_id)
+    return marca and marca[0]
+
+
+# Responde 304 sin ejecutar la vista cuando la empresa no cambió desde el
+# ETag o la fecha que envía el cliente
+condicional_empresa = condition(etag_func=_etag, last_modified_func=_ultima)
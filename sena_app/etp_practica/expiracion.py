@@ -0,0 +1,64 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import AsignacionAprendiz
+
+# Días por defecto si settings no define ETP_DIAS_EXPIRACION_ASIGNACION
+DIAS_EXPIRACION_ASIGNACION = 30
+
+# Asignaciones canceladas por cada transacción
+TAMANO_LOTE_EXPIRACION = 500
+
+# Usuario registrado en los eventos de expiración
+USUARIO_EXPIRACION = 'expiracion'
+
+
+def dias_expiracion():
+    return getattr(settings, 'ETP_DIAS_EXPIRACION_ASIGNACION', DIAS_EXPIRACION_ASIGNACION)
+
+
+def asignaciones_vencidas(limite):
+    """
+    Asignaciones PENDIENTE o ASIGNADO creadas antes de `limite`. El filtro
+    por estado y el rango sobre fecha_asignacion se resuelven con sus
+    índices.
+    """
+    return AsignacionAprendiz.objects.filter(
+        estado__in=AsignacionAprendiz.TRANSICIONES['expirar'][0],
+        fecha_asignacion__lt=limite
+    )
+
+
+def expirar_asignaciones(dias=None, tamano_lote=TAMANO_LOTE_EXPIRACION, ahora=None):
+    """
+    Cancela las asignaciones sin confirmar con más de `dias` días de
+    antigüedad. Es el punto de entrada para el planificador (cron, por
+    ejemplo, mediante el comando expirar_asignaciones).
+
+    Cada lote es una transacción corta: el UPDATE condicionado por el
+    estado de origen omite las asignaciones que otro proceso confirmó o
+    rechazó entretanto, y sus eventos se insertan con un solo INSERT.
+    Ejecutarlo de nuevo no cambia nada hasta que venzan otras asignaciones.
+
+    Devuelve {'limite', 'expiradas', 'lotes'}.
+    """
+    dias = dias_expiracion() if dias is None else dias
+    limite = (ahora or timezone.now()) - timedelta(days=dias)
+    motivo = f'Sin confirmar después de {dias} días'
+    resultado = {'limite': limite, 'expiradas': 0, 'lotes': 0}
+
+    while True:
+        ids = list(
+            asignaciones_vencidas(limite)
+            .order_by('fecha_asignacion', 'id')
+            .values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+        # Las que no cambian (ganó otro proceso) ya no cumplen el filtro,
+        # así que el siguiente lote avanza igual
+        resultado['expiradas'] += AsignacionAprendiz.objects.filter(id__in=ids).expirar(
+            motivo, USUARIO_EXPIRACION
+        )
+        resultado['lotes'] += 1
+    return resultado
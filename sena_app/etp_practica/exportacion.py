@@ -0,0 +1,69 @@
+import csv
+from django.utils import timezone
+from .models import AsignacionAprendiz
+
+# Filas que se piden a la base de datos por cada viaje del cursor
+TAMANO_LOTE_EXPORTACION = 2000
+
+# (campo de values_list, encabezado) en el orden de las columnas del CSV
+COLUMNAS_EXPORTACION = [
+    ('id', 'ID'),
+    ('aprendiz__documento_identidad', 'Documento'),
+    ('aprendiz__nombre', 'Nombre'),
+    ('aprendiz__apellido', 'Apellido'),
+    ('empresa__nombre', 'Empresa'),
+    ('empresa__nit', 'NIT'),
+    ('estado', 'Estado'),
+    ('modalidad', 'Modalidad'),
+    ('fecha_asignacion', 'Fecha de asignación'),
+    ('fecha_inicio_propuesta', 'Inicio propuesto'),
+    ('fecha_fin_propuesta', 'Fin propuesto'),
+    ('tutor_propuesto', 'Tutor propuesto'),
+    ('area_trabajo', 'Área de trabajo'),
+]
+
+_ESTADOS = dict(AsignacionAprendiz.ESTADO_CHOICES)
+_MODALIDADES = dict(AsignacionAprendiz.MODALIDAD_CHOICES)
+
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_exportacion(asignaciones):
+    """
+    Recorre el queryset con un cursor del lado del servidor: solo se
+    seleccionan las columnas exportadas (con aprendiz y empresa unidos en
+    la misma consulta) y nunca hay más de un lote en memoria.
+    """
+    campos = [campo for campo, _ in COLUMNAS_EXPORTACION]
+    indice_estado = campos.index('estado')
+    indice_modalidad = campos.index('modalidad')
+    indice_fecha = campos.index('fecha_asignacion')
+
+    filas = (
+        asignaciones
+        .order_by('-fecha_asignacion', '-id')
+        .values_list(*campos)
+        .iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    )
+    for fila in filas:
+        fila = list(fila)
+        fila[indice_estado] = _ESTADOS.get(fila[indice_estado], fila[indice_estado])
+        fila[indice_modalidad] = _MODALIDADES.get(fila[indice_modalidad], fila[indice_modalidad])
+        fila[indice_fecha] = timezone.localtime(fila[indice_fecha]).strftime('%Y-%m-%d %H:%M')
+        yield fila
+
+
+def generar_csv(asignaciones):
+    """
+    Genera el CSV línea por línea para StreamingHttpResponse. Empieza con
+    BOM para que Excel reconozca UTF-8 (tildes y eñes).
+    """
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow([encabezado for _, encabezado in COLUMNAS_EXPORTACION])
+    for fila in filas_exportacion(asignaciones):
+        yield escritor.writerow(fila)
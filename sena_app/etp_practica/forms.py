@@ -1,8 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 from datetime import date, timedelta
 from aprendices.models import Aprendiz
-from .models import Empresa, AsignacionAprendiz, EtapaPractica
+from .models import Empresa, AsignacionAprendiz, EtapaPractica, BitacoraEntrada
+from .asignacion_masiva import MAXIMO_ASIGNACION_MASIVA
 
 class EmpresaForm(forms.ModelForm):
     class Meta:
@@ -48,7 +50,99 @@ class EtapaPracticaForm(forms.ModelForm):
             'tutor': forms.TextInput(attrs={'class': 'form-control'}),
         }
 
-class AsignacionAprendizForm(forms.ModelForm):
+class ImportarEmpresasForm(forms.Form):
+    archivo = forms.FileField(
+        help_text="CSV con columnas nombre, nit, direccion, ciudad, telefono, email",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+
+class BitacoraEntradaForm(forms.ModelForm):
+    class Meta:
+        model = BitacoraEntrada
+        fields = ['autor', 'texto']
+        
+        widgets = {
+            'autor': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Nombre de quien registra'
+            }),
+            'texto': forms.Textarea(attrs={
+                'class': 'form-control',
+                'rows': 4,
+                'placeholder': 'Actividades realizadas, avances y observaciones...'
+            }),
+        }
+
+class FechasPropuestasMixin:
+    """
+    Reglas de fechas propuestas compartidas por los formularios de
+    asignación individual y masiva
+    """
+    
+    def clean_fecha_inicio_propuesta(self):
+        fecha_inicio = self.cleaned_data.get('fecha_inicio_propuesta')
+        if fecha_inicio:
+            # La fecha de inicio no puede ser en el pasado
+            if fecha_inicio < date.today():
+                raise ValidationError("La fecha de inicio no puede ser en el pasado.")
+            
+            # La fecha de inicio no puede ser muy lejana (más de 1 año)
+            if fecha_inicio > date.today() + timedelta(days=365):
+                raise ValidationError("La fecha de inicio no puede ser más de un año en el futuro.")
+        
+        return fecha_inicio
+    
+    def clean_fecha_fin_propuesta(self):
+        fecha_fin = self.cleaned_data.get('fecha_fin_propuesta')
+        if fecha_fin:
+            # Similar validación para fecha fin
+            if fecha_fin < date.today():
+                raise ValidationError("La fecha de finalización no puede ser en el pasado.")
+        
+        return fecha_fin
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha_inicio = cleaned_data.get('fecha_inicio_propuesta')
+        fecha_fin = cleaned_data.get('fecha_fin_propuesta')
+        
+        # Validar fechas
+        if fecha_inicio and fecha_fin:
+            if fecha_fin <= fecha_inicio:
+                raise ValidationError({
+                    'fecha_fin_propuesta': 'La fecha de finalización debe ser posterior a la fecha de inicio.'
+                })
+            
+            # Validar duración mínima (al menos 3 meses)
+            duracion = (fecha_fin - fecha_inicio).days
+            if duracion < 90:
+                raise ValidationError({
+                    'fecha_fin_propuesta': 'La duración mínima de la práctica debe ser de 3 meses (90 días).'
+                })
+            
+            # Validar duración máxima (no más de 12 meses)
+            if duracion > 365:
+                raise ValidationError({
+                    'fecha_fin_propuesta': 'La duración máxima de la práctica no puede exceder 12 meses.'
+                })
+        
+        return cleaned_data
+
+# (fragmentos que identifican la restricción en el mensaje de la base de
+# datos, campo, mensaje para el usuario). SQLite nombra las CHECK pero de
+# las UNIQUE solo informa tabla.columna; el marcador de asignación activa
+# tiene al aprendiz como clave primaria y protege lo mismo.
+ERRORES_INTEGRIDAD = [
+    (('asignacion_fechas_validas',), 'fecha_fin_propuesta',
+     'La fecha de finalización debe ser posterior a la fecha de inicio.'),
+    (('asignacion_activa_unica_por_aprendiz',
+      'etp_practica_asignacionaprendiz.aprendiz_id',
+      'etp_practica_asignacionactiva_pkey',
+      'etp_practica_asignacionactiva.aprendiz_id'),
+     'aprendiz', 'Este aprendiz ya tiene una asignación activa.'),
+]
+
+class AsignacionAprendizForm(FechasPropuestasMixin, forms.ModelForm):
     """
     Formulario para crear y editar asignaciones de aprendices a empresas
     """
@@ -149,85 +243,127 @@ class AsignacionAprendizForm(forms.ModelForm):
             self.fields['empresa'].initial = empresa_id
             self.fields['empresa'].widget.attrs['disabled'] = True
         
-        # Filtrar solo aprendices disponibles (sin asignación activa)
-        aprendices_ocupados = AsignacionAprendiz.objects.filter(
-            estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
-        ).values_list('aprendiz_id', flat=True)
-        
-        self.fields['aprendiz'].queryset = Aprendiz.objects.exclude(
-            id__in=aprendices_ocupados
-        ).order_by('nombre')
+        # Filtrar solo aprendices disponibles (sin asignación activa);
+        # al editar se conserva el aprendiz actual de la asignación
+        disponibles = Q(asignacion_activa__isnull=True)
+        if self.instance.aprendiz_id:
+            disponibles |= Q(pk=self.instance.aprendiz_id)
+        self.fields['aprendiz'].queryset = Aprendiz.objects.filter(disponibles).order_by('nombre')
         
         # Establecer fechas por defecto
         today = date.today()
         self.fields['fecha_inicio_propuesta'].initial = today + timedelta(days=30)
         self.fields['fecha_fin_propuesta'].initial = today + timedelta(days=210)  # ~6 meses
     
-    def clean_fecha_inicio_propuesta(self):
-        fecha_inicio = self.cleaned_data.get('fecha_inicio_propuesta')
-        if fecha_inicio:
-            # La fecha de inicio no puede ser en el pasado
-            if fecha_inicio < date.today():
-                raise ValidationError("La fecha de inicio no puede ser en el pasado.")
-            
-            # La fecha de inicio no puede ser muy lejana (más de 1 año)
-            if fecha_inicio > date.today() + timedelta(days=365):
-                raise ValidationError("La fecha de inicio no puede ser más de un año en el futuro.")
-        
-        return fecha_inicio
+    # La asignación activa duplicada la rechaza la base de datos al guardar
+    # (ver agregar_error_integridad)
     
-    def clean_fecha_fin_propuesta(self):
-        fecha_fin = self.cleaned_data.get('fecha_fin_propuesta')
-        if fecha_fin:
-            # Similar validación para fecha fin
-            if fecha_fin < date.today():
-                raise ValidationError("La fecha de finalización no puede ser en el pasado.")
-        
-        return fecha_fin
+    def validate_unique(self):
+        """
+        Las restricciones de AsignacionAprendiz se verifican en la base de
+        datos al guardar; validarlas aquí costaría una consulta más por
+        envío y no protegería contra envíos concurrentes.
+        """
     
-    def clean(self):
-        cleaned_data = super().clean()
-        fecha_inicio = cleaned_data.get('fecha_inicio_propuesta')
-        fecha_fin = cleaned_data.get('fecha_fin_propuesta')
-        aprendiz = cleaned_data.get('aprendiz')
-        
-        # Validar fechas
-        if fecha_inicio and fecha_fin:
-            if fecha_fin <= fecha_inicio:
-                raise ValidationError({
-                    'fecha_fin_propuesta': 'La fecha de finalización debe ser posterior a la fecha de inicio.'
-                })
-            
-            # Validar duración mínima (al menos 3 meses)
-            duracion = (fecha_fin - fecha_inicio).days
-            if duracion < 90:
-                raise ValidationError({
-                    'fecha_fin_propuesta': 'La duración mínima de la práctica debe ser de 3 meses (90 días).'
-                })
-            
-            # Validar duración máxima (no más de 12 meses)
-            if duracion > 365:
-                raise ValidationError({
-                    'fecha_fin_propuesta': 'La duración máxima de la práctica no puede exceder 12 meses.'
-                })
-        
-        # Validar que el aprendiz no tenga asignación activa
-        if aprendiz:
-            asignacion_activa = AsignacionAprendiz.objects.filter(
-                aprendiz=aprendiz,
-                estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
+    def agregar_error_integridad(self, error):
+        """
+        Traduce un IntegrityError de las restricciones de la asignación en
+        errores del formulario. Devuelve False si el error no es de ellas,
+        para que quien llama lo vuelva a lanzar.
+        """
+        mensaje = str(error)
+        for fragmentos, campo, texto in ERRORES_INTEGRIDAD:
+            if any(fragmento in mensaje for fragmento in fragmentos):
+                self.add_error(campo, texto)
+                return True
+        return False
+
+class ListaIdsField(forms.Field):
+    """Lista de ids enteros desde varios valores o una cadena separada por comas"""
+    widget = forms.SelectMultiple
+    
+    def to_python(self, value):
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = [value]
+        ids = []
+        for valor in value:
+            for parte in str(valor).replace(',', ' ').split():
+                if not parte.isdigit():
+                    raise ValidationError("La lista de aprendices contiene valores inválidos.")
+                ids.append(int(parte))
+        return ids
+
+class AsignacionMasivaForm(FechasPropuestasMixin, forms.Form):
+    """
+    Formulario para asignar varios aprendices a una empresa con los mismos
+    datos de práctica
+    """
+    aprendices = ListaIdsField(label='Aprendices')
+    
+    fecha_inicio_propuesta = forms.DateField(
+        label='Fecha de inicio propuesta',
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    
+    fecha_fin_propuesta = forms.DateField(
+        label='Fecha de finalización propuesta',
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    
+    modalidad = forms.ChoiceField(
+        label='Modalidad de trabajo',
+        choices=AsignacionAprendiz.MODALIDAD_CHOICES,
+        initial='PRESENCIAL',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
+    tutor_propuesto = forms.CharField(
+        label='Tutor empresarial',
+        max_length=200,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Nombre completo del tutor empresarial'
+        })
+    )
+    
+    area_trabajo = forms.CharField(
+        label='Área de trabajo',
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    
+    objetivos_propuestos = forms.CharField(
+        label='Objetivos de la práctica',
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3})
+    )
+    
+    def clean_aprendices(self):
+        aprendices = self.cleaned_data['aprendices']
+        if not aprendices:
+            raise ValidationError("Seleccione al menos un aprendiz.")
+        if len(set(aprendices)) > MAXIMO_ASIGNACION_MASIVA:
+            raise ValidationError(
+                f"No se pueden asignar más de {MAXIMO_ASIGNACION_MASIVA} aprendices a la vez."
             )
-            
-            # Excluir la instancia actual si estamos editando
-            if self.instance.pk:
-                asignacion_activa = asignacion_activa.exclude(pk=self.instance.pk)
-            
-            if asignacion_activa.exists():
-                raise ValidationError({
-                    'aprendiz': 'Este aprendiz ya tiene una asignación activa.'
-                })
-        
-        return cleaned_data
+        return aprendices
+    
+    def datos_compartidos(self):
+        """Campos comunes a todas las asignaciones creadas"""
+        return {
+            campo: self.cleaned_data[campo]
+            for campo in (
+                'fecha_inicio_propuesta',
+                'fecha_fin_propuesta',
+                'modalidad',
+                'tutor_propuesto',
+                'area_trabajo',
+                'objetivos_propuestos',
+            )
+        }
 
 class FiltroAsignacionesForm(forms.Form):
     """
@@ -0,0 +1,128 @@
+import csv
+import time
+import unicodedata
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .forms import EmpresaForm
+from .listado_empresas import invalidar_listado
+from .models import Empresa, EmpresaEstadisticas
+
+# Empresas insertadas o actualizadas por cada INSERT ... ON CONFLICT
+TAMANO_LOTE_IMPORTACION = 1000
+
+COLUMNAS_EMPRESA = ['nombre', 'nit', 'direccion', 'ciudad', 'telefono', 'email']
+
+# Campos que se sobrescriben cuando el NIT ya existe
+CAMPOS_ACTUALIZABLES = ['nombre', 'direccion', 'ciudad', 'telefono', 'email']
+
+
+def _normalizar_encabezado(encabezado):
+    """'Dirección ' -> 'direccion': sin tildes, espacios ni mayúsculas"""
+    descompuesto = unicodedata.normalize('NFKD', (encabezado or '').strip().lower())
+    return ''.join(letra for letra in descompuesto if not unicodedata.combining(letra))
+
+
+def validar_empresa(datos):
+    """
+    Aplica a una fila las reglas de los campos de EmpresaForm (longitudes,
+    formato del correo, obligatorios) sin consultar la base de datos ni
+    construir un formulario por fila. Devuelve (datos limpios, errores).
+    """
+    limpios = {}
+    errores = []
+    for columna in COLUMNAS_EMPRESA:
+        try:
+            limpios[columna] = EmpresaForm.base_fields[columna].clean(datos[columna])
+        except ValidationError as e:
+            errores.extend(f'{columna}: {mensaje}' for mensaje in e.messages)
+    return limpios, errores
+
+
+def _guardar_lote(lote):
+    """
+    Upsert de un lote por NIT. Devuelve (creadas, actualizadas). Las
+    empresas nuevas reciben su registro de EmpresaEstadisticas, que
+    bulk_create no crea porque no emite post_save.
+    """
+    nits = [empresa.nit for empresa in lote]
+    with transaction.atomic():
+        existentes = set(Empresa.objects.filter(nit__in=nits).values_list('nit', flat=True))
+        Empresa.objects.bulk_create(
+            lote,
+            update_conflicts=True,
+            unique_fields=['nit'],
+            # auto_now no aplica al DO UPDATE: se copia el valor del INSERT
+            update_fields=[*CAMPOS_ACTUALIZABLES, 'fecha_actualizacion']
+        )
+        sin_estadisticas = Empresa.objects.filter(
+            nit__in=nits, estadisticas__isnull=True
+        ).values_list('id', flat=True)
+        EmpresaEstadisticas.objects.bulk_create(
+            [EmpresaEstadisticas(empresa_id=empresa_id) for empresa_id in sin_estadisticas],
+            ignore_conflicts=True
+        )
+        # bulk_create no emite post_save
+        invalidar_listado()
+    return len(lote) - len(existentes), len(existentes)
+
+
+def importar_empresas(archivo, tamano_lote=TAMANO_LOTE_IMPORTACION):
+    """
+    Lee un CSV (archivo de texto abierto) con las columnas de
+    COLUMNAS_EMPRESA y crea o actualiza las empresas por NIT.
+
+    Las filas se validan con validar_empresa y se guardan por lotes, así que el costo no depende de
+    consultas por fila. Un NIT repetido dentro del archivo se reporta
+    como error y se conserva la primera aparición.
+
+    Devuelve un diccionario con filas, creadas, actualizadas, errores
+    (lista de {'fila', 'nit', 'mensaje'}) y duracion en segundos.
+    Lanza ValueError si faltan columnas.
+    """
+    inicio = time.monotonic()
+    lector = csv.DictReader(archivo)
+    encabezados = {_normalizar_encabezado(nombre): nombre for nombre in lector.fieldnames or []}
+    faltantes = [columna for columna in COLUMNAS_EMPRESA if columna not in encabezados]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+
+    resultado = {'filas': 0, 'creadas': 0, 'actualizadas': 0, 'errores': []}
+    vistos = {}
+    lote = []
+
+    def guardar():
+        creadas, actualizadas = _guardar_lote(lote)
+        resultado['creadas'] += creadas
+        resultado['actualizadas'] += actualizadas
+        lote.clear()
+
+    # La fila 1 es el encabezado
+    for numero, fila in enumerate(lector, start=2):
+        resultado['filas'] += 1
+        datos = {
+            columna: (fila.get(encabezados[columna]) or '').strip()
+            for columna in COLUMNAS_EMPRESA
+        }
+        limpios, errores = validar_empresa(datos)
+        if errores:
+            resultado['errores'].append({'fila': numero, 'nit': datos['nit'], 'mensaje': '; '.join(errores)})
+            continue
+
+        nit = limpios['nit']
+        if nit in vistos:
+            resultado['errores'].append({
+                'fila': numero,
+                'nit': nit,
+                'mensaje': f'NIT repetido en el archivo (ver fila {vistos[nit]})'
+            })
+            continue
+        vistos[nit] = numero
+
+        lote.append(Empresa(**limpios))
+        if len(lote) >= tamano_lote:
+            guardar()
+    if lote:
+        guardar()
+
+    resultado['duracion'] = time.monotonic() - inicio
+    return resultado
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from .models import Empresa
+
+# Empresas por página en lista_empresas
+EMPRESAS_POR_PAGINA = 20
+
+# Segundos que se conserva una página en caché (se invalida antes si algo cambia)
+DURACION_CACHE_LISTADO = 300
+
+_PREFIJO = 'etp_practica:lista_empresas'
+_CLAVE_VERSION = f'{_PREFIJO}:version'
+
+
+def _version():
+    """
+    Versión vigente del listado; forma parte de cada clave, así que
+    incrementarla invalida todas las páginas a la vez. Si la clave se
+    pierde se reinicia con la hora para no reutilizar versiones viejas.
+    """
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, time.time_ns(), None)
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def _incrementar_version():
+    try:
+        cache.incr(_CLAVE_VERSION)
+    except ValueError:
+        cache.add(_CLAVE_VERSION, time.time_ns(), None)
+
+
+def invalidar_listado():
+    """
+    Invalida las páginas en caché cuando se confirme la transacción en
+    curso (antes, otra solicitud podría volver a guardar datos viejos).
+    """
+    transaction.on_commit(_incrementar_version)
+
+
+def _clave(*partes):
+    resumen = hashlib.md5(json.dumps(partes).encode(), usedforsecurity=False).hexdigest()
+    return f'{_PREFIJO}:{_version()}:{resumen}'
+
+
+def _cacheado(calcular, *partes):
+    """
+    calcular() guardado en caché bajo la clave de `partes`. Solo con una
+    caché compartida por todos los procesos (CACHE_COMPARTIDA en
+    settings): con una por proceso, la invalidación hecha en un trabajador
+    no llegaría a los demás, así que se calcula en cada solicitud.
+    """
+    if not getattr(settings, 'CACHE_COMPARTIDA', False):
+        return calcular()
+    clave = _clave(*partes)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, DURACION_CACHE_LISTADO)
+    return datos
+
+
+def ciudades_empresas():
+    """Ciudades distintas en orden alfabético (recorre el índice de ciudad)"""
+    return _cacheado(
+        lambda: list(Empresa.objects.order_by('ciudad').values_list('ciudad', flat=True).distinct()),
+        'ciudades'
+    )
+
+
+def pagina_empresas(ciudad='', nombre='', numero=1):
+    """
+    Página de empresas ordenadas por nombre, filtradas por ciudad exacta y
+    por inicio del nombre (sin distinguir mayúsculas, como un rango sobre
+    el índice de Lower('nombre')). Los datos de cada
+    combinación de filtros y página se guardan en la caché compartida (ver
+    _cacheado); sin caché cuesta dos consultas (conteo y página con los contadores de
+    EmpresaEstadisticas).
+
+    Devuelve un Page cuyos elementos son diccionarios.
+    """
+    try:
+        numero = int(numero)
+    except (TypeError, ValueError):
+        numero = 1
+
+    def calcular():
+        empresas = Empresa.objects.order_by('nombre', 'id')
+        if ciudad:
+            empresas = empresas.filter(ciudad=ciudad)
+        if nombre:
+            # Un rango recorre el índice; istartswith (LIKE) lo lee completo
+            prefijo = nombre.lower()
+            empresas = empresas.alias(nombre_minusculas=Lower('nombre')).filter(
+                nombre_minusculas__gte=prefijo,
+                nombre_minusculas__lt=prefijo + '\U0010ffff'
+            )
+
+        total = empresas.count()
+        pagina = Paginator(range(total), EMPRESAS_POR_PAGINA).get_page(numero)
+        filas = empresas.values(
+            'id', 'nombre', 'nit', 'ciudad', 'direccion', 'email',
+            total_asignaciones=F('estadisticas__asignaciones_total'),
+            asignaciones_activas=(
+                F('estadisticas__asignaciones_confirmados') + F('estadisticas__asignaciones_iniciados')
+            ),
+        )[pagina.start_index() - 1:pagina.end_index()] if total else []
+        return {'total': total, 'numero': pagina.number, 'empresas': list(filas)}
+
+    datos = _cacheado(calcular, 'pagina', ciudad, nombre, numero)
+    paginador = Paginator(range(datos['total']), EMPRESAS_POR_PAGINA)
+    return Page(datos['empresas'], datos['numero'], paginador)
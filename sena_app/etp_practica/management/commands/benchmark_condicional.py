@@ -0,0 +1,80 @@
+import statistics
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from aprendices.models import Aprendiz
+from etp_practica import views
+from etp_practica.asignacion_masiva import asignar_aprendices_masivo
+from etp_practica.models import Empresa
+
+VISTAS = [
+    ('detalle_empresa', views.detalle_empresa),
+    ('aprendices_asignados', views.aprendices_asignados),
+    ('api_estadisticas_empresa', views.api_estadisticas_empresa),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de las páginas de una empresa con respuesta completa (200) "
+        "y con GET condicional (304), con datos sintéticos que se revierten al terminar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--asignaciones', type=int, default=500)
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def _crear_datos(self, total):
+        marca = time.time_ns()
+        empresa = Empresa.objects.create(
+            nombre='Empresa benchmark',
+            nit=f'BENCH-{marca}',
+            direccion='N/A',
+            ciudad='N/A',
+            telefono='0',
+            email='benchmark@example.com'
+        )
+        aprendices = Aprendiz.objects.bulk_create([
+            Aprendiz(
+                documento_identidad=f'C{marca % 10**8}{numero}',
+                nombre=f'Aprendiz {numero}',
+                apellido='Benchmark',
+                fecha_nacimiento=date(2000, 1, 1)
+            )
+            for numero in range(total)
+        ])
+        inicio = date.today()
+        for desde in range(0, total, 1000):
+            asignar_aprendices_masivo(empresa, [aprendiz.id for aprendiz in aprendices[desde:desde + 1000]], {
+                'fecha_inicio_propuesta': inicio,
+                'fecha_fin_propuesta': inicio + timedelta(days=180),
+                'tutor_propuesto': 'Tutor',
+            })
+        return empresa
+
+    def _medir(self, vista, empresa_id, repeticiones, **encabezados):
+        fabrica = RequestFactory()
+        tiempos = []
+        for _ in range(repeticiones):
+            request = fabrica.get('/', **encabezados)
+            inicio = time.perf_counter()
+            respuesta = vista(request, empresa_id=empresa_id)
+            tiempos.append(time.perf_counter() - inicio)
+        return respuesta, statistics.median(tiempos) * 1000
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            empresa = self._crear_datos(options['asignaciones'])
+            for nombre, vista in VISTAS:
+                completa, ms_completa = self._medir(vista, empresa.id, options['repeticiones'])
+                condicional, ms_condicional = self._medir(
+                    vista, empresa.id, options['repeticiones'], HTTP_IF_NONE_MATCH=completa['ETag']
+                )
+                self.stdout.write(
+                    f'{nombre:<26} {completa.status_code} {ms_completa:8.2f} ms   '
+                    f'{condicional.status_code} {ms_condicional:8.2f} ms   '
+                    f'x{ms_completa / ms_condicional:.1f}'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,106 @@
+import os
+import resource
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from aprendices.models import Aprendiz
+from etp_practica.exportacion import generar_csv
+from etp_practica.models import Empresa, AsignacionAprendiz
+
+# Aprendices sintéticos entre los que se reparten las asignaciones
+APRENDICES_SINTETICOS = 200
+
+# Cada cuántas líneas se toma una muestra de la memoria del proceso
+MUESTREO_RSS = 1000
+
+
+def rss_actual():
+    """Memoria residente del proceso en bytes (pico histórico fuera de Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la exportación CSV de asignaciones (filas/s y memoria pico) con "
+        "datos sintéticos creados dentro de una transacción que se revierte"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            action='append',
+            dest='tamanos',
+            help='Cantidad de asignaciones a exportar (se puede repetir; por defecto 100 y 100000)'
+        )
+
+    def _crear_datos(self, filas):
+        empresa = Empresa.objects.create(
+            nombre='Empresa benchmark',
+            nit=f'BENCH-{time.time_ns()}',
+            direccion='N/A',
+            ciudad='N/A',
+            telefono='0',
+            email='benchmark@example.com'
+        )
+        aprendices = Aprendiz.objects.bulk_create([
+            Aprendiz(
+                documento_identidad=f'B{time.time_ns() % 10**9}{numero}',
+                nombre=f'Aprendiz {numero}',
+                apellido='Benchmark',
+                fecha_nacimiento=date(2000, 1, 1)
+            )
+            for numero in range(APRENDICES_SINTETICOS)
+        ])
+        inicio = date.today()
+        # Estado RECHAZADO: no ocupa al aprendiz, así que no hay marcadores
+        # de asignación activa que mantener
+        AsignacionAprendiz.objects.bulk_create(
+            (
+                AsignacionAprendiz(
+                    aprendiz=aprendices[numero % len(aprendices)],
+                    empresa=empresa,
+                    fecha_inicio_propuesta=inicio,
+                    fecha_fin_propuesta=inicio + timedelta(days=180),
+                    tutor_propuesto=f'Tutor {numero % 50}',
+                    estado='RECHAZADO'
+                )
+                for numero in range(filas)
+            ),
+            batch_size=5000
+        )
+        return empresa
+
+    def _medir(self, empresa):
+        asignaciones = AsignacionAprendiz.objects.filter(empresa=empresa)
+        rss_inicial = pico = rss_actual()
+        inicio = time.monotonic()
+        filas = -1  # sin contar el encabezado
+        octetos = 0
+        for linea in generar_csv(asignaciones):
+            filas += 1
+            octetos += len(linea.encode())
+            if filas % MUESTREO_RSS == 0:
+                pico = max(pico, rss_actual())
+        duracion = time.monotonic() - inicio
+        return filas, octetos, duracion, rss_inicial, max(pico, rss_actual())
+
+    def handle(self, *args, **options):
+        for tamano in options['tamanos'] or [100, 100000]:
+            with transaction.atomic():
+                empresa = self._crear_datos(tamano)
+                filas, octetos, duracion, rss_inicial, pico = self._medir(empresa)
+                transaction.set_rollback(True)
+
+            velocidad = filas / duracion if duracion else 0
+            self.stdout.write(
+                f'{filas:>9} filas  {octetos / 1024 / 1024:8.1f} MiB  '
+                f'{duracion:7.2f}s  {velocidad:10.0f} filas/s  '
+                f'RSS pico {pico / 1024 / 1024:7.1f} MiB '
+                f'(+{(pico - rss_inicial) / 1024 / 1024:.1f} MiB durante la exportación)'
+            )
@@ -0,0 +1,76 @@
+import random
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from aprendices.models import Aprendiz
+from etp_practica.models import Empresa, EmpresaEstadisticas
+from etp_practica.recomendaciones import recomendar_aprendices, recomendar_empresas, recomendar_todos
+
+CIUDADES = [
+    'Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Cartagena', 'Bucaramanga',
+    'Pereira', 'Manizales', 'Cúcuta', 'Ibagué', 'Santa Marta', 'Villavicencio',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el motor de recomendaciones con aprendices y empresas sintéticos "
+        "creados dentro de una transacción que se revierte"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aprendices', type=int, default=50000)
+        parser.add_argument('--empresas', type=int, default=5000)
+
+    def _crear_datos(self, total_aprendices, total_empresas):
+        azar = random.Random(0)
+        marca = time.time_ns()
+        empresas = Empresa.objects.bulk_create([
+            Empresa(
+                nombre=f'Empresa {numero}',
+                nit=f'BENCH-{marca}-{numero}',
+                direccion='N/A',
+                ciudad=azar.choice(CIUDADES),
+                telefono='0',
+                email='benchmark@example.com'
+            )
+            for numero in range(total_empresas)
+        ], batch_size=2000)
+        EmpresaEstadisticas.objects.bulk_create([
+            EmpresaEstadisticas(
+                empresa=empresa,
+                asignaciones_confirmados=azar.randint(0, 30),
+                asignaciones_rechazados=azar.randint(0, 10),
+                asignaciones_asignados=azar.randint(0, 5),
+            )
+            for empresa in empresas
+        ], batch_size=2000)
+        aprendices = Aprendiz.objects.bulk_create([
+            Aprendiz(
+                documento_identidad=f'B{marca % 10**8}{numero}',
+                nombre=f'Aprendiz {numero}',
+                apellido='Benchmark',
+                fecha_nacimiento=date(2000, 1, 1),
+                ciudad=azar.choice(CIUDADES)
+            )
+            for numero in range(total_aprendices)
+        ], batch_size=2000)
+        return empresas[0], aprendices[0]
+
+    def _medir(self, descripcion, funcion):
+        inicio = time.monotonic()
+        funcion()
+        duracion = time.monotonic() - inicio
+        self.stdout.write(f'{descripcion:<45} {duracion * 1000:8.1f} ms')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            empresa, aprendiz = self._crear_datos(options['aprendices'], options['empresas'])
+            self.stdout.write(
+                f"{Aprendiz.objects.count()} aprendices, {Empresa.objects.count()} empresas"
+            )
+            self._medir('Empresas para un aprendiz', lambda: recomendar_empresas(aprendiz))
+            self._medir('Aprendices para una empresa', lambda: recomendar_aprendices(empresa))
+            self._medir('Top 5 empresas para todos los aprendices', lambda: recomendar_todos(5))
+            transaction.set_rollback(True)
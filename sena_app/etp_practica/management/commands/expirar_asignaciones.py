@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from etp_practica.expiracion import (
+    TAMANO_LOTE_EXPIRACION,
+    asignaciones_vencidas,
+    dias_expiracion,
+    expirar_asignaciones
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancela las asignaciones PENDIENTE o ASIGNADO sin confirmar después de "
+        "ETP_DIAS_EXPIRACION_ASIGNACION días. Pensado para ejecutarse desde cron, "
+        "p. ej.: 0 2 * * * python manage.py expirar_asignaciones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Antigüedad mínima en días (por defecto la de settings)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_EXPIRACION)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las asignaciones vencidas sin cancelarlas'
+        )
+
+    def handle(self, *args, **options):
+        dias = dias_expiracion() if options['dias'] is None else options['dias']
+
+        if options['dry_run']:
+            vencidas = asignaciones_vencidas(timezone.now() - timedelta(days=dias)).count()
+            self.stdout.write(f'{vencidas} asignación(es) con más de {dias} días sin confirmar.')
+            return
+
+        resultado = expirar_asignaciones(dias, max(1, options['lote']))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['expiradas']} asignación(es) expirada(s) en {resultado['lotes']} lote(s) "
+            f"(asignadas antes del {resultado['limite']:%Y-%m-%d %H:%M})."
+        ))
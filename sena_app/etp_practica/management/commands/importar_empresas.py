@@ -0,0 +1,48 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from etp_practica.importacion_empresas import TAMANO_LOTE_IMPORTACION, importar_empresas
+
+
+class Command(BaseCommand):
+    help = "Crea o actualiza empresas (por NIT) desde un archivo CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='CSV con columnas nombre, nit, direccion, ciudad, telefono, email')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE_IMPORTACION,
+            help='Empresas por lote de inserción'
+        )
+        parser.add_argument(
+            '--errores',
+            help='Escribe el reporte de filas rechazadas en este CSV'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resultado = importar_empresas(archivo, options['lote'])
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        errores = resultado['errores']
+        if options['errores']:
+            with open(options['errores'], 'w', encoding='utf-8', newline='') as salida:
+                escritor = csv.DictWriter(salida, fieldnames=['fila', 'nit', 'mensaje'])
+                escritor.writeheader()
+                escritor.writerows(errores)
+        else:
+            for error in errores:
+                self.stdout.write(f"Fila {error['fila']} (NIT {error['nit'] or '-'}): {error['mensaje']}")
+
+        duracion = resultado['duracion']
+        velocidad = resultado['filas'] / duracion if duracion else 0
+        resumen = (
+            f"{resultado['filas']} fila(s) en {duracion:.2f}s ({velocidad:.0f} filas/s): "
+            f"{resultado['creadas']} creada(s), {resultado['actualizadas']} actualizada(s), "
+            f"{len(errores)} con errores."
+        )
+        self.stdout.write(self.style.WARNING(resumen) if errores else self.style.SUCCESS(resumen))
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from etp_practica.busqueda import indice_disponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo de asignaciones"
+
+    def handle(self, *args, **options):
+        if not indice_disponible():
+            raise CommandError(
+                'El índice de búsqueda no existe. Requiere SQLite con FTS5; ejecute migrate.'
+            )
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            filas = reconstruir_indice()
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice reconstruido: {filas} asignación(es) en {duracion:.2f}s.'
+        ))
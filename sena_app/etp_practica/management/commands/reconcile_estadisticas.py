@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from etp_practica.stats import conciliar_estadisticas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla EmpresaEstadisticas y reporta las diferencias encontradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta las diferencias sin corregirlas'
+        )
+        parser.add_argument(
+            '--empresa',
+            type=int,
+            action='append',
+            dest='empresas',
+            help='Conciliar solo esta empresa (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        aplicar = not options['dry_run']
+        inicio = time.monotonic()
+
+        with transaction.atomic():
+            diferencias = conciliar_estadisticas(options['empresas'], aplicar=aplicar)
+
+        for empresa_id, campo, guardado, real in diferencias:
+            if campo is None:
+                self.stdout.write(f'Empresa {empresa_id}: sin registro de estadísticas')
+            else:
+                self.stdout.write(f'Empresa {empresa_id}: {campo} guardado={guardado} real={real}')
+
+        empresas = len({diferencia[0] for diferencia in diferencias})
+        duracion = time.monotonic() - inicio
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS(f'Sin diferencias ({duracion:.2f}s).'))
+        elif aplicar:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} diferencia(s) corregida(s) en {empresas} empresa(s) ({duracion:.2f}s).'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} diferencia(s) en {empresas} empresa(s); use sin --dry-run para corregir.'
+            ))
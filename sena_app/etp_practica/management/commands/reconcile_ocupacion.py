@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from etp_practica.ocupacion import conciliar_ocupacion
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla OcupacionSemanal y reporta las diferencias encontradas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta las diferencias sin corregirlas'
+        )
+        parser.add_argument(
+            '--empresa',
+            type=int,
+            action='append',
+            dest='empresas',
+            help='Conciliar solo esta empresa (se puede repetir)'
+        )
+
+    def handle(self, *args, **options):
+        aplicar = not options['dry_run']
+        inicio = time.monotonic()
+
+        with transaction.atomic():
+            diferencias = conciliar_ocupacion(options['empresas'], aplicar=aplicar)
+
+        for empresa_id, semana, campo, guardado, real in diferencias:
+            self.stdout.write(
+                f'Empresa {empresa_id}, semana {semana:%Y-%m-%d}: {campo} guardado={guardado} real={real}'
+            )
+
+        semanas = len({diferencia[:2] for diferencia in diferencias})
+        duracion = time.monotonic() - inicio
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS(f'Sin diferencias ({duracion:.2f}s).'))
+        elif aplicar:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} diferencia(s) corregida(s) en {semanas} semana(s) ({duracion:.2f}s).'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(diferencias)} diferencia(s) en {semanas} semana(s); use sin --dry-run para corregir.'
+            ))
@@ -0,0 +1,103 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+CLAVES = {
+    "asignaciones": {
+        "PENDIENTE": "pendientes",
+        "ASIGNADO": "asignados",
+        "CONFIRMADO": "confirmados",
+        "RECHAZADO": "rechazados",
+        "INICIADO": "iniciados",
+        "CANCELADO": "cancelados",
+    },
+    "etapas": {
+        "LECTIVA": "lectivos",
+        "PRODUCTIVA": "productivos",
+        "FINALIZADO": "finalizados",
+        "RETIRADO": "retirados",
+        "APLAZADO": "aplazados",
+    },
+}
+
+
+def poblar_estadisticas(apps, schema_editor):
+    Empresa = apps.get_model("etp_practica", "Empresa")
+    EmpresaEstadisticas = apps.get_model("etp_practica", "EmpresaEstadisticas")
+    modelos = {
+        "asignaciones": apps.get_model("etp_practica", "AsignacionAprendiz"),
+        "etapas": apps.get_model("etp_practica", "EtapaPractica"),
+    }
+
+    valores = {
+        empresa_id: {} for empresa_id in Empresa.objects.values_list("id", flat=True)
+    }
+    for prefijo, modelo in modelos.items():
+        filas = (
+            modelo.objects.order_by()
+            .values("empresa_id", "estado")
+            .annotate(cantidad=Count("id"))
+        )
+        for fila in filas:
+            campos = valores[fila["empresa_id"]]
+            total = f"{prefijo}_total"
+            campos[total] = campos.get(total, 0) + fila["cantidad"]
+            clave = CLAVES[prefijo].get(fila["estado"])
+            if clave:
+                campos[f"{prefijo}_{clave}"] = fila["cantidad"]
+
+    EmpresaEstadisticas.objects.bulk_create(
+        [
+            EmpresaEstadisticas(empresa_id=empresa_id, **campos)
+            for empresa_id, campos in valores.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "etp_practica",
+            "0002_asignacionaprendiz_etapapractica_asignacion_origen_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmpresaEstadisticas",
+            fields=[
+                (
+                    "empresa",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="estadisticas",
+                        serialize=False,
+                        to="etp_practica.empresa",
+                    ),
+                ),
+                ("asignaciones_total", models.IntegerField(default=0)),
+                ("asignaciones_pendientes", models.IntegerField(default=0)),
+                ("asignaciones_asignados", models.IntegerField(default=0)),
+                ("asignaciones_confirmados", models.IntegerField(default=0)),
+                ("asignaciones_rechazados", models.IntegerField(default=0)),
+                ("asignaciones_iniciados", models.IntegerField(default=0)),
+                ("asignaciones_cancelados", models.IntegerField(default=0)),
+                ("etapas_total", models.IntegerField(default=0)),
+                ("etapas_lectivos", models.IntegerField(default=0)),
+                ("etapas_productivos", models.IntegerField(default=0)),
+                ("etapas_finalizados", models.IntegerField(default=0)),
+                ("etapas_retirados", models.IntegerField(default=0)),
+                ("etapas_aplazados", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Estadísticas de Empresa",
+                "verbose_name_plural": "Estadísticas de Empresas",
+            },
+        ),
+        migrations.RunPython(poblar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Índice de búsqueda de texto completo (SQLite FTS5) para asignaciones
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+TABLA = "etp_practica_busqueda_asignacion"
+
+SELECT_ASIGNACION = """
+    SELECT s.id, a.nombre, a.apellido, a.documento_identidad, e.nombre, s.tutor_propuesto
+    FROM etp_practica_asignacionaprendiz s
+    JOIN aprendices_aprendiz a ON a.id = s.aprendiz_id
+    JOIN etp_practica_empresa e ON e.id = s.empresa_id
+"""
+
+COLUMNAS = (
+    "(rowid, aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor)"
+)
+
+CREAR = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLA} USING fts5(
+        aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"INSERT INTO {TABLA} {COLUMNAS} {SELECT_ASIGNACION}",
+    f"""
+    CREATE TRIGGER {TABLA}_asignacion_ai
+    AFTER INSERT ON etp_practica_asignacionaprendiz
+    BEGIN
+        INSERT INTO {TABLA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLA}_asignacion_au
+    AFTER UPDATE OF aprendiz_id, empresa_id, tutor_propuesto
+    ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA} WHERE rowid = old.id;
+        INSERT INTO {TABLA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLA}_asignacion_ad
+    AFTER DELETE ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLA}_aprendiz_au
+    AFTER UPDATE OF nombre, apellido, documento_identidad ON aprendices_aprendiz
+    BEGIN
+        DELETE FROM {TABLA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE aprendiz_id = new.id
+        );
+        INSERT INTO {TABLA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.aprendiz_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABLA}_empresa_au
+    AFTER UPDATE OF nombre ON etp_practica_empresa
+    BEGIN
+        DELETE FROM {TABLA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE empresa_id = new.id
+        );
+        INSERT INTO {TABLA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.empresa_id = new.id;
+    END
+    """,
+]
+
+ELIMINAR = [
+    f"DROP TRIGGER IF EXISTS {TABLA}_asignacion_ai",
+    f"DROP TRIGGER IF EXISTS {TABLA}_asignacion_au",
+    f"DROP TRIGGER IF EXISTS {TABLA}_asignacion_ad",
+    f"DROP TRIGGER IF EXISTS {TABLA}_aprendiz_au",
+    f"DROP TRIGGER IF EXISTS {TABLA}_empresa_au",
+    f"DROP TABLE IF EXISTS {TABLA}",
+]
+
+
+def crear_indice(apps, schema_editor):
+    # Solo SQLite; en otros motores la búsqueda usa icontains
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        for sql in CREAR:
+            schema_editor.execute(sql)
+    except OperationalError:
+        # SQLite compilado sin FTS5
+        for sql in ELIMINAR:
+            schema_editor.execute(sql)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in ELIMINAR:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+        ("etp_practica", "0003_empresaestadisticas"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ESTADOS_ACTIVOS = ["PENDIENTE", "ASIGNADO", "CONFIRMADO", "INICIADO"]
+
+
+def poblar_asignaciones_activas(apps, schema_editor):
+    AsignacionAprendiz = apps.get_model("etp_practica", "AsignacionAprendiz")
+    AsignacionActiva = apps.get_model("etp_practica", "AsignacionActiva")
+
+    # Si un aprendiz tiene varias activas se marca la más reciente
+    activas = (
+        AsignacionAprendiz.objects.filter(estado__in=ESTADOS_ACTIVOS)
+        .order_by("aprendiz_id", "-fecha_asignacion", "-id")
+        .values_list("aprendiz_id", "id")
+    )
+    marcadores = {}
+    for aprendiz_id, asignacion_id in activas.iterator(chunk_size=2000):
+        marcadores.setdefault(aprendiz_id, asignacion_id)
+
+    AsignacionActiva.objects.bulk_create(
+        [
+            AsignacionActiva(aprendiz_id=aprendiz_id, asignacion_id=asignacion_id)
+            for aprendiz_id, asignacion_id in marcadores.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+        ("etp_practica", "0004_busqueda_asignacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AsignacionActiva",
+            fields=[
+                (
+                    "aprendiz",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="asignacion_activa",
+                        serialize=False,
+                        to="aprendices.aprendiz",
+                    ),
+                ),
+                (
+                    "asignacion",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="marcador_activo",
+                        to="etp_practica.asignacionaprendiz",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Asignación Activa",
+                "verbose_name_plural": "Asignaciones Activas",
+            },
+        ),
+        migrations.RunPython(poblar_asignaciones_activas, migrations.RunPython.noop),
+    ]
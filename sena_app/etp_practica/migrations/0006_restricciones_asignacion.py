@@ -0,0 +1,169 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:35
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+ESTADOS_ACTIVOS = ["PENDIENTE", "ASIGNADO", "CONFIRMADO", "INICIADO"]
+
+# Máximo de casos listados por tipo de violación
+LIMITE_REPORTE = 50
+
+
+def reportar_violaciones(apps, schema_editor):
+    """
+    Detecta en bloque los datos que impedirían crear las restricciones y
+    aborta la migración con un reporte en lugar de fallar a mitad de camino.
+    """
+    AsignacionAprendiz = apps.get_model("etp_practica", "AsignacionAprendiz")
+
+    duplicadas = list(
+        AsignacionAprendiz.objects.filter(estado__in=ESTADOS_ACTIVOS)
+        .order_by()
+        .values("aprendiz_id")
+        .annotate(cantidad=Count("id"))
+        .filter(cantidad__gt=1)
+        .values_list("aprendiz_id", "cantidad")
+    )
+    fechas_invalidas = list(
+        AsignacionAprendiz.objects.filter(
+            fecha_fin_propuesta__lte=F("fecha_inicio_propuesta")
+        ).values_list("id", flat=True)
+    )
+    if not duplicadas and not fechas_invalidas:
+        return
+
+    lineas = ["No se pueden crear las restricciones de AsignacionAprendiz."]
+    if duplicadas:
+        lineas.append(
+            f"{len(duplicadas)} aprendiz(ces) con más de una asignación activa "
+            "(aprendiz_id: cantidad):"
+        )
+        lineas += [
+            f"  {aprendiz_id}: {cantidad}"
+            for aprendiz_id, cantidad in duplicadas[:LIMITE_REPORTE]
+        ]
+    if fechas_invalidas:
+        lineas.append(
+            f"{len(fechas_invalidas)} asignación(es) con fecha_fin_propuesta "
+            "<= fecha_inicio_propuesta (ids):"
+        )
+        lineas.append("  " + ", ".join(map(str, fechas_invalidas[:LIMITE_REPORTE])))
+    lineas.append("Corrija o cancele esos registros y vuelva a ejecutar migrate.")
+    raise RuntimeError("\n".join(lineas))
+
+
+# Triggers del índice de búsqueda (etp_practica 0004), copiados tal como
+# están en este punto de las migraciones. SQLite falla al reconstruir una
+# tabla que los triggers referencian: se retiran antes de las operaciones
+# y se recrean después, dentro de la misma migración.
+TABLA_BUSQUEDA = "etp_practica_busqueda_asignacion"
+
+SELECT_ASIGNACION = """
+    SELECT s.id, a.nombre, a.apellido, a.documento_identidad, e.nombre, s.tutor_propuesto
+    FROM etp_practica_asignacionaprendiz s
+    JOIN aprendices_aprendiz a ON a.id = s.aprendiz_id
+    JOIN etp_practica_empresa e ON e.id = s.empresa_id
+"""
+
+COLUMNAS = (
+    "(rowid, aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor)"
+)
+
+TRIGGERS = {
+    "asignacion_ai": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ai
+    AFTER INSERT ON etp_practica_asignacionaprendiz
+    BEGIN
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_au
+    AFTER UPDATE OF aprendiz_id, empresa_id, tutor_propuesto
+    ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_ad": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ad
+    AFTER DELETE ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+    END
+    """,
+    "aprendiz_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_aprendiz_au
+    AFTER UPDATE OF nombre, apellido, documento_identidad ON aprendices_aprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE aprendiz_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.aprendiz_id = new.id;
+    END
+    """,
+    "empresa_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_empresa_au
+    AFTER UPDATE OF nombre ON etp_practica_empresa
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE empresa_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.empresa_id = new.id;
+    END
+    """,
+}
+
+
+def retirar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_BUSQUEDA}_{nombre}")
+
+
+def instalar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    # Sin la tabla FTS5 (SQLite compilado sin FTS5) no hay triggers
+    if TABLA_BUSQUEDA not in schema_editor.connection.introspection.table_names():
+        return
+    for sql in TRIGGERS.values():
+        schema_editor.execute(sql)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+        ("etp_practica", "0005_asignacionactiva"),
+    ]
+
+    operations = [
+        migrations.RunPython(retirar_triggers, instalar_triggers),
+        migrations.RunPython(reportar_violaciones, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="asignacionaprendiz",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("estado__in", ["PENDIENTE", "ASIGNADO", "CONFIRMADO", "INICIADO"])
+                ),
+                fields=("aprendiz",),
+                name="asignacion_activa_unica_por_aprendiz",
+                violation_error_message="Este aprendiz ya tiene una asignación activa.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="asignacionaprendiz",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("fecha_fin_propuesta__gt", models.F("fecha_inicio_propuesta"))
+                ),
+                name="asignacion_fechas_validas",
+                violation_error_message="La fecha de fin debe ser posterior a la fecha de inicio.",
+            ),
+        ),
+        migrations.RunPython(instalar_triggers, retirar_triggers),
+    ]
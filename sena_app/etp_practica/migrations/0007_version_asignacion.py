@@ -0,0 +1,106 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+# Triggers del índice de búsqueda (etp_practica 0004), copiados tal como
+# están en este punto de las migraciones. SQLite falla al reconstruir una
+# tabla que los triggers referencian: se retiran antes de las operaciones
+# y se recrean después, dentro de la misma migración.
+TABLA_BUSQUEDA = "etp_practica_busqueda_asignacion"
+
+SELECT_ASIGNACION = """
+    SELECT s.id, a.nombre, a.apellido, a.documento_identidad, e.nombre, s.tutor_propuesto
+    FROM etp_practica_asignacionaprendiz s
+    JOIN aprendices_aprendiz a ON a.id = s.aprendiz_id
+    JOIN etp_practica_empresa e ON e.id = s.empresa_id
+"""
+
+COLUMNAS = (
+    "(rowid, aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor)"
+)
+
+TRIGGERS = {
+    "asignacion_ai": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ai
+    AFTER INSERT ON etp_practica_asignacionaprendiz
+    BEGIN
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_au
+    AFTER UPDATE OF aprendiz_id, empresa_id, tutor_propuesto
+    ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_ad": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ad
+    AFTER DELETE ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+    END
+    """,
+    "aprendiz_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_aprendiz_au
+    AFTER UPDATE OF nombre, apellido, documento_identidad ON aprendices_aprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE aprendiz_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.aprendiz_id = new.id;
+    END
+    """,
+    "empresa_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_empresa_au
+    AFTER UPDATE OF nombre ON etp_practica_empresa
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE empresa_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.empresa_id = new.id;
+    END
+    """,
+}
+
+
+def retirar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_BUSQUEDA}_{nombre}")
+
+
+def instalar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    # Sin la tabla FTS5 (SQLite compilado sin FTS5) no hay triggers
+    if TABLA_BUSQUEDA not in schema_editor.connection.introspection.table_names():
+        return
+    for sql in TRIGGERS.values():
+        schema_editor.execute(sql)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0006_restricciones_asignacion"),
+    ]
+
+    operations = [
+        migrations.RunPython(retirar_triggers, instalar_triggers),
+        migrations.AddField(
+            model_name="asignacionaprendiz",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Se incrementa en cada escritura (control de concurrencia optimista)",
+            ),
+        ),
+        migrations.RunPython(instalar_triggers, retirar_triggers),
+    ]
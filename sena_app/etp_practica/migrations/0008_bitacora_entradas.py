@@ -0,0 +1,88 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:42
+
+import django.db.models.deletion
+import django.utils.timezone
+import re
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+TAMANO_LOTE = 500
+
+
+def dividir_texto(texto):
+    """Cada bloque separado por líneas en blanco pasa a ser una entrada"""
+    return [bloque.strip() for bloque in re.split(r"\n\s*\n", texto) if bloque.strip()]
+
+
+def dividir_bitacoras(apps, schema_editor):
+    EtapaPractica = apps.get_model("etp_practica", "EtapaPractica")
+    BitacoraEntrada = apps.get_model("etp_practica", "BitacoraEntrada")
+
+    etapas = (
+        EtapaPractica.objects.exclude(bitacora="")
+        .order_by("id")
+        .only("id", "fecha_inicio", "bitacora")
+    )
+    entradas = []
+    for etapa in etapas.iterator(chunk_size=TAMANO_LOTE):
+        # El texto no tiene fechas: las entradas conservan el orden
+        # original con la fecha de inicio de la etapa
+        fecha = datetime.combine(etapa.fecha_inicio, time.min)
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        for texto in dividir_texto(etapa.bitacora):
+            entradas.append(
+                BitacoraEntrada(etapa_id=etapa.id, fecha=fecha, texto=texto)
+            )
+        if len(entradas) >= TAMANO_LOTE:
+            BitacoraEntrada.objects.bulk_create(entradas)
+            entradas = []
+    BitacoraEntrada.objects.bulk_create(entradas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0007_version_asignacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BitacoraEntrada",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                ("autor", models.CharField(blank=True, max_length=100)),
+                ("texto", models.TextField()),
+                (
+                    "etapa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entradas_bitacora",
+                        to="etp_practica.etapapractica",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entrada de Bitácora",
+                "verbose_name_plural": "Entradas de Bitácora",
+                "ordering": ["-fecha", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["etapa", "fecha"], name="etp_practic_etapa_i_ff12c2_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(dividir_bitacoras, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:42
+
+from django.db import migrations
+
+
+def unir_bitacoras(apps, schema_editor):
+    """Reverso: reconstruye el texto de cada etapa a partir de sus entradas"""
+    EtapaPractica = apps.get_model("etp_practica", "EtapaPractica")
+    BitacoraEntrada = apps.get_model("etp_practica", "BitacoraEntrada")
+
+    textos = {}
+    entradas = BitacoraEntrada.objects.order_by("etapa_id", "fecha", "id").values_list(
+        "etapa_id", "texto"
+    )
+    for etapa_id, texto in entradas.iterator(chunk_size=2000):
+        textos.setdefault(etapa_id, []).append(texto)
+
+    etapas = [
+        EtapaPractica(id=etapa_id, bitacora="\n\n".join(bloques))
+        for etapa_id, bloques in textos.items()
+    ]
+    EtapaPractica.objects.bulk_update(etapas, ["bitacora"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0008_bitacora_entradas"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, unir_bitacoras),
+        migrations.RemoveField(
+            model_name="etapapractica",
+            name="bitacora",
+        ),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+TAMANO_LOTE = 500
+
+# Prefijos con los que las transiciones anexaban texto a observaciones
+PREFIJOS = {
+    "Confirmado: ": "CONFIRMAR",
+    "Motivo de rechazo: ": "RECHAZAR",
+    "Cancelado: ": "CANCELAR",
+}
+
+
+def separar_observaciones(texto):
+    """
+    Devuelve (nota libre, [(tipo, texto)]). Cada línea que empieza con un
+    prefijo conocido abre un evento; las líneas siguientes le pertenecen.
+    """
+    libres = []
+    eventos = []
+    for linea in texto.split("\n"):
+        tipo = next(
+            (tipo for prefijo, tipo in PREFIJOS.items() if linea.startswith(prefijo)),
+            None,
+        )
+        if tipo:
+            eventos.append([tipo, linea.split(": ", 1)[1]])
+        elif eventos:
+            eventos[-1][1] += "\n" + linea
+        else:
+            libres.append(linea)
+    return "\n".join(libres).strip(), [(tipo, texto.strip()) for tipo, texto in eventos]
+
+
+def migrar_observaciones(apps, schema_editor):
+    AsignacionAprendiz = apps.get_model("etp_practica", "AsignacionAprendiz")
+    AsignacionEvento = apps.get_model("etp_practica", "AsignacionEvento")
+
+    asignaciones = (
+        AsignacionAprendiz.objects.exclude(observaciones="")
+        .order_by("id")
+        .only("id", "observaciones", "fecha_actualizacion")
+    )
+    eventos = []
+    modificadas = []
+
+    def guardar_lote():
+        AsignacionEvento.objects.bulk_create(eventos)
+        AsignacionAprendiz.objects.bulk_update(modificadas, ["observaciones"])
+        eventos.clear()
+        modificadas.clear()
+
+    for asignacion in asignaciones.iterator(chunk_size=TAMANO_LOTE):
+        nota, separados = separar_observaciones(asignacion.observaciones)
+        if not separados:
+            continue
+        for tipo, texto in separados:
+            eventos.append(
+                AsignacionEvento(
+                    asignacion_id=asignacion.id,
+                    tipo=tipo,
+                    texto=texto,
+                    fecha=asignacion.fecha_actualizacion,
+                )
+            )
+        asignacion.observaciones = nota
+        modificadas.append(asignacion)
+        if len(modificadas) >= TAMANO_LOTE:
+            guardar_lote()
+    guardar_lote()
+
+
+def restaurar_observaciones(apps, schema_editor):
+    AsignacionAprendiz = apps.get_model("etp_practica", "AsignacionAprendiz")
+    AsignacionEvento = apps.get_model("etp_practica", "AsignacionEvento")
+
+    prefijos = {tipo: prefijo for prefijo, tipo in PREFIJOS.items()}
+    prefijos["COMENTARIO"] = ""
+    anexos = {}
+    eventos = (
+        AsignacionEvento.objects.filter(tipo__in=prefijos)
+        .order_by("asignacion_id", "fecha", "id")
+        .values_list("asignacion_id", "tipo", "texto")
+    )
+    for asignacion_id, tipo, texto in eventos.iterator(chunk_size=2000):
+        if texto:
+            anexos.setdefault(asignacion_id, []).append(f"\n{prefijos[tipo]}{texto}")
+
+    asignaciones = AsignacionAprendiz.objects.filter(id__in=anexos).only(
+        "id", "observaciones"
+    )
+    modificadas = []
+    for asignacion in asignaciones.iterator(chunk_size=TAMANO_LOTE):
+        asignacion.observaciones += "".join(anexos[asignacion.id])
+        modificadas.append(asignacion)
+    AsignacionAprendiz.objects.bulk_update(
+        modificadas, ["observaciones"], batch_size=TAMANO_LOTE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0009_quitar_bitacora_texto"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AsignacionEvento",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("CONFIRMAR", "Confirmación"),
+                            ("RECHAZAR", "Rechazo"),
+                            ("INICIAR", "Inicio de etapa práctica"),
+                            ("CANCELAR", "Cancelación"),
+                            ("COMENTARIO", "Comentario"),
+                        ],
+                        max_length=15,
+                    ),
+                ),
+                ("texto", models.TextField(blank=True)),
+                ("usuario", models.CharField(blank=True, max_length=100)),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "asignacion",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eventos",
+                        to="etp_practica.asignacionaprendiz",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de Asignación",
+                "verbose_name_plural": "Eventos de Asignación",
+                "ordering": ["-fecha", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["asignacion", "fecha"],
+                        name="etp_practic_asignac_81a591_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(migrar_observaciones, restaurar_observaciones),
+    ]
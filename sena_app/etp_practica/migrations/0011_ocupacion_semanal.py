@@ -0,0 +1,122 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:57
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+# (modelo, campo de OcupacionSemanal, estados que ocupan cupo, inicio, fin)
+ORIGENES = [
+    (
+        "AsignacionAprendiz",
+        "asignaciones",
+        ["PENDIENTE", "ASIGNADO", "CONFIRMADO"],
+        "fecha_inicio_propuesta",
+        "fecha_fin_propuesta",
+    ),
+    ("EtapaPractica", "etapas", ["PRODUCTIVA"], "fecha_inicio", "fecha_fin"),
+]
+
+DURACION_ETAPA_SIN_FIN = timedelta(days=182)
+
+
+def lunes(fecha):
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def poblar_ocupacion(apps, schema_editor):
+    OcupacionSemanal = apps.get_model("etp_practica", "OcupacionSemanal")
+    ocupacion = {}
+    for nombre, campo, estados, inicio, fin in ORIGENES:
+        modelo = apps.get_model("etp_practica", nombre)
+        periodos = (
+            modelo.objects.filter(estado__in=estados)
+            .order_by()
+            .values_list("empresa_id", inicio, fin)
+            .annotate(cantidad=Count("id"))
+        )
+        for empresa_id, fecha_inicio, fecha_fin, cantidad in periodos:
+            if fecha_fin is None:
+                fecha_fin = fecha_inicio + DURACION_ETAPA_SIN_FIN
+            semana = lunes(fecha_inicio)
+            while semana <= lunes(max(fecha_inicio, fecha_fin)):
+                valores = ocupacion.setdefault((empresa_id, semana), {})
+                valores[campo] = valores.get(campo, 0) + cantidad
+                semana += timedelta(weeks=1)
+
+    OcupacionSemanal.objects.bulk_create(
+        [
+            OcupacionSemanal(empresa_id=empresa_id, semana=semana, **valores)
+            for (empresa_id, semana), valores in ocupacion.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+        ("etp_practica", "0010_eventos_asignacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OcupacionSemanal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("semana", models.DateField(help_text="Lunes de la semana")),
+                ("asignaciones", models.IntegerField(default=0)),
+                ("etapas", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Ocupación Semanal",
+                "verbose_name_plural": "Ocupación Semanal",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="asignacionaprendiz",
+            index=models.Index(
+                fields=["empresa", "fecha_inicio_propuesta", "fecha_fin_propuesta"],
+                name="etp_practic_empresa_f59375_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="etapapractica",
+            index=models.Index(
+                fields=["empresa", "fecha_inicio", "fecha_fin"],
+                name="etp_practic_empresa_4da319_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ocupacionsemanal",
+            name="empresa",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ocupacion_semanal",
+                to="etp_practica.empresa",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ocupacionsemanal",
+            index=models.Index(
+                fields=["semana", "empresa"], name="etp_practic_semana_639431_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ocupacionsemanal",
+            constraint=models.UniqueConstraint(
+                fields=("empresa", "semana"), name="ocupacion_semana_unica"
+            ),
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0011_ocupacion_semanal"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="asignacionevento",
+            name="tipo",
+            field=models.CharField(
+                choices=[
+                    ("CONFIRMAR", "Confirmación"),
+                    ("RECHAZAR", "Rechazo"),
+                    ("INICIAR", "Inicio de etapa práctica"),
+                    ("CANCELAR", "Cancelación"),
+                    ("EXPIRAR", "Expiración"),
+                    ("COMENTARIO", "Comentario"),
+                ],
+                max_length=15,
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:00
+
+from django.db import migrations, models
+
+
+# Triggers del índice de búsqueda (etp_practica 0004), copiados tal como
+# están en este punto de las migraciones. SQLite falla al reconstruir una
+# tabla que los triggers referencian: se retiran antes de las operaciones
+# y se recrean después, dentro de la misma migración.
+TABLA_BUSQUEDA = "etp_practica_busqueda_asignacion"
+
+SELECT_ASIGNACION = """
+    SELECT s.id, a.nombre, a.apellido, a.documento_identidad, e.nombre, s.tutor_propuesto
+    FROM etp_practica_asignacionaprendiz s
+    JOIN aprendices_aprendiz a ON a.id = s.aprendiz_id
+    JOIN etp_practica_empresa e ON e.id = s.empresa_id
+"""
+
+COLUMNAS = (
+    "(rowid, aprendiz_nombre, aprendiz_apellido, documento, empresa_nombre, tutor)"
+)
+
+TRIGGERS = {
+    "asignacion_ai": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ai
+    AFTER INSERT ON etp_practica_asignacionaprendiz
+    BEGIN
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_au
+    AFTER UPDATE OF aprendiz_id, empresa_id, tutor_propuesto
+    ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.id = new.id;
+    END
+    """,
+    "asignacion_ad": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_asignacion_ad
+    AFTER DELETE ON etp_practica_asignacionaprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = old.id;
+    END
+    """,
+    "aprendiz_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_aprendiz_au
+    AFTER UPDATE OF nombre, apellido, documento_identidad ON aprendices_aprendiz
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE aprendiz_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.aprendiz_id = new.id;
+    END
+    """,
+    "empresa_au": f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA}_empresa_au
+    AFTER UPDATE OF nombre ON etp_practica_empresa
+    BEGIN
+        DELETE FROM {TABLA_BUSQUEDA} WHERE rowid IN (
+            SELECT id FROM etp_practica_asignacionaprendiz WHERE empresa_id = new.id
+        );
+        INSERT INTO {TABLA_BUSQUEDA} {COLUMNAS} {SELECT_ASIGNACION} WHERE s.empresa_id = new.id;
+    END
+    """,
+}
+
+
+def retirar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for nombre in TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_BUSQUEDA}_{nombre}")
+
+
+def instalar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    # Sin la tabla FTS5 (SQLite compilado sin FTS5) no hay triggers
+    if TABLA_BUSQUEDA not in schema_editor.connection.introspection.table_names():
+        return
+    for sql in TRIGGERS.values():
+        schema_editor.execute(sql)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aprendices", "0002_alter_aprendiz_options_remove_aprendiz_programa_and_more"),
+        ("etp_practica", "0012_evento_expiracion"),
+    ]
+
+    operations = [
+        migrations.RunPython(retirar_triggers, instalar_triggers),
+        migrations.AddField(
+            model_name="empresa",
+            name="fecha_actualizacion",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="etapapractica",
+            name="fecha_actualizacion",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="asignacionaprendiz",
+            index=models.Index(
+                fields=["empresa", "fecha_actualizacion"],
+                name="etp_practic_empresa_9a4d28_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="etapapractica",
+            index=models.Index(
+                fields=["empresa", "fecha_actualizacion"],
+                name="etp_practic_empresa_f8a3c2_idx",
+            ),
+        ),
+        migrations.RunPython(instalar_triggers, retirar_triggers),
+    ]
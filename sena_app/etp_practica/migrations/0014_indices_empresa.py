@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0013_fecha_actualizacion"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="empresa",
+            index=models.Index(fields=["nombre"], name="etp_practic_nombre_9979d8_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="empresa",
+            index=models.Index(
+                fields=["ciudad", "nombre"], name="etp_practic_ciudad_b15f66_idx"
+            ),
+        ),
+    ]
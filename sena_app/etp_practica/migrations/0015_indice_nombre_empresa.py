@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:31
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("etp_practica", "0014_indices_empresa"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="empresa",
+            index=models.Index(
+                django.db.models.functions.text.Lower("nombre"),
+                name="empresa_nombre_minusculas_idx",
+            ),
+        ),
+    ]
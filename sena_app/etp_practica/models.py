@@ -1,8 +1,35 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from aprendices.models import Aprendiz
 
+# Clave usada en los contadores de estadísticas para cada estado
+CLAVES_ASIGNACION = {
+    'PENDIENTE': 'pendientes',
+    'ASIGNADO': 'asignados',
+    'CONFIRMADO': 'confirmados',
+    'RECHAZADO': 'rechazados',
+    'INICIADO': 'iniciados',
+    'CANCELADO': 'cancelados',
+}
+
+CLAVES_ETAPA = {
+    'LECTIVA': 'lectivos',
+    'PRODUCTIVA': 'productivos',
+    'FINALIZADO': 'finalizados',
+    'RETIRADO': 'retirados',
+    'APLAZADO': 'aplazados',
+}
+
+# Duración supuesta de una etapa sin fecha de fin al calcular su ocupación
+DURACION_ETAPA_SIN_FIN = timedelta(days=182)
+
+# Marca un valor en base de datos que no se conoce (campos diferidos)
+_DESCONOCIDO = object()
+
 class Empresa(models.Model):
     nombre = models.CharField(max_length=100)
     nit = models.CharField(max_length=50, unique=True)
@@ -10,6 +37,7 @@ class Empresa(models.Model):
     ciudad = models.CharField(max_length=50)
     telefono = models.CharField(max_length=15)
     email = models.EmailField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -17,8 +45,248 @@ class Empresa(models.Model):
     class Meta:
         verbose_name = "Empresa"
         verbose_name_plural = "Empresas"
+        indexes = [
+            models.Index(fields=['nombre']),
+            models.Index(fields=['ciudad', 'nombre']),
+            # Búsqueda por inicio del nombre sin distinguir mayúsculas
+            models.Index(Lower('nombre'), name='empresa_nombre_minusculas_idx'),
+        ]
+
+class ContadorEstadoMixin:
+    """
+    Mantiene los contadores de EmpresaEstadisticas y la OcupacionSemanal
+    cuando un registro se crea o cambia de estado, empresa o fechas. Los
+    borrados se registran con
+    la señal post_delete (ver signals.py) para cubrir también las
+    eliminaciones en cascada.
+    """
+    prefijo_estadisticas = None
+    claves_estadisticas = None
+
+    # Columna de OcupacionSemanal, estados que ocupan cupo y campos
+    # (inicio, fin) del periodo
+    campo_ocupacion = None
+    estados_ocupacion = ()
+    campos_periodo = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._recordar_estado_guardado()
+        return instancia
+
+    def _recordar_estado_guardado(self):
+        # Si el estado o la empresa se difirieron (.only/.defer) no se
+        # conoce el valor en base de datos y no se ajustan los contadores
+        if 'estado' in self.__dict__ and 'empresa_id' in self.__dict__:
+            self._estado_guardado = (self.empresa_id, self.estado)
+        else:
+            self._estado_guardado = None
+
+        campos = ('empresa_id', 'estado', *self.campos_periodo)
+        if all(campo in self.__dict__ for campo in campos):
+            self._periodo_guardado = self.periodo_ocupacion()
+        else:
+            self._periodo_guardado = _DESCONOCIDO
+
+    def estado_para_estadisticas(self):
+        """(empresa_id, estado) tal como está en la base de datos"""
+        return getattr(self, '_estado_guardado', None) or (self.empresa_id, self.estado)
+
+    def periodo_ocupacion(self):
+        """(empresa_id, lunes inicial, lunes final) si ocupa cupo; si no, None"""
+        if self.estado not in self.estados_ocupacion:
+            return None
+        inicio, fin = (getattr(self, campo) for campo in self.campos_periodo)
+        return OcupacionSemanal.periodo(self.empresa_id, inicio, fin)
+
+    def periodo_para_ocupacion(self):
+        """Periodo de ocupación tal como está en la base de datos"""
+        periodo = getattr(self, '_periodo_guardado', _DESCONOCIDO)
+        return self.periodo_ocupacion() if periodo is _DESCONOCIDO else periodo
+
+    def save(self, *args, **kwargs):
+        creado = self._state.adding
+        anterior = None if creado else getattr(self, '_estado_guardado', None)
+        periodo_anterior = None if creado else getattr(self, '_periodo_guardado', _DESCONOCIDO)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.registrar_estado(creado, anterior)
+            self.registrar_ocupacion(periodo_anterior)
+        self._recordar_estado_guardado()
+
+    def registrar_estado(self, creado, anterior):
+        """
+        Ajusta las tablas derivadas dentro de la transacción del save().
+        anterior es None si el registro es nuevo o si no se conoce su valor
+        en base de datos; en ese último caso no se tocan los contadores.
+        """
+        if creado or anterior is not None:
+            EmpresaEstadisticas.registrar_cambio(
+                self.prefijo_estadisticas,
+                self.claves_estadisticas,
+                anterior,
+                (self.empresa_id, self.estado)
+            )
+
+    def registrar_ocupacion(self, periodo_anterior):
+        """
+        Mueve el registro en OcupacionSemanal si cambió su periodo o dejó
+        de ocupar cupo. No hace nada si no se conoce el periodo anterior.
+        """
+        if periodo_anterior is not _DESCONOCIDO:
+            OcupacionSemanal.registrar_cambio(
+                self.campo_ocupacion, periodo_anterior, self.periodo_ocupacion()
+            )
+
+
+class AsignacionAprendizQuerySet(models.QuerySet):
+    """
+    Transiciones de estado en bloque: un UPDATE condicionado por el estado
+    de origen en lugar de un save() por registro. Mantienen los contadores
+    de EmpresaEstadisticas, la OcupacionSemanal, los marcadores de
+    AsignacionActiva y registran un AsignacionEvento por asignación.
+    """
+
+    def _transicion(self, transicion, texto="", usuario="", **cambios):
+        """
+        Aplica una transición de AsignacionAprendiz.TRANSICIONES a las
+        asignaciones del queryset que estén en un estado de origen válido.
+        Devuelve las filas (id, empresa_id, estado anterior) afectadas.
+        """
+        desde, hacia = self.model.TRANSICIONES[transicion]
+        ahora = timezone.now()
+        with transaction.atomic(using=self.db):
+            filas = list(
+                self.filter(estado__in=desde)
+                .select_for_update()
+                .order_by()
+                .values_list(
+                    'id', 'empresa_id', 'estado',
+                    'fecha_inicio_propuesta', 'fecha_fin_propuesta'
+                )
+            )
+            if not filas:
+                return filas
+
+            ids = [fila[0] for fila in filas]
+            self.model._base_manager.using(self.db).filter(
+                id__in=ids, estado__in=desde
+            ).update(
+                estado=hacia,
+                version=F('version') + 1,
+                fecha_actualizacion=ahora,
+                **cambios
+            )
+
+            deltas = {}
+            ocupacion = {}
+            ocupa_despues = hacia in self.model.estados_ocupacion
+            for _, empresa_id, estado, inicio, fin in filas:
+                deltas[(empresa_id, estado)] = deltas.get((empresa_id, estado), 0) - 1
+                deltas[(empresa_id, hacia)] = deltas.get((empresa_id, hacia), 0) + 1
+                if (estado in self.model.estados_ocupacion) != ocupa_despues:
+                    periodo = OcupacionSemanal.periodo(empresa_id, inicio, fin)
+                    ocupacion[periodo] = ocupacion.get(periodo, 0) + (1 if ocupa_despues else -1)
+            EmpresaEstadisticas.ajustar_contadores('asignaciones', CLAVES_ASIGNACION, deltas)
+            OcupacionSemanal.ajustar('asignaciones', ocupacion)
+
+            if hacia not in self.model.ESTADOS_ACTIVOS:
+                AsignacionActiva.objects.using(self.db).filter(asignacion_id__in=ids).delete()
+
+            AsignacionEvento.objects.using(self.db).bulk_create([
+                AsignacionEvento(
+                    asignacion_id=asignacion_id,
+                    tipo=transicion.upper(),
+                    texto=texto,
+                    usuario=usuario,
+                    fecha=ahora
+                )
+                for asignacion_id in ids
+            ])
+        return [fila[:3] for fila in filas]
+
+    def confirmar(self, usuario=""):
+        """Confirma las asignaciones en estado ASIGNADO. Devuelve cuántas cambiaron"""
+        return len(self._transicion('confirmar', usuario=usuario, fecha_confirmacion=timezone.now()))
+
+    def rechazar(self, motivo="", usuario=""):
+        """Rechaza las asignaciones PENDIENTE o ASIGNADO. Devuelve cuántas cambiaron"""
+        return len(self._transicion('rechazar', motivo, usuario))
+
+    def expirar(self, motivo="", usuario=""):
+        """Cancela por expiración las asignaciones PENDIENTE o ASIGNADO. Devuelve cuántas cambiaron"""
+        return len(self._transicion('expirar', motivo, usuario))
+
+    def iniciar(self, usuario=""):
+        """
+        Inicia la etapa práctica de las asignaciones CONFIRMADO y crea sus
+        EtapaPractica con un solo bulk_create. Devuelve las etapas creadas.
+        """
+        with transaction.atomic(using=self.db):
+            filas = self._transicion('iniciar', usuario=usuario)
+            if not filas:
+                return []
+
+            asignaciones = self.model._base_manager.using(self.db).filter(
+                id__in=[fila[0] for fila in filas]
+            ).values(
+                'id', 'aprendiz_id', 'empresa_id', 'tutor_propuesto',
+                'fecha_inicio_propuesta', 'fecha_fin_propuesta', 'objetivos_propuestos'
+            )
+            etapas = EtapaPractica.objects.using(self.db).bulk_create([
+                EtapaPractica(
+                    aprendiz_id=asignacion['aprendiz_id'],
+                    empresa_id=asignacion['empresa_id'],
+                    tutor=asignacion['tutor_propuesto'],
+                    fecha_inicio=asignacion['fecha_inicio_propuesta'],
+                    fecha_fin=asignacion['fecha_fin_propuesta'],
+                    objetivos=asignacion['objetivos_propuestos'],
+                    estado='PRODUCTIVA',
+                    asignacion_origen_id=asignacion['id']
+                )
+                for asignacion in asignaciones
+            ])
+
+            deltas = {}
+            ocupacion = {}
+            for etapa in etapas:
+                clave = (etapa.empresa_id, etapa.estado)
+                deltas[clave] = deltas.get(clave, 0) + 1
+                periodo = etapa.periodo_ocupacion()
+                ocupacion[periodo] = ocupacion.get(periodo, 0) + 1
+            EmpresaEstadisticas.ajustar_contadores('etapas', CLAVES_ETAPA, deltas)
+            OcupacionSemanal.ajustar('etapas', ocupacion)
+        return etapas
+
+
+class AsignacionModificada(Exception):
+    """Se intentó guardar una asignación que otro proceso modificó después de leerla"""
+
+
+class AsignacionAprendiz(ContadorEstadoMixin, models.Model):
+    prefijo_estadisticas = 'asignaciones'
+    claves_estadisticas = CLAVES_ASIGNACION
+
+    # Las asignaciones INICIADO ocupan cupo a través de su EtapaPractica
+    campo_ocupacion = 'asignaciones'
+    estados_ocupacion = ['PENDIENTE', 'ASIGNADO', 'CONFIRMADO']
+    campos_periodo = ('fecha_inicio_propuesta', 'fecha_fin_propuesta')
+
+    # Estados que ocupan al aprendiz (no puede tener otra asignación)
+    ESTADOS_ACTIVOS = ['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
+
+    # Transiciones permitidas: nombre -> (estados de origen, estado destino)
+    TRANSICIONES = {
+        'confirmar': (['ASIGNADO'], 'CONFIRMADO'),
+        'rechazar': (['PENDIENTE', 'ASIGNADO'], 'RECHAZADO'),
+        'iniciar': (['CONFIRMADO'], 'INICIADO'),
+        'cancelar': (['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'RECHAZADO'], 'CANCELADO'),
+        # Cancelación automática de asignaciones que nadie confirmó
+        'expirar': (['PENDIENTE', 'ASIGNADO'], 'CANCELADO'),
+    }
 
-class AsignacionAprendiz(models.Model):
     ESTADO_CHOICES = [
         ('PENDIENTE', 'Pendiente de asignación'),
         ('ASIGNADO', 'Asignado a empresa'),
@@ -104,12 +372,19 @@ class AsignacionAprendiz(models.Model):
     
     # Campos de auditoría
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Se incrementa en cada escritura (control de concurrencia optimista)"
+    )
     creado_por = models.CharField(
         max_length=100,
         blank=True,
         help_text="Usuario que creó la asignación"
     )
     
+    objects = AsignacionAprendizQuerySet.as_manager()
+    
     def clean(self):
         """Validaciones personalizadas"""
         super().clean()
@@ -121,34 +396,138 @@ class AsignacionAprendiz(models.Model):
                     'fecha_fin_propuesta': 'La fecha de fin debe ser posterior a la fecha de inicio.'
                 })
         
-        # Validar que no exista una asignación activa para el mismo aprendiz
-        if self.pk is None:  # Solo para nuevas asignaciones
-            asignacion_activa = AsignacionAprendiz.objects.filter(
-                aprendiz=self.aprendiz,
-                estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
-            ).exists()
+        # La unicidad de la asignación activa por aprendiz la garantiza la
+        # restricción asignacion_activa_unica_por_aprendiz al guardar
+    
+    def _recordar_estado_guardado(self):
+        super()._recordar_estado_guardado()
+        self._aprendiz_guardado = self.__dict__.get('aprendiz_id')
+    
+    def registrar_estado(self, creado, anterior):
+        super().registrar_estado(creado, anterior)
+        
+        # Mantener el marcador de asignación activa solo si algo cambió
+        activa_antes = anterior is not None and anterior[1] in self.ESTADOS_ACTIVOS
+        activa_ahora = self.estado in self.ESTADOS_ACTIVOS
+        mismo_aprendiz = getattr(self, '_aprendiz_guardado', None) == self.aprendiz_id
+        if not creado and anterior is not None and activa_antes == activa_ahora and mismo_aprendiz:
+            return
+        
+        if not creado:
+            AsignacionActiva.objects.filter(asignacion=self).delete()
+        if activa_ahora:
+            AsignacionActiva.objects.create(aprendiz_id=self.aprendiz_id, asignacion=self)
+    
+    def save(self, *args, **kwargs):
+        # Toda escritura invalida las lecturas previas de las transiciones y,
+        # como ellas, solo se aplica sobre la versión leída (ver _do_update)
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        
+        self._version_leida = self.version
+        self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'version' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'version']
+        try:
+            super().save(*args, **kwargs)
+        except AsignacionModificada:
+            self.version = self._version_leida
+            raise
+        finally:
+            del self._version_leida
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        UPDATE ... WHERE id y version coinciden con los leídos. Si la fila
+        existe con otra versión, otro proceso la modificó (por ejemplo, la
+        confirmó) después de leerla: se lanza AsignacionModificada en lugar
+        de sobrescribir sus cambios.
+        """
+        version_leida = getattr(self, '_version_leida', None)
+        if version_leida is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        
+        actualizadas = super()._do_update(
+            base_qs.filter(version=version_leida), using, pk_val, values, update_fields, forced_update
+        )
+        if not actualizadas and base_qs.filter(pk=pk_val).exists():
+            raise AsignacionModificada(
+                'La asignación fue modificada por otro proceso después de leerla.'
+            )
+        return actualizadas
+    
+    def puede(self, transicion):
+        """Indica si el estado actual permite la transición"""
+        return self.estado in self.TRANSICIONES[transicion][0]
+    
+    def transicionar(self, transicion, texto="", usuario="", **cambios):
+        """
+        Aplica una transición de TRANSICIONES como compare-and-swap:
+        UPDATE ... WHERE id, estado y version coinciden con los leídos,
+        escribiendo solo las columnas que cambian, y registra el evento.
+        Devuelve False si el estado no lo permite o si otro proceso
+        modificó la asignación primero; en ese caso la instancia no se
+        altera.
+        """
+        if not self.puede(transicion):
+            return False
+        
+        hacia = self.TRANSICIONES[transicion][1]
+        ahora = timezone.now()
+        valores = dict(cambios, estado=hacia, fecha_actualizacion=ahora)
+        anterior = (self.empresa_id, self.estado)
+        periodo_anterior = self.periodo_ocupacion()
+        
+        with transaction.atomic():
+            actualizadas = type(self)._base_manager.filter(
+                pk=self.pk, estado=self.estado, version=self.version
+            ).update(version=self.version + 1, **valores)
+            if not actualizadas:
+                return False
             
-            if asignacion_activa:
-                raise ValidationError({
-                    'aprendiz': 'Este aprendiz ya tiene una asignación activa.'
-                })
+            for campo, valor in valores.items():
+                setattr(self, campo, valor)
+            self.version += 1
+            self.registrar_estado(False, anterior)
+            self.registrar_ocupacion(periodo_anterior)
+            AsignacionEvento.objects.create(
+                asignacion=self,
+                tipo=transicion.upper(),
+                texto=texto,
+                usuario=usuario,
+                fecha=ahora
+            )
+        self._recordar_estado_guardado()
+        return True
+    
+    def comentar(self, texto, usuario=""):
+        """Agrega un comentario al historial (un INSERT, sin tocar la asignación)"""
+        return AsignacionEvento.objects.create(
+            asignacion=self,
+            tipo='COMENTARIO',
+            texto=texto,
+            usuario=usuario
+        )
+    
+    def ultimos_eventos(self, cantidad=10):
+        """Los eventos más recientes, leídos por el índice (asignacion, fecha)"""
+        return self.eventos.order_by('-fecha', '-id')[:cantidad]
     
-    def confirmar_asignacion(self):
+    def confirmar_asignacion(self, observaciones="", usuario=""):
         """Método para confirmar la asignación por parte de la empresa"""
-        if self.estado == 'ASIGNADO':
-            self.estado = 'CONFIRMADO'
-            self.fecha_confirmacion = timezone.now()
-            self.save()
-            return True
-        return False
-    
-    def iniciar_etapa_practica(self):
+        return self.transicionar(
+            'confirmar', observaciones, usuario, fecha_confirmacion=timezone.now()
+        )
+    
+    def iniciar_etapa_practica(self, usuario=""):
         """Método para marcar que se ha iniciado la etapa práctica"""
-        if self.estado == 'CONFIRMADO':
-            self.estado = 'INICIADO'
-            self.save()
+        with transaction.atomic():
+            if not self.transicionar('iniciar', usuario=usuario):
+                return None
             
-            # Crear automáticamente el registro de EtapaPractica
+            # Crear automáticamente el registro de EtapaPractica; solo el
+            # proceso que ganó la transición llega aquí
             etapa_practica = EtapaPractica.objects.create(
                 aprendiz=self.aprendiz,
                 empresa=self.empresa,
@@ -156,20 +535,18 @@ class AsignacionAprendiz(models.Model):
                 fecha_inicio=self.fecha_inicio_propuesta,
                 fecha_fin=self.fecha_fin_propuesta,
                 objetivos=self.objetivos_propuestos,
-                estado='PRODUCTIVA'
+                estado='PRODUCTIVA',
+                asignacion_origen=self
             )
             return etapa_practica
-        return None
     
-    def rechazar_asignacion(self, motivo=""):
+    def rechazar_asignacion(self, motivo="", usuario=""):
         """Método para rechazar la asignación"""
-        if self.estado in ['PENDIENTE', 'ASIGNADO']:
-            self.estado = 'RECHAZADO'
-            if motivo:
-                self.observaciones += f"\nMotivo de rechazo: {motivo}"
-            self.save()
-            return True
-        return False
+        return self.transicionar('rechazar', motivo, usuario)
+    
+    def cancelar_asignacion(self, motivo="", usuario=""):
+        """Método para cancelar la asignación"""
+        return self.transicionar('cancelar', motivo, usuario)
     
     def get_duracion_propuesta(self):
         """Calcula la duración propuesta en días"""
@@ -191,9 +568,69 @@ class AsignacionAprendiz(models.Model):
             models.Index(fields=['fecha_asignacion']),
             models.Index(fields=['aprendiz', 'estado']),
             models.Index(fields=['empresa', 'estado']),
+            models.Index(fields=['empresa', 'fecha_inicio_propuesta', 'fecha_fin_propuesta']),
+            models.Index(fields=['empresa', 'fecha_actualizacion']),
+        ]
+        
+        # Restricciones verificadas por la base de datos (también bajo
+        # envíos concurrentes)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['aprendiz'],
+                condition=models.Q(estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']),
+                name='asignacion_activa_unica_por_aprendiz',
+                violation_error_message='Este aprendiz ya tiene una asignación activa.'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(fecha_fin_propuesta__gt=models.F('fecha_inicio_propuesta')),
+                name='asignacion_fechas_validas',
+                violation_error_message='La fecha de fin debe ser posterior a la fecha de inicio.'
+            ),
         ]
 
-class EtapaPractica(models.Model):
+class AsignacionEvento(models.Model):
+    """
+    Historial de una asignación: una fila por transición o comentario.
+    Registrar un evento es un INSERT; nunca se reescribe la asignación.
+    """
+    TIPO_CHOICES = [
+        ('CONFIRMAR', 'Confirmación'),
+        ('RECHAZAR', 'Rechazo'),
+        ('INICIAR', 'Inicio de etapa práctica'),
+        ('CANCELAR', 'Cancelación'),
+        ('EXPIRAR', 'Expiración'),
+        ('COMENTARIO', 'Comentario'),
+    ]
+
+    asignacion = models.ForeignKey(
+        AsignacionAprendiz,
+        on_delete=models.CASCADE,
+        related_name='eventos'
+    )
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    texto = models.TextField(blank=True)
+    usuario = models.CharField(max_length=100, blank=True)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.asignacion_id} - {self.get_tipo_display()}"
+
+    class Meta:
+        verbose_name = "Evento de Asignación"
+        verbose_name_plural = "Eventos de Asignación"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['asignacion', 'fecha']),
+        ]
+
+class EtapaPractica(ContadorEstadoMixin, models.Model):
+    prefijo_estadisticas = 'etapas'
+    claves_estadisticas = CLAVES_ETAPA
+
+    campo_ocupacion = 'etapas'
+    estados_ocupacion = ['PRODUCTIVA']
+    campos_periodo = ('fecha_inicio', 'fecha_fin')
+
     ESTADOS_CHOICES = [
         ('LECTIVA', 'En etapa lectiva'),
         ('PRODUCTIVA', 'En etapa productiva'), 
@@ -208,8 +645,8 @@ class EtapaPractica(models.Model):
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField(null=True, blank=True)
     objetivos = models.TextField(blank=True)
-    bitacora = models.TextField(blank=True)
     estado = models.CharField(max_length=15, choices=ESTADOS_CHOICES, default='LECTIVA')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     # Campo opcional para vincular con la asignación original
     asignacion_origen = models.OneToOneField(
@@ -225,4 +662,280 @@ class EtapaPractica(models.Model):
 
     class Meta:
         verbose_name = "Etapa de Práctica"
-        verbose_name_plural = "Etapas de Práctica"
\ No newline at end of file
+        verbose_name_plural = "Etapas de Práctica"
+        indexes = [
+            models.Index(fields=['empresa', 'fecha_inicio', 'fecha_fin']),
+            models.Index(fields=['empresa', 'fecha_actualizacion']),
+        ]
+
+class BitacoraEntrada(models.Model):
+    """
+    Entrada de la bitácora de una etapa práctica. Las entradas solo se
+    agregan, de modo que registrar una actividad es un INSERT y listar
+    etapas no carga el texto de su bitácora.
+    """
+    etapa = models.ForeignKey(
+        EtapaPractica,
+        on_delete=models.CASCADE,
+        related_name='entradas_bitacora'
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+    autor = models.CharField(max_length=100, blank=True)
+    texto = models.TextField()
+
+    def __str__(self):
+        return f"{self.etapa_id} - {self.fecha:%Y-%m-%d}"
+
+    class Meta:
+        verbose_name = "Entrada de Bitácora"
+        verbose_name_plural = "Entradas de Bitácora"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['etapa', 'fecha']),
+        ]
+
+class EmpresaEstadisticas(models.Model):
+    """
+    Contadores desnormalizados por empresa. Se mantienen con expresiones
+    F() en cada cambio de estado y se pueden reconstruir con el comando
+    reconcile_estadisticas.
+    """
+    empresa = models.OneToOneField(
+        Empresa,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estadisticas'
+    )
+
+    # Asignaciones
+    asignaciones_total = models.IntegerField(default=0)
+    asignaciones_pendientes = models.IntegerField(default=0)
+    asignaciones_asignados = models.IntegerField(default=0)
+    asignaciones_confirmados = models.IntegerField(default=0)
+    asignaciones_rechazados = models.IntegerField(default=0)
+    asignaciones_iniciados = models.IntegerField(default=0)
+    asignaciones_cancelados = models.IntegerField(default=0)
+
+    # Etapas prácticas
+    etapas_total = models.IntegerField(default=0)
+    etapas_lectivos = models.IntegerField(default=0)
+    etapas_productivos = models.IntegerField(default=0)
+    etapas_finalizados = models.IntegerField(default=0)
+    etapas_retirados = models.IntegerField(default=0)
+    etapas_aplazados = models.IntegerField(default=0)
+
+    @staticmethod
+    def campos_contadores():
+        campos = ['asignaciones_total', 'etapas_total']
+        campos += [f'asignaciones_{clave}' for clave in CLAVES_ASIGNACION.values()]
+        campos += [f'etapas_{clave}' for clave in CLAVES_ETAPA.values()]
+        return campos
+
+    @staticmethod
+    def valores_desde(estadisticas):
+        """Convierte {'asignaciones': {...}, 'etapas': {...}} en valores de campos"""
+        valores = {}
+        for prefijo, contadores in estadisticas.items():
+            for clave, cantidad in contadores.items():
+                valores[f'{prefijo}_{clave}'] = cantidad
+        return valores
+
+    def como_diccionario(self):
+        """Mismo formato que stats.estadisticas_empresa para una empresa"""
+        resultado = {}
+        for prefijo, claves in (('asignaciones', CLAVES_ASIGNACION), ('etapas', CLAVES_ETAPA)):
+            contadores = {'total': getattr(self, f'{prefijo}_total')}
+            for clave in claves.values():
+                contadores[clave] = getattr(self, f'{prefijo}_{clave}')
+            resultado[prefijo] = contadores
+        return resultado
+
+    @classmethod
+    def ajustar_contadores(cls, prefijo, claves, deltas):
+        """
+        Aplica variaciones por (empresa_id, estado) con un UPDATE ... F()
+        por empresa afectada. deltas: {(empresa_id, estado): cantidad}
+        """
+        por_empresa = {}
+        for (empresa_id, estado), cantidad in deltas.items():
+            campos = por_empresa.setdefault(empresa_id, {})
+            nombres = [f'{prefijo}_total']
+            if estado in claves:
+                nombres.append(f'{prefijo}_{claves[estado]}')
+            for nombre in nombres:
+                campos[nombre] = campos.get(nombre, 0) + cantidad
+
+        actualizadas = 0
+        for empresa_id, campos in por_empresa.items():
+            cambios = {
+                nombre: F(nombre) + delta
+                for nombre, delta in campos.items() if delta
+            }
+            if cambios:
+                actualizadas += cls.objects.filter(empresa_id=empresa_id).update(**cambios)
+
+        if actualizadas:
+            # Import diferido: listado_empresas importa este módulo
+            from .listado_empresas import invalidar_listado
+            invalidar_listado()
+
+    @classmethod
+    def registrar_cambio(cls, prefijo, claves, anterior, actual):
+        """
+        Ajusta los contadores tras crear, modificar o borrar un registro.
+        anterior y actual son tuplas (empresa_id, estado) o None.
+        """
+        if anterior == actual:
+            return
+
+        deltas = {}
+        if anterior is not None:
+            deltas[anterior] = deltas.get(anterior, 0) - 1
+        if actual is not None:
+            deltas[actual] = deltas.get(actual, 0) + 1
+        cls.ajustar_contadores(prefijo, claves, deltas)
+
+    def __str__(self):
+        return f"Estadísticas de {self.empresa_id}"
+
+    class Meta:
+        verbose_name = "Estadísticas de Empresa"
+        verbose_name_plural = "Estadísticas de Empresas"
+
+
+class AsignacionActivaQuerySet(models.QuerySet):
+    def aprendices_disponibles(self):
+        """Aprendices sin asignación activa (LEFT JOIN sobre la clave primaria)"""
+        return Aprendiz.objects.filter(asignacion_activa__isnull=True)
+
+
+class AsignacionActiva(models.Model):
+    """
+    Una fila por asignación activa (ver AsignacionAprendiz.ESTADOS_ACTIVOS).
+    La clave primaria es el aprendiz, de modo que la base de datos impide
+    que tenga dos asignaciones activas y la disponibilidad se resuelve con
+    una búsqueda por índice en lugar de recorrer todo el historial.
+    """
+    aprendiz = models.OneToOneField(
+        Aprendiz,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='asignacion_activa'
+    )
+    asignacion = models.OneToOneField(
+        AsignacionAprendiz,
+        on_delete=models.CASCADE,
+        related_name='marcador_activo'
+    )
+
+    objects = AsignacionActivaQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.aprendiz_id} → {self.asignacion_id}"
+
+    class Meta:
+        verbose_name = "Asignación Activa"
+        verbose_name_plural = "Asignaciones Activas"
+
+
+class OcupacionSemanal(models.Model):
+    """
+    Cupos ocupados por empresa y semana: asignaciones vigentes y etapas
+    productivas cuyo periodo cubre la semana. Se mantiene con UPDATE ... F()
+    al crear, cambiar fechas o estado y borrar, y se puede reconstruir con
+    el comando reconcile_ocupacion.
+    """
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name='ocupacion_semanal'
+    )
+    semana = models.DateField(help_text="Lunes de la semana")
+    asignaciones = models.IntegerField(default=0)
+    etapas = models.IntegerField(default=0)
+
+    @staticmethod
+    def lunes(fecha):
+        return fecha - timedelta(days=fecha.weekday())
+
+    @classmethod
+    def periodo(cls, empresa_id, inicio, fin):
+        """
+        (empresa_id, lunes inicial, lunes final) de un registro. Sin fecha
+        de fin se supone DURACION_ETAPA_SIN_FIN; sin inicio no ocupa cupo.
+        """
+        if empresa_id is None or inicio is None:
+            return None
+        if fin is None:
+            fin = inicio + DURACION_ETAPA_SIN_FIN
+        return (empresa_id, cls.lunes(inicio), cls.lunes(max(inicio, fin)))
+
+    @staticmethod
+    def semanas(desde, hasta):
+        """Lunes entre desde y hasta (ambos lunes, inclusive)"""
+        semana = desde
+        while semana <= hasta:
+            yield semana
+            semana += timedelta(weeks=1)
+
+    @classmethod
+    def ajustar(cls, campo, deltas):
+        """
+        Aplica variaciones por periodo. deltas: {(empresa_id, desde, hasta):
+        cantidad}. Las filas que faltan se crean antes de sumar y luego se
+        ejecuta un UPDATE ... F() por empresa y cantidad.
+        """
+        por_semana = {}
+        for periodo, cantidad in deltas.items():
+            if periodo is None or not cantidad:
+                continue
+            empresa_id, desde, hasta = periodo
+            for semana in cls.semanas(desde, hasta):
+                clave = (empresa_id, semana)
+                por_semana[clave] = por_semana.get(clave, 0) + cantidad
+
+        # Al descontar no se crean filas: la semana ya existe o la empresa
+        # se está borrando en cascada
+        cls.objects.bulk_create(
+            [
+                cls(empresa_id=empresa_id, semana=semana)
+                for (empresa_id, semana), cantidad in por_semana.items() if cantidad > 0
+            ],
+            ignore_conflicts=True,
+            batch_size=500
+        )
+
+        grupos = {}
+        for (empresa_id, semana), cantidad in por_semana.items():
+            if cantidad:
+                grupos.setdefault((empresa_id, cantidad), []).append(semana)
+        for (empresa_id, cantidad), semanas in grupos.items():
+            cls.objects.filter(empresa_id=empresa_id, semana__in=semanas).update(
+                **{campo: F(campo) + cantidad}
+            )
+
+    @classmethod
+    def registrar_cambio(cls, campo, anterior, actual):
+        """anterior y actual son periodos (ver periodo()) o None"""
+        if anterior == actual:
+            return
+
+        deltas = {}
+        if anterior is not None:
+            deltas[anterior] = -1
+        if actual is not None:
+            deltas[actual] = deltas.get(actual, 0) + 1
+        cls.ajustar(campo, deltas)
+
+    def __str__(self):
+        return f"{self.empresa_id} - {self.semana:%Y-%m-%d}"
+
+    class Meta:
+        verbose_name = "Ocupación Semanal"
+        verbose_name_plural = "Ocupación Semanal"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'semana'], name='ocupacion_semana_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['semana', 'empresa']),
+        ]
@@ -0,0 +1,159 @@
+from datetime import timedelta
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import (
+    DURACION_ETAPA_SIN_FIN,
+    AsignacionAprendiz,
+    EtapaPractica,
+    OcupacionSemanal
+)
+
+# Semanas mostradas por defecto en la línea de tiempo (un año)
+SEMANAS_LINEA_DE_TIEMPO = 52
+
+# Filas de OcupacionSemanal escritas por cada INSERT ... ON CONFLICT al conciliar
+TAMANO_LOTE_CONCILIACION = 1000
+
+
+def semanas_desde(desde, cantidad):
+    """Los `cantidad` lunes a partir de la semana que contiene `desde`"""
+    inicio = OcupacionSemanal.lunes(desde)
+    return [inicio + timedelta(weeks=numero) for numero in range(cantidad)]
+
+
+def linea_de_tiempo(desde=None, semanas=SEMANAS_LINEA_DE_TIEMPO, empresa_ids=None):
+    """
+    Ocupación semanal de las empresas entre la semana de `desde` (hoy por
+    defecto) y las `semanas` siguientes, leída de OcupacionSemanal con una
+    sola consulta por el índice (semana, empresa).
+
+    Devuelve {'semanas': [lunes...], 'empresas': [{'empresa_id', 'nombre',
+    'asignaciones', 'etapas', 'total', 'maximo'}]} con una lista por semana;
+    solo aparecen las empresas con alguna semana ocupada.
+    """
+    lunes = semanas_desde(desde or timezone.localdate(), semanas)
+    posiciones = {semana: indice for indice, semana in enumerate(lunes)}
+
+    filas = OcupacionSemanal.objects.filter(
+        Q(asignaciones__gt=0) | Q(etapas__gt=0),
+        semana__range=(lunes[0], lunes[-1])
+    )
+    if empresa_ids is not None:
+        filas = filas.filter(empresa_id__in=empresa_ids)
+
+    empresas = {}
+    for empresa_id, nombre, semana, asignaciones, etapas in filas.order_by().values_list(
+        'empresa_id', 'empresa__nombre', 'semana', 'asignaciones', 'etapas'
+    ):
+        empresa = empresas.get(empresa_id)
+        if empresa is None:
+            empresa = empresas[empresa_id] = {
+                'empresa_id': empresa_id,
+                'nombre': nombre,
+                'asignaciones': [0] * semanas,
+                'etapas': [0] * semanas,
+            }
+        indice = posiciones[semana]
+        empresa['asignaciones'][indice] = asignaciones
+        empresa['etapas'][indice] = etapas
+
+    resultado = sorted(empresas.values(), key=lambda empresa: (empresa['nombre'], empresa['empresa_id']))
+    for empresa in resultado:
+        empresa['total'] = [a + e for a, e in zip(empresa['asignaciones'], empresa['etapas'])]
+        empresa['maximo'] = max(empresa['total'])
+    return {'semanas': lunes, 'empresas': resultado}
+
+
+def ocupantes(empresa_id, semana):
+    """
+    Asignaciones y etapas que ocupan cupo en la empresa durante la semana
+    de `semana`. Consulta las tablas de origen por sus índices compuestos
+    (empresa, inicio, fin) en lugar de la tabla precalculada.
+    """
+    desde = OcupacionSemanal.lunes(semana)
+    hasta = desde + timedelta(days=6)
+
+    asignaciones = AsignacionAprendiz.objects.filter(
+        empresa_id=empresa_id,
+        fecha_inicio_propuesta__lte=hasta,
+        fecha_fin_propuesta__gte=desde,
+        estado__in=AsignacionAprendiz.estados_ocupacion
+    ).select_related('aprendiz').order_by('fecha_inicio_propuesta', 'id')
+
+    etapas = EtapaPractica.objects.filter(
+        Q(fecha_fin__gte=desde) | Q(fecha_fin__isnull=True, fecha_inicio__gte=desde - DURACION_ETAPA_SIN_FIN),
+        empresa_id=empresa_id,
+        fecha_inicio__lte=hasta,
+        estado__in=EtapaPractica.estados_ocupacion
+    ).select_related('aprendiz').order_by('fecha_inicio', 'id')
+
+    return asignaciones, etapas
+
+
+def ocupacion_real(empresa_ids=None):
+    """
+    Recalcula la ocupación desde las tablas de origen agrupando por
+    periodo. Devuelve {(empresa_id, semana): {'asignaciones', 'etapas'}}.
+    """
+    ocupacion = {}
+    for modelo in (AsignacionAprendiz, EtapaPractica):
+        inicio, fin = modelo.campos_periodo
+        registros = modelo.objects.filter(estado__in=modelo.estados_ocupacion)
+        if empresa_ids is not None:
+            registros = registros.filter(empresa_id__in=empresa_ids)
+        periodos = registros.order_by().values_list('empresa_id', inicio, fin).annotate(cantidad=Count('id'))
+
+        for empresa_id, fecha_inicio, fecha_fin, cantidad in periodos:
+            _, desde, hasta = OcupacionSemanal.periodo(empresa_id, fecha_inicio, fecha_fin)
+            for semana in OcupacionSemanal.semanas(desde, hasta):
+                valores = ocupacion.setdefault((empresa_id, semana), {'asignaciones': 0, 'etapas': 0})
+                valores[modelo.campo_ocupacion] += cantidad
+    return ocupacion
+
+
+def conciliar_ocupacion(empresa_ids=None, aplicar=True):
+    """
+    Compara OcupacionSemanal con la ocupación recalculada y corrige las
+    semanas distintas con upserts por lotes. Devuelve las diferencias como
+    tuplas (empresa_id, semana, campo, guardado, real).
+    """
+    reales = ocupacion_real(empresa_ids)
+    guardadas = OcupacionSemanal.objects.order_by()
+    if empresa_ids is not None:
+        guardadas = guardadas.filter(empresa_id__in=empresa_ids)
+
+    vacia = {'asignaciones': 0, 'etapas': 0}
+    diferencias = []
+    corregidas = []
+    vistas = set()
+    for empresa_id, semana, asignaciones, etapas in guardadas.values_list(
+        'empresa_id', 'semana', 'asignaciones', 'etapas'
+    ).iterator():
+        vistas.add((empresa_id, semana))
+        guardado = {'asignaciones': asignaciones, 'etapas': etapas}
+        real = reales.get((empresa_id, semana), vacia)
+        if guardado != real:
+            diferencias.extend(
+                (empresa_id, semana, campo, guardado[campo], real[campo])
+                for campo in vacia if guardado[campo] != real[campo]
+            )
+            corregidas.append(OcupacionSemanal(empresa_id=empresa_id, semana=semana, **real))
+
+    for (empresa_id, semana), real in reales.items():
+        if (empresa_id, semana) not in vistas:
+            diferencias.extend(
+                (empresa_id, semana, campo, 0, real[campo])
+                for campo in vacia if real[campo]
+            )
+            corregidas.append(OcupacionSemanal(empresa_id=empresa_id, semana=semana, **real))
+
+    if aplicar:
+        OcupacionSemanal.objects.bulk_create(
+            corregidas,
+            update_conflicts=True,
+            unique_fields=['empresa', 'semana'],
+            update_fields=['asignaciones', 'etapas'],
+            batch_size=TAMANO_LOTE_CONCILIACION
+        )
+    diferencias.sort(key=lambda diferencia: diferencia[:3])
+    return diferencias
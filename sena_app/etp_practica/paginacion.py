@@ -0,0 +1,107 @@
+import base64
+import binascii
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+SIGUIENTE = 'n'
+ANTERIOR = 'p'
+
+
+def codificar_cursor(fecha, pk, direccion):
+    """Token opaco con la posición (fecha, id) y la dirección de lectura"""
+    crudo = f'{direccion}|{fecha.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Devuelve (direccion, fecha, id) o None si el token no es válido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        crudo = base64.urlsafe_b64decode(token + relleno).decode()
+        direccion, fecha, pk = crudo.split('|')
+        fecha = parse_datetime(fecha)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if direccion not in (SIGUIENTE, ANTERIOR) or fecha is None:
+        return None
+    return direccion, fecha, pk
+
+
+class PaginaCursor:
+    """
+    Página obtenida por búsqueda de clave (keyset). Expone una interfaz
+    parecida a la de Page para que las plantillas puedan iterarla.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class PaginadorCursor:
+    """
+    Pagina un queryset por (campo_fecha, id) en orden descendente sin
+    OFFSET: cada página es un rango sobre el índice del campo de fecha,
+    así que la página 5000 cuesta lo mismo que la primera.
+    """
+
+    def __init__(self, queryset, per_page, campo_fecha='fecha_asignacion'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.campo_fecha = campo_fecha
+
+    def _clave(self, objeto):
+        return getattr(objeto, self.campo_fecha), objeto.pk
+
+    def get_page(self, token):
+        posicion = decodificar_cursor(token) if token else None
+        campo = self.campo_fecha
+
+        if posicion is None:
+            direccion = SIGUIENTE
+            queryset = self.queryset.order_by(f'-{campo}', '-id')
+        else:
+            direccion, fecha, pk = posicion
+            if direccion == SIGUIENTE:
+                queryset = self.queryset.filter(
+                    Q(**{f'{campo}__lt': fecha}) | Q(**{campo: fecha, 'id__lt': pk})
+                ).order_by(f'-{campo}', '-id')
+            else:
+                queryset = self.queryset.filter(
+                    Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'id__gt': pk})
+                ).order_by(campo, 'id')
+
+        # Se pide un registro extra para saber si hay más en esa dirección
+        filas = list(queryset[:self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+
+        if direccion == ANTERIOR:
+            filas.reverse()
+            hay_siguiente, hay_anterior = True, hay_mas
+        else:
+            hay_siguiente, hay_anterior = hay_mas, posicion is not None
+
+        next_cursor = previous_cursor = None
+        if filas and hay_siguiente:
+            next_cursor = codificar_cursor(*self._clave(filas[-1]), SIGUIENTE)
+        if filas and hay_anterior:
+            previous_cursor = codificar_cursor(*self._clave(filas[0]), ANTERIOR)
+        return PaginaCursor(filas, next_cursor, previous_cursor)
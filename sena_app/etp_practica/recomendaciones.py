@@ -0,0 +1,227 @@
+import unicodedata
+import numpy as np
+from django.db.models import Count
+from .models import AsignacionActiva, AsignacionAprendiz, Empresa
+
+# Peso de cada componente en el puntaje final (suman 1)
+PESOS = {
+    'ciudad': 0.45,
+    'confirmacion': 0.25,
+    'rechazo': 0.15,
+    'carga': 0.15,
+}
+
+# Recomendaciones devueltas cuando no se indica un límite
+LIMITE_RECOMENDACIONES = 10
+
+
+def normalizar_ciudad(ciudad):
+    """'  Bogotá D.C.' -> 'bogota d.c.': sin tildes, mayúsculas ni espacios extra"""
+    descompuesto = unicodedata.normalize('NFKD', (ciudad or '').strip().lower())
+    return ' '.join(''.join(letra for letra in descompuesto if not unicodedata.combining(letra)).split())
+
+
+class _CodigosCiudad:
+    """Asigna un entero por ciudad normalizada para comparar con arreglos"""
+
+    def __init__(self):
+        self._codigos = {'': -1}
+
+    def codigo(self, ciudad):
+        normalizada = normalizar_ciudad(ciudad)
+        return self._codigos.setdefault(normalizada, len(self._codigos))
+
+    def arreglo(self, ciudades):
+        # Las ciudades se repiten mucho: se normaliza cada valor distinto una vez
+        distintos = {ciudad: self.codigo(ciudad) for ciudad in set(ciudades)}
+        return np.fromiter((distintos[ciudad] for ciudad in ciudades), dtype=np.int32, count=len(ciudades))
+
+
+class DatosEmpresas:
+    """
+    Arreglos por empresa construidos con dos consultas: los contadores de
+    EmpresaEstadisticas (unidos a Empresa) y el historial de modalidades.
+    """
+
+    def __init__(self, codigos):
+        filas = list(Empresa.objects.order_by('id').values_list(
+            'id', 'nombre', 'ciudad',
+            'estadisticas__asignaciones_pendientes',
+            'estadisticas__asignaciones_asignados',
+            'estadisticas__asignaciones_confirmados',
+            'estadisticas__asignaciones_rechazados',
+            'estadisticas__asignaciones_iniciados',
+            'estadisticas__asignaciones_cancelados',
+        ))
+        self.ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+        self.nombres = [fila[1] for fila in filas]
+        self.ciudades = [fila[2] for fila in filas]
+        self.codigos_ciudad = codigos.arreglo(self.ciudades)
+
+        contadores = np.array([fila[3:] for fila in filas], dtype=np.float64).reshape(len(filas), 6)
+        contadores = np.nan_to_num(contadores)  # empresas sin registro de estadísticas
+        pendientes, asignados, confirmados, rechazados, iniciados, cancelados = contadores.T
+
+        # Tasas suavizadas: sin historial una empresa queda en 0.5
+        aceptadas = confirmados + iniciados
+        decididas = aceptadas + rechazados
+        self.tasa_confirmacion = (aceptadas + 1) / (decididas + 2)
+        self.tasa_rechazo = (rechazados + cancelados + 1) / (contadores.sum(axis=1) + 2)
+
+        carga = pendientes + asignados + confirmados + iniciados
+        self.carga = carga
+        maximo = np.log1p(carga.max()) if len(carga) else 0
+        self.carga_relativa = np.log1p(carga) / maximo if maximo else np.zeros_like(carga)
+
+        # Proporción de asignaciones presenciales: la ciudad solo pesa en
+        # esa parte (una empresa que contrata en remoto no exige la misma ciudad)
+        self.posiciones = posiciones = {
+            empresa_id: indice for indice, empresa_id in enumerate(self.ids.tolist())
+        }
+        presenciales = np.zeros(len(filas))
+        totales = np.zeros(len(filas))
+        modalidades = (
+            AsignacionAprendiz.objects
+            .order_by()
+            .values_list('empresa_id', 'modalidad')
+            .annotate(cantidad=Count('id'))
+        )
+        for empresa_id, modalidad, cantidad in modalidades:
+            indice = posiciones[empresa_id]
+            totales[indice] += cantidad
+            if modalidad == 'PRESENCIAL':
+                presenciales[indice] += cantidad
+        self.presencial = (presenciales + 1) / (totales + 1)
+
+        # Parte del puntaje que no depende del aprendiz
+        self.calidad = (
+            PESOS['confirmacion'] * self.tasa_confirmacion
+            + PESOS['rechazo'] * (1 - self.tasa_rechazo)
+            + PESOS['carga'] * (1 - self.carga_relativa)
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def componente_ciudad(self, codigo_ciudad):
+        """1 si la ciudad coincide; si no, la proporción de trabajo no presencial"""
+        coincide = (self.codigos_ciudad == codigo_ciudad) & (codigo_ciudad != -1)
+        return np.where(coincide, 1.0, 1 - self.presencial)
+
+
+class DatosAprendices:
+    """Aprendices disponibles (sin asignación activa) en una sola consulta"""
+
+    def __init__(self, codigos):
+        filas = list(
+            AsignacionActiva.objects.aprendices_disponibles()
+            .order_by('id')
+            .values_list('id', 'nombre', 'apellido', 'documento_identidad', 'ciudad')
+        )
+        self.ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+        self.filas = filas
+        self.codigos_ciudad = codigos.arreglo([fila[4] for fila in filas])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _mejores(puntajes, limite):
+    """Índices de los `limite` mayores puntajes, ordenados (empates por posición)"""
+    if limite >= len(puntajes):
+        return np.argsort(-puntajes, kind='stable')
+    candidatos = np.argpartition(-puntajes, limite)[:limite]
+    return candidatos[np.lexsort((candidatos, -puntajes[candidatos]))]
+
+
+def recomendar_empresas(aprendiz, limite=LIMITE_RECOMENDACIONES):
+    """
+    Empresas ordenadas por afinidad con el aprendiz: coincidencia de
+    ciudad (ponderada por el historial presencial de la empresa), tasas
+    de confirmación y de rechazo y carga activa actual.
+    """
+    codigos = _CodigosCiudad()
+    empresas = DatosEmpresas(codigos)
+    if not len(empresas):
+        return []
+
+    ciudad = empresas.componente_ciudad(codigos.codigo(aprendiz.ciudad))
+    puntajes = PESOS['ciudad'] * ciudad + empresas.calidad
+
+    return [
+        {
+            'empresa_id': int(empresas.ids[indice]),
+            'nombre': empresas.nombres[indice],
+            'ciudad': empresas.ciudades[indice],
+            'puntaje': round(float(puntajes[indice]), 4),
+            'componentes': {
+                'ciudad': round(float(ciudad[indice]), 4),
+                'confirmacion': round(float(empresas.tasa_confirmacion[indice]), 4),
+                'rechazo': round(float(empresas.tasa_rechazo[indice]), 4),
+                'carga_activa': int(empresas.carga[indice]),
+            },
+        }
+        for indice in _mejores(puntajes, limite)
+    ]
+
+
+def recomendar_aprendices(empresa, limite=LIMITE_RECOMENDACIONES):
+    """
+    Aprendices disponibles ordenados por afinidad con la empresa. Las
+    tasas y la carga de la empresa son iguales para todos los candidatos,
+    así que el orden lo define la ciudad; el puntaje es el mismo que
+    recomendar_empresas daría a cada pareja.
+    """
+    codigos = _CodigosCiudad()
+    empresas = DatosEmpresas(codigos)
+    aprendices = DatosAprendices(codigos)
+    indice_empresa = empresas.posiciones.get(empresa.pk)
+    if not len(aprendices) or indice_empresa is None:
+        return []
+
+    codigo_empresa = empresas.codigos_ciudad[indice_empresa]
+    presencial = empresas.presencial[indice_empresa]
+    coincide = (aprendices.codigos_ciudad == codigo_empresa) & (codigo_empresa != -1)
+    ciudad = np.where(coincide, 1.0, 1 - presencial)
+    puntajes = PESOS['ciudad'] * ciudad + empresas.calidad[indice_empresa]
+
+    recomendaciones = []
+    for indice in _mejores(puntajes, limite):
+        aprendiz_id, nombre, apellido, documento, ciudad_aprendiz = aprendices.filas[indice]
+        recomendaciones.append({
+            'aprendiz_id': aprendiz_id,
+            'nombre': nombre,
+            'apellido': apellido,
+            'documento_identidad': documento,
+            'ciudad': ciudad_aprendiz,
+            'puntaje': round(float(puntajes[indice]), 4),
+            'componentes': {'ciudad': round(float(ciudad[indice]), 4)},
+        })
+    return recomendaciones
+
+
+def recomendar_todos(limite=5):
+    """
+    Las `limite` mejores empresas para cada aprendiz disponible.
+
+    El puntaje es calidad(empresa) + peso * ciudad(aprendiz, empresa) y la
+    ciudad solo puede coincidir o no, así que todos los aprendices de una
+    misma ciudad comparten ranking: se calcula una vez por ciudad en lugar
+    de armar la matriz aprendices x empresas.
+
+    Devuelve (ids de aprendices, matriz de ids de empresas de forma
+    [aprendices, limite]).
+    """
+    codigos = _CodigosCiudad()
+    empresas = DatosEmpresas(codigos)
+    aprendices = DatosAprendices(codigos)
+    limite = min(limite, len(empresas))
+    resultado = np.zeros((len(aprendices), limite), dtype=np.int64)
+    if not len(empresas) or not len(aprendices):
+        return aprendices.ids, resultado
+
+    ciudades, inversa = np.unique(aprendices.codigos_ciudad, return_inverse=True)
+    for posicion, codigo in enumerate(ciudades):
+        puntajes = PESOS['ciudad'] * empresas.componente_ciudad(codigo) + empresas.calidad
+        resultado[inversa == posicion] = empresas.ids[_mejores(puntajes, limite)]
+    return aprendices.ids, resultado
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Empresa, EmpresaEstadisticas, AsignacionAprendiz, EtapaPractica, OcupacionSemanal
+from .busqueda import instalar_triggers, reconstruir_indice
+from .listado_empresas import invalidar_listado
+
+
+@receiver(post_save, sender=Empresa)
+def crear_estadisticas_empresa(sender, instance, created, raw=False, **kwargs):
+    """Cada empresa nueva arranca con sus contadores en cero"""
+    if created and not raw:
+        EmpresaEstadisticas.objects.get_or_create(empresa=instance)
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def invalidar_listado_empresas(sender, raw=False, **kwargs):
+    """Los datos de la empresa aparecen en las páginas cacheadas del listado"""
+    if not raw:
+        invalidar_listado()
+
+
+@receiver(post_delete, sender=AsignacionAprendiz)
+@receiver(post_delete, sender=EtapaPractica)
+def descontar_estadisticas(sender, instance, **kwargs):
+    """Descuenta el registro eliminado (también en borrados en cascada)"""
+    EmpresaEstadisticas.registrar_cambio(
+        sender.prefijo_estadisticas,
+        sender.claves_estadisticas,
+        instance.estado_para_estadisticas(),
+        None
+    )
+    OcupacionSemanal.registrar_cambio(
+        sender.campo_ocupacion,
+        instance.periodo_para_ocupacion(),
+        None
+    )
+
+
+def verificar_triggers_busqueda(sender, using='default', **kwargs):
+    """
+    post_migrate: las migraciones que reconstruyen tablas retiran y
+    reinstalan los triggers. Si aun así falta alguno, las escrituras hechas
+    sin él no quedaron en el índice: se reinstalan y se reconstruye.
+    """
+    if instalar_triggers(using):
+        reconstruir_indice(using)
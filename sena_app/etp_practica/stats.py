@@ -0,0 +1,195 @@
+from django.db.models import Count
+from .listado_empresas import invalidar_listado
+from .models import (
+    CLAVES_ASIGNACION,
+    CLAVES_ETAPA,
+    Empresa,
+    EmpresaEstadisticas,
+    AsignacionAprendiz,
+    EtapaPractica
+)
+
+# Empresas procesadas por lote al conciliar la tabla de estadísticas
+TAMANO_LOTE_CONCILIACION = 500
+
+# Filas de EmpresaEstadisticas leídas por viaje del cursor al recorrerlas todas
+TAMANO_LOTE_RECORRIDO = 1000
+
+
+def _normalizar_ids(empresa_ids):
+    """Acepta un id o un iterable de ids y devuelve una lista"""
+    if isinstance(empresa_ids, int):
+        return [empresa_ids]
+    return list(empresa_ids)
+
+
+def _contadores_vacios(claves):
+    contadores = {'total': 0}
+    for clave in claves.values():
+        contadores[clave] = 0
+    return contadores
+
+
+def contar_por_estado(queryset, claves):
+    """
+    Cuenta los registros de un queryset por estado en una sola consulta
+    agrupada. Devuelve un diccionario con 'total' y un contador por clave.
+    """
+    contadores = _contadores_vacios(claves)
+    filas = queryset.order_by().values('estado').annotate(cantidad=Count('id'))
+    for fila in filas:
+        contadores['total'] += fila['cantidad']
+        clave = claves.get(fila['estado'])
+        if clave:
+            contadores[clave] = fila['cantidad']
+    return contadores
+
+
+def _contar_por_empresa(modelo, empresa_ids, claves):
+    """Una consulta agrupada por (empresa, estado) para todas las empresas"""
+    empresa_ids = _normalizar_ids(empresa_ids)
+    resultado = {empresa_id: _contadores_vacios(claves) for empresa_id in empresa_ids}
+    if not empresa_ids:
+        return resultado
+
+    filas = (
+        modelo.objects
+        .filter(empresa_id__in=empresa_ids)
+        .order_by()
+        .values('empresa_id', 'estado')
+        .annotate(cantidad=Count('id'))
+    )
+    for fila in filas:
+        contadores = resultado[fila['empresa_id']]
+        contadores['total'] += fila['cantidad']
+        clave = claves.get(fila['estado'])
+        if clave:
+            contadores[clave] = fila['cantidad']
+    return resultado
+
+
+def estadisticas_asignaciones(empresa_ids):
+    """Contadores de AsignacionAprendiz por estado, indexados por empresa"""
+    return _contar_por_empresa(AsignacionAprendiz, empresa_ids, CLAVES_ASIGNACION)
+
+
+def estadisticas_etapas(empresa_ids):
+    """Contadores de EtapaPractica por estado, indexados por empresa"""
+    return _contar_por_empresa(EtapaPractica, empresa_ids, CLAVES_ETAPA)
+
+
+def estadisticas_empresa(empresa_ids):
+    """
+    Estadísticas de asignaciones y etapas prácticas para una o varias
+    empresas. Ejecuta una consulta agrupada por modelo sin importar
+    cuántas empresas o estados existan.
+
+    Devuelve {empresa_id: {'asignaciones': {...}, 'etapas': {...}}}
+    """
+    empresa_ids = _normalizar_ids(empresa_ids)
+    asignaciones = estadisticas_asignaciones(empresa_ids)
+    etapas = estadisticas_etapas(empresa_ids)
+    return {
+        empresa_id: {
+            'asignaciones': asignaciones[empresa_id],
+            'etapas': etapas[empresa_id],
+        }
+        for empresa_id in empresa_ids
+    }
+
+
+def estadisticas_guardadas(empresa_ids):
+    """
+    Lee las estadísticas desnormalizadas de EmpresaEstadisticas en una
+    sola consulta. Las empresas sin registro se reconstruyen al vuelo.
+
+    Devuelve el mismo formato que estadisticas_empresa.
+    """
+    empresa_ids = _normalizar_ids(empresa_ids)
+    filas = EmpresaEstadisticas.objects.in_bulk(empresa_ids)
+    faltantes = [empresa_id for empresa_id in empresa_ids if empresa_id not in filas]
+    if faltantes:
+        conciliar_estadisticas(faltantes)
+        filas.update(EmpresaEstadisticas.objects.in_bulk(faltantes))
+    return {
+        empresa_id: filas[empresa_id].como_diccionario()
+        for empresa_id in empresa_ids if empresa_id in filas
+    }
+
+
+def _conciliar_lote(empresa_ids, aplicar):
+    reales = estadisticas_empresa(empresa_ids)
+    guardadas = EmpresaEstadisticas.objects.in_bulk(empresa_ids)
+    campos = EmpresaEstadisticas.campos_contadores()
+    diferencias = []
+    nuevas = []
+    modificadas = []
+
+    for empresa_id, estadisticas in reales.items():
+        valores = EmpresaEstadisticas.valores_desde(estadisticas)
+        fila = guardadas.get(empresa_id)
+        if fila is None:
+            diferencias.append((empresa_id, None, None, None))
+            nuevas.append(EmpresaEstadisticas(empresa_id=empresa_id, **valores))
+            continue
+
+        cambio = False
+        for campo in campos:
+            guardado = getattr(fila, campo)
+            if guardado != valores[campo]:
+                diferencias.append((empresa_id, campo, guardado, valores[campo]))
+                setattr(fila, campo, valores[campo])
+                cambio = True
+        if cambio:
+            modificadas.append(fila)
+
+    if aplicar and diferencias:
+        EmpresaEstadisticas.objects.bulk_create(nuevas, ignore_conflicts=True)
+        EmpresaEstadisticas.objects.bulk_update(modificadas, campos)
+        invalidar_listado()
+    return diferencias
+
+
+def conciliar_estadisticas(empresa_ids=None, aplicar=True):
+    """
+    Recalcula los contadores a partir de las tablas de origen y corrige
+    EmpresaEstadisticas en bloque. Devuelve la lista de diferencias como
+    tuplas (empresa_id, campo, guardado, real); campo es None cuando la
+    empresa no tenía registro.
+    """
+    empresas = Empresa.objects.order_by('id')
+    if empresa_ids is not None:
+        empresas = empresas.filter(id__in=_normalizar_ids(empresa_ids))
+    empresa_ids = empresas.values_list('id', flat=True).iterator()
+
+    diferencias = []
+    lote = []
+    for empresa_id in empresa_ids:
+        lote.append(empresa_id)
+        if len(lote) >= TAMANO_LOTE_CONCILIACION:
+            diferencias += _conciliar_lote(lote, aplicar)
+            lote = []
+    if lote:
+        diferencias += _conciliar_lote(lote, aplicar)
+    return diferencias
+
+
+def recorrer_estadisticas(ciudad=None):
+    """
+    Recorre las estadísticas guardadas de todas las empresas (o las de una
+    ciudad) con un cursor, sin cargarlas todas en memoria. Las empresas sin
+    registro se concilian antes. Genera (empresa_id, estadísticas).
+    """
+    empresas = Empresa.objects.all()
+    estadisticas = EmpresaEstadisticas.objects.all()
+    if ciudad:
+        empresas = empresas.filter(ciudad__iexact=ciudad)
+        estadisticas = estadisticas.filter(empresa__ciudad__iexact=ciudad)
+
+    faltantes = list(empresas.filter(estadisticas__isnull=True).values_list('id', flat=True))
+    if faltantes:
+        conciliar_estadisticas(faltantes)
+
+    for fila in estadisticas.order_by('empresa_id').iterator(chunk_size=TAMANO_LOTE_RECORRIDO):
+        yield fila.empresa_id, fila.como_diccionario()
+
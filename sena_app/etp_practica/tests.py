@@ -1,3 +1,1189 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from SENA_APP.pruebas import competir
+from aprendices.models import Aprendiz
+from .models import (
+    Empresa,
+    EmpresaEstadisticas,
+    AsignacionAprendiz,
+    AsignacionActiva,
+    AsignacionEvento,
+    AsignacionModificada,
+    BitacoraEntrada,
+    EtapaPractica,
+    OcupacionSemanal
+)
+from .forms import AsignacionAprendizForm
+from .asignacion_masiva import asignar_aprendices_masivo
+from .expiracion import expirar_asignaciones
+from .importacion_empresas import importar_empresas
+from .ocupacion import conciliar_ocupacion, linea_de_tiempo, ocupantes
+from .recomendaciones import recomendar_aprendices, recomendar_empresas, recomendar_todos
+from .stats import conciliar_estadisticas, estadisticas_empresa
+from .paginacion import PaginadorCursor
+from .busqueda import (
+    TABLA_BUSQUEDA,
+    buscar_asignaciones,
+    indice_disponible,
+    retirar_triggers,
+    triggers_faltantes
+)
+from .signals import verificar_triggers_busqueda
+
+
+def crear_empresa(**kwargs):
+    datos = {
+        'nombre': 'Empresa de prueba',
+        'nit': '900123456',
+        'direccion': 'Calle 1 # 2-3',
+        'ciudad': 'Bogotá',
+        'telefono': '3000000000',
+        'email': 'contacto@empresa.com',
+    }
+    datos.update(kwargs)
+    return Empresa.objects.create(**datos)
+
+
+def crear_aprendiz(documento, **kwargs):
+    datos = {
+        'documento_identidad': documento,
+        'nombre': f'Aprendiz {documento}',
+        'apellido': 'Prueba',
+        'fecha_nacimiento': date(2000, 1, 1),
+        'ciudad': 'Bogotá',
+    }
+    datos.update(kwargs)
+    return Aprendiz.objects.create(**datos)
+
+
+def crear_asignacion(aprendiz, empresa, **kwargs):
+    inicio = date.today() + timedelta(days=30)
+    datos = {
+        'aprendiz': aprendiz,
+        'empresa': empresa,
+        'fecha_inicio_propuesta': inicio,
+        'fecha_fin_propuesta': inicio + timedelta(days=180),
+        'tutor_propuesto': 'Tutor de prueba',
+        'estado': 'ASIGNADO',
+    }
+    datos.update(kwargs)
+    return AsignacionAprendiz.objects.create(**datos)
+
+
+def crear_etapa(aprendiz, empresa, **kwargs):
+    datos = {
+        'aprendiz': aprendiz,
+        'empresa': empresa,
+        'tutor': 'Tutor de prueba',
+        'fecha_inicio': date.today(),
+        'estado': 'PRODUCTIVA',
+    }
+    datos.update(kwargs)
+    return EtapaPractica.objects.create(**datos)
+
+
+class EstadisticasEmpresaTests(TestCase):
+    """Las estadísticas se calculan con una consulta agrupada por modelo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = crear_empresa()
+        cls.otra_empresa = crear_empresa(nombre='Otra empresa', nit='800111222')
+
+    def poblar(self, empresa, por_estado):
+        documento = 1000 + Aprendiz.objects.count()
+        for estado, _ in AsignacionAprendiz.ESTADO_CHOICES:
+            for _ in range(por_estado):
+                documento += 1
+                crear_asignacion(crear_aprendiz(str(documento)), empresa, estado=estado)
+        for estado, _ in EtapaPractica.ESTADOS_CHOICES:
+            for _ in range(por_estado):
+                documento += 1
+                crear_etapa(crear_aprendiz(str(documento)), empresa, estado=estado)
+
+    def test_contadores_por_estado(self):
+        self.poblar(self.empresa, 2)
+        with self.assertNumQueries(2):
+            stats = estadisticas_empresa([self.empresa.id, self.otra_empresa.id])
+
+        asignaciones = stats[self.empresa.id]['asignaciones']
+        self.assertEqual(asignaciones['total'], 12)
+        self.assertEqual(asignaciones['confirmados'], 2)
+        self.assertEqual(asignaciones['cancelados'], 2)
+        self.assertEqual(stats[self.empresa.id]['etapas']['total'], 10)
+        self.assertEqual(stats[self.otra_empresa.id]['asignaciones']['total'], 0)
+        self.assertEqual(stats[self.otra_empresa.id]['etapas']['retirados'], 0)
+
+    def test_acepta_un_solo_id(self):
+        self.poblar(self.otra_empresa, 1)
+        stats = estadisticas_empresa(self.otra_empresa.id)
+        self.assertEqual(list(stats), [self.otra_empresa.id])
+        self.assertEqual(stats[self.otra_empresa.id]['etapas']['aplazados'], 1)
+
+    def assertConsultasConstantes(self, url, consultas):
+        self.poblar(self.empresa, 1)
+        with self.assertNumQueries(consultas):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.poblar(self.empresa, 3)
+        with self.assertNumQueries(consultas):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_detalle_empresa_consultas(self):
+        url = reverse('etp_practica:detalle_empresa', args=[self.empresa.id])
+        self.assertConsultasConstantes(url, 3)
+
+    def test_aprendices_asignados_consultas(self):
+        url = reverse('etp_practica:aprendices_asignados', args=[self.empresa.id])
+        self.assertConsultasConstantes(url, 4)
+
+    def test_bitacoras_consultas(self):
+        url = reverse('etp_practica:bitacoras', args=[self.empresa.id])
+        self.assertConsultasConstantes(url, 2)
+
+    def test_api_estadisticas_empresa_consultas(self):
+        url = reverse('etp_practica:api_estadisticas_empresa', args=[self.empresa.id])
+        self.assertConsultasConstantes(url, 3)
+        datos = self.client.get(url).json()
+        self.assertEqual(datos['asignaciones']['total'], 24)
+        self.assertEqual(datos['etapas']['productivos'], 4)
+
+
+class EmpresaEstadisticasTests(TestCase):
+    """Los contadores desnormalizados siguen cada cambio de estado"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.aprendiz = crear_aprendiz('1001')
+
+    def contadores(self, empresa=None):
+        empresa = empresa or self.empresa
+        return EmpresaEstadisticas.objects.get(empresa=empresa).como_diccionario()
+
+    def assertSinDiferencias(self):
+        salida = StringIO()
+        call_command('reconcile_estadisticas', '--dry-run', stdout=salida)
+        self.assertIn('Sin diferencias', salida.getvalue())
+
+    def test_empresa_nueva_tiene_registro(self):
+        self.assertEqual(self.contadores()['asignaciones']['total'], 0)
+
+    def test_transiciones_actualizan_contadores(self):
+        asignacion = crear_asignacion(self.aprendiz, self.empresa)
+        self.assertEqual(self.contadores()['asignaciones']['asignados'], 1)
+
+        asignacion.confirmar_asignacion()
+        asignaciones = self.contadores()['asignaciones']
+        self.assertEqual(asignaciones['asignados'], 0)
+        self.assertEqual(asignaciones['confirmados'], 1)
+
+        asignacion.iniciar_etapa_practica()
+        estadisticas = self.contadores()
+        self.assertEqual(estadisticas['asignaciones']['iniciados'], 1)
+        self.assertEqual(estadisticas['asignaciones']['total'], 1)
+        self.assertEqual(estadisticas['etapas']['productivos'], 1)
+        self.assertSinDiferencias()
+
+    def test_rechazo_y_cancelacion(self):
+        rechazada = crear_asignacion(self.aprendiz, self.empresa)
+        rechazada.rechazar_asignacion('Sin cupo')
+        cancelada = crear_asignacion(crear_aprendiz('1002'), self.empresa)
+        cancelada.estado = 'CANCELADO'
+        cancelada.save()
+        asignaciones = self.contadores()['asignaciones']
+        self.assertEqual(asignaciones['rechazados'], 1)
+        self.assertEqual(asignaciones['cancelados'], 1)
+        self.assertEqual(asignaciones['asignados'], 0)
+        self.assertSinDiferencias()
+
+    def test_cambio_de_empresa_y_borrado(self):
+        otra = crear_empresa(nombre='Otra', nit='800111222')
+        asignacion = crear_asignacion(self.aprendiz, self.empresa)
+        asignacion.empresa = otra
+        asignacion.save()
+        self.assertEqual(self.contadores()['asignaciones']['total'], 0)
+        self.assertEqual(self.contadores(otra)['asignaciones']['asignados'], 1)
+
+        asignacion.delete()
+        self.assertEqual(self.contadores(otra)['asignaciones']['total'], 0)
+
+        crear_etapa(self.aprendiz, self.empresa)
+        self.aprendiz.delete()
+        self.assertEqual(self.contadores()['etapas']['total'], 0)
+        self.assertSinDiferencias()
+
+    def test_reconcile_reporta_y_corrige_diferencias(self):
+        crear_asignacion(self.aprendiz, self.empresa)
+        EmpresaEstadisticas.objects.filter(empresa=self.empresa).update(asignaciones_total=7)
+        sin_registro = crear_empresa(nombre='Sin registro', nit='700')
+        EmpresaEstadisticas.objects.filter(empresa=sin_registro).delete()
+
+        salida = StringIO()
+        call_command('reconcile_estadisticas', stdout=salida)
+        self.assertIn('asignaciones_total guardado=7 real=1', salida.getvalue())
+        self.assertIn(f'Empresa {sin_registro.id}: sin registro', salida.getvalue())
+        self.assertEqual(self.contadores()['asignaciones']['total'], 1)
+        self.assertSinDiferencias()
+
+    def test_lista_empresas_lee_contadores(self):
+        cache.clear()
+        crear_asignacion(self.aprendiz, self.empresa, estado='CONFIRMADO')
+        # Conteo, página y ciudades
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(reverse('etp_practica:lista_empresas'))
+        empresa = respuesta.context['lista_empresas'][0]
+        self.assertEqual(empresa['total_asignaciones'], 1)
+        self.assertEqual(empresa['asignaciones_activas'], 1)
+
+
+class PaginadorCursorTests(TestCase):
+    """Paginación por (fecha_asignacion, id) sin OFFSET"""
+
+    @classmethod
+    def setUpTestData(cls):
+        empresa = crear_empresa()
+        for numero in range(25):
+            crear_asignacion(crear_aprendiz(str(2000 + numero)), empresa)
+        # Varias asignaciones con la misma fecha para probar el desempate por id
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for indice, asignacion in enumerate(AsignacionAprendiz.objects.order_by('id')):
+            AsignacionAprendiz.objects.filter(pk=asignacion.pk).update(
+                fecha_asignacion=base + timedelta(days=indice // 4)
+            )
+        cls.esperado = list(
+            AsignacionAprendiz.objects.order_by('-fecha_asignacion', '-id').values_list('id', flat=True)
+        )
+
+    def test_recorrido_hacia_adelante_y_atras(self):
+        paginador = PaginadorCursor(AsignacionAprendiz.objects.all(), 10)
+        paginas = []
+        token = None
+        while True:
+            with self.assertNumQueries(1):
+                pagina = paginador.get_page(token)
+            paginas.append(pagina)
+            if not pagina.has_next():
+                break
+            token = pagina.next_cursor
+
+        ids = [asignacion.id for pagina in paginas for asignacion in pagina]
+        self.assertEqual(ids, self.esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [10, 10, 5])
+        self.assertFalse(paginas[0].has_previous())
+
+        anterior = paginador.get_page(paginas[-1].previous_cursor)
+        self.assertEqual([a.id for a in anterior], self.esperado[10:20])
+        self.assertTrue(anterior.has_previous())
+        primera = paginador.get_page(anterior.previous_cursor)
+        self.assertEqual([a.id for a in primera], self.esperado[:10])
+        self.assertFalse(primera.has_previous())
+
+    def test_token_invalido_devuelve_primera_pagina(self):
+        pagina = PaginadorCursor(AsignacionAprendiz.objects.all(), 10).get_page('no-es-un-cursor')
+        self.assertEqual([a.id for a in pagina], self.esperado[:10])
+
+
+class BusquedaAsignacionesTests(TestCase):
+    """Índice FTS5 sincronizado por triggers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = crear_empresa(nombre='Tecnología Andina')
+        cls.jose = crear_asignacion(
+            crear_aprendiz('1032456789', nombre='José', apellido='Peña'), cls.empresa
+        )
+        cls.maria = crear_asignacion(
+            crear_aprendiz('52987654', nombre='María', apellido='Gómez'),
+            crear_empresa(nombre='Café del Sur', nit='800'),
+            tutor_propuesto='Ángela Ruiz'
+        )
+
+    def buscar(self, texto):
+        return set(buscar_asignaciones(AsignacionAprendiz.objects.all(), texto))
+
+    def test_indice_disponible_en_sqlite(self):
+        self.assertTrue(indice_disponible())
+
+    def test_prefijos_y_tildes(self):
+        self.assertEqual(self.buscar('jose'), {self.jose})
+        self.assertEqual(self.buscar('PEN'), {self.jose})
+        self.assertEqual(self.buscar('tecno'), {self.jose})
+        self.assertEqual(self.buscar('angela'), {self.maria})
+        self.assertEqual(self.buscar('cafe sur'), {self.maria})
+        self.assertEqual(self.buscar('1032'), {self.jose})
+        self.assertEqual(self.buscar('jose cafe'), set())
+
+    def test_triggers_mantienen_el_indice(self):
+        Empresa.objects.filter(pk=self.empresa.pk).update(nombre='Industrias Llanos')
+        self.assertEqual(self.buscar('llanos'), {self.jose})
+        self.assertEqual(self.buscar('tecnologia'), set())
+
+        aprendiz = self.maria.aprendiz
+        aprendiz.apellido = 'Núñez'
+        aprendiz.save()
+        self.assertEqual(self.buscar('nunez'), {self.maria})
+
+        self.jose.delete()
+        self.assertEqual(self.buscar('jose'), set())
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLA_BUSQUEDA}')
+        self.assertEqual(self.buscar('jose'), set())
+
+        salida = StringIO()
+        call_command('rebuild_search_index', stdout=salida)
+        self.assertIn('2 asignación(es)', salida.getvalue())
+        self.assertEqual(self.buscar('jose'), {self.jose})
+
+    def test_post_migrate_reinstala_y_reconstruye(self):
+        self.assertEqual(triggers_faltantes(), [])
+        retirar_triggers()
+        Empresa.objects.filter(pk=self.empresa.pk).update(nombre='Industrias Llanos')
+        self.assertEqual(self.buscar('llanos'), set())
+
+        verificar_triggers_busqueda(sender=None)
+        self.assertEqual(triggers_faltantes(), [])
+        self.assertEqual(self.buscar('llanos'), {self.jose})
+
+
+class AsignacionActivaTests(TestCase):
+    """Disponibilidad de aprendices mediante el marcador AsignacionActiva"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.ocupado = crear_aprendiz('3001')
+        self.libre = crear_aprendiz('3002')
+        self.asignacion = crear_asignacion(self.ocupado, self.empresa)
+
+    def disponibles(self):
+        return set(AsignacionActiva.objects.aprendices_disponibles())
+
+    def test_marcador_sigue_el_estado(self):
+        self.assertEqual(self.disponibles(), {self.libre})
+        self.asignacion.confirmar_asignacion()
+        self.assertEqual(self.disponibles(), {self.libre})
+
+        self.asignacion.estado = 'CANCELADO'
+        self.asignacion.save()
+        self.assertEqual(self.disponibles(), {self.ocupado, self.libre})
+
+        crear_asignacion(self.ocupado, self.empresa)
+        self.assertEqual(self.disponibles(), {self.libre})
+
+    def test_cambio_de_aprendiz_mueve_el_marcador(self):
+        self.asignacion.aprendiz = self.libre
+        self.asignacion.save()
+        self.assertEqual(self.disponibles(), {self.ocupado})
+        self.asignacion.delete()
+        self.assertEqual(self.disponibles(), {self.ocupado, self.libre})
+
+    def test_restricciones_en_base_de_datos(self):
+        with self.assertRaises(IntegrityError):
+            crear_asignacion(self.ocupado, self.empresa)
+        with self.assertRaises(IntegrityError):
+            crear_asignacion(
+                self.libre, self.empresa,
+                fecha_inicio_propuesta=date.today(),
+                fecha_fin_propuesta=date.today()
+            )
+        # Las asignaciones inactivas no cuentan para la unicidad
+        crear_asignacion(self.ocupado, self.empresa, estado='RECHAZADO')
+
+    def test_formulario_traduce_integrity_error(self):
+        inicio = date.today() + timedelta(days=30)
+        form = AsignacionAprendizForm({
+            'aprendiz': self.libre.id,
+            'empresa': self.empresa.id,
+            'fecha_inicio_propuesta': inicio,
+            'fecha_fin_propuesta': inicio + timedelta(days=180),
+            'modalidad': 'PRESENCIAL',
+            'tutor_propuesto': 'Tutor',
+        })
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertTrue(form.is_valid())
+        # La validación ya no consulta asignaciones existentes
+        self.assertFalse([
+            consulta for consulta in consultas.captured_queries
+            if 'FROM "etp_practica_asignacion' in consulta['sql']
+        ])
+
+        # Otro coordinador asigna al mismo aprendiz antes de guardar
+        crear_asignacion(self.libre, self.empresa)
+        try:
+            form.save()
+        except IntegrityError as error:
+            self.assertTrue(form.agregar_error_integridad(error))
+        self.assertIn('aprendiz', form.errors)
+
+    def test_formulario_no_traduce_otras_restricciones(self):
+        form = AsignacionAprendizForm()
+        # Otra restricción sobre una columna que también se llama aprendiz_id
+        error = IntegrityError(
+            'FOREIGN KEY constraint failed: etp_practica_seguimiento.aprendiz_id'
+        )
+        self.assertFalse(form.agregar_error_integridad(error))
+        error = IntegrityError('NOT NULL constraint failed: etp_practica_asignacionaprendiz.empresa_id')
+        self.assertFalse(form.agregar_error_integridad(error))
+
+    def test_formulario_lista_disponibles(self):
+        self.assertEqual(set(AsignacionAprendizForm().fields['aprendiz'].queryset), {self.libre})
+        edicion = AsignacionAprendizForm(instance=self.asignacion)
+        self.assertEqual(set(edicion.fields['aprendiz'].queryset), {self.ocupado, self.libre})
+
+    def test_api_aprendices_disponibles(self):
+        with self.assertNumQueries(1):
+            datos = self.client.get(reverse('etp_practica:api_aprendices_disponibles')).json()
+        self.assertEqual(datos['total'], 1)
+        self.assertEqual(datos['aprendices'][0]['documento_identidad'], '3002')
+
+
+class AsignacionMasivaTests(TestCase):
+    """Asignación de un grupo de aprendices en una sola transacción"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        inicio = date.today() + timedelta(days=30)
+        self.datos = {
+            'fecha_inicio_propuesta': inicio,
+            'fecha_fin_propuesta': inicio + timedelta(days=180),
+            'modalidad': 'HIBRIDO',
+            'tutor_propuesto': 'Tutor del grupo',
+            'area_trabajo': '',
+            'objetivos_propuestos': '',
+        }
+
+    def test_resultados_por_aprendiz(self):
+        libres = [crear_aprendiz(str(4000 + numero)) for numero in range(3)]
+        ocupado = crear_aprendiz('4999')
+        crear_asignacion(ocupado, crear_empresa(nombre='Otra', nit='800'))
+
+        ids = [libres[0].id, ocupado.id, libres[1].id, 999999, libres[2].id, libres[0].id]
+        resultados = asignar_aprendices_masivo(self.empresa, ids, self.datos)
+
+        self.assertEqual(
+            [fila['resultado'] for fila in resultados],
+            ['ASIGNADO', 'OCUPADO', 'ASIGNADO', 'NO_EXISTE', 'ASIGNADO']
+        )
+        self.assertEqual(
+            AsignacionAprendiz.objects.filter(empresa=self.empresa, modalidad='HIBRIDO').count(), 3
+        )
+        self.assertFalse(AsignacionActiva.objects.aprendices_disponibles().exists())
+        estadisticas = EmpresaEstadisticas.objects.get(empresa=self.empresa)
+        self.assertEqual(estadisticas.asignaciones_asignados, 3)
+        self.assertEqual(estadisticas.asignaciones_total, 3)
+
+    def test_cohorte_grande_con_consultas_acotadas(self):
+        Aprendiz.objects.bulk_create([
+            Aprendiz(
+                documento_identidad=str(500000 + numero),
+                nombre=f'Aprendiz {numero}',
+                apellido='Cohorte',
+                fecha_nacimiento=date(2000, 1, 1)
+            )
+            for numero in range(500)
+        ])
+        ids = list(Aprendiz.objects.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as consultas:
+            resultados = asignar_aprendices_masivo(self.empresa, ids, self.datos)
+        self.assertEqual(len(resultados), 500)
+        self.assertEqual(AsignacionAprendiz.objects.count(), 500)
+        # Una consulta de disponibilidad y las inserciones por lotes, nunca una por aprendiz
+        self.assertLess(len(consultas.captured_queries), 40)
+
+    def test_vista_asignacion_masiva(self):
+        aprendices = [crear_aprendiz(str(4100 + numero)) for numero in range(2)]
+        datos = dict(self.datos, aprendices=[str(aprendiz.id) for aprendiz in aprendices])
+        respuesta = self.client.post(
+            reverse('etp_practica:asignar_aprendices_masivo', args=[self.empresa.id]), datos
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['resultados']), 2)
+        self.assertEqual(AsignacionAprendiz.objects.filter(empresa=self.empresa).count(), 2)
+
+
+class TransicionesMasivasTests(TestCase):
+    """Transiciones de estado en bloque del queryset de asignaciones"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.asignaciones = {
+            estado: crear_asignacion(crear_aprendiz(str(6000 + numero)), self.empresa, estado=estado)
+            for numero, estado in enumerate(['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'CANCELADO'])
+        }
+
+    def test_confirmar_solo_asignadas_en_una_actualizacion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            cambiadas = AsignacionAprendiz.objects.confirmar()
+        self.assertEqual(cambiadas, 1)
+        actualizaciones = [
+            consulta for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('UPDATE "etp_practica_asignacionaprendiz"')
+        ]
+        self.assertEqual(len(actualizaciones), 1)
+
+        asignacion = AsignacionAprendiz.objects.get(id=self.asignaciones['ASIGNADO'].id)
+        self.assertEqual(asignacion.estado, 'CONFIRMADO')
+        self.assertIsNotNone(asignacion.fecha_confirmacion)
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+    def test_rechazar_libera_aprendices_y_guarda_motivo(self):
+        cambiadas = AsignacionAprendiz.objects.all().rechazar('Sin cupo')
+        self.assertEqual(cambiadas, 2)
+        for estado in ['PENDIENTE', 'ASIGNADO']:
+            asignacion = AsignacionAprendiz.objects.get(id=self.asignaciones[estado].id)
+            self.assertEqual(asignacion.estado, 'RECHAZADO')
+            self.assertEqual(asignacion.eventos.get().texto, 'Sin cupo')
+            self.assertFalse(AsignacionActiva.objects.filter(asignacion=asignacion).exists())
+        self.assertEqual(AsignacionActiva.objects.count(), 1)
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+    def test_iniciar_crea_etapas_en_bloque(self):
+        etapas = AsignacionAprendiz.objects.iniciar()
+        self.assertEqual(len(etapas), 1)
+        confirmada = self.asignaciones['CONFIRMADO']
+        etapa = EtapaPractica.objects.get()
+        self.assertEqual(etapa.asignacion_origen_id, confirmada.id)
+        self.assertEqual(etapa.aprendiz_id, confirmada.aprendiz_id)
+        self.assertEqual(etapa.estado, 'PRODUCTIVA')
+        self.assertEqual(AsignacionAprendiz.objects.get(id=confirmada.id).estado, 'INICIADO')
+        # INICIADO sigue ocupando al aprendiz
+        self.assertTrue(AsignacionActiva.objects.filter(asignacion=confirmada).exists())
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+        # Repetir no crea etapas duplicadas
+        self.assertEqual(AsignacionAprendiz.objects.iniciar(), [])
+
+
+class TransicionesConcurrentesTests(TransactionTestCase):
+    """Compare-and-swap de las transiciones con varios hilos a la vez"""
+
+    HILOS = 8
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.asignacion = crear_asignacion(crear_aprendiz('7000'), self.empresa)
+
+    def _competir(self, accion):
+        """
+        Cada hilo lee su propia copia de la asignación y espera a los
+        demás antes de intentar la transición. Devuelve los resultados.
+        """
+        return competir(
+            accion,
+            self.HILOS,
+            preparar=lambda numero: AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        )
+
+    def test_un_solo_ganador_por_transicion(self):
+        resultados = self._competir(lambda copia: copia.confirmar_asignacion())
+        self.assertEqual(len(resultados), self.HILOS)
+        self.assertEqual(resultados.count(True), 1)
+
+        resultados = self._competir(lambda copia: copia.iniciar_etapa_practica())
+        self.assertEqual(len([etapa for etapa in resultados if etapa is not None]), 1)
+        self.assertEqual(EtapaPractica.objects.filter(asignacion_origen=self.asignacion).count(), 1)
+
+        asignacion = AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        self.assertEqual(asignacion.estado, 'INICIADO')
+        self.assertEqual(asignacion.version, self.asignacion.version + 2)
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+    def test_transicion_con_lectura_obsoleta(self):
+        obsoleta = AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        self.asignacion.tutor_propuesto = 'Otro tutor'
+        self.asignacion.save()
+
+        self.assertFalse(obsoleta.cancelar_asignacion('Duplicada'))
+        self.assertEqual(obsoleta.estado, 'ASIGNADO')
+        self.assertEqual(AsignacionAprendiz.objects.get(pk=self.asignacion.pk).estado, 'ASIGNADO')
+
+        self.assertTrue(self.asignacion.cancelar_asignacion('Duplicada'))
+        self.assertFalse(AsignacionActiva.objects.exists())
+
+    def test_edicion_obsoleta_no_revierte_la_confirmacion(self):
+        obsoleta = AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        self.assertTrue(self.asignacion.confirmar_asignacion())
+
+        obsoleta.tutor_propuesto = 'Otro tutor'
+        with self.assertRaises(AsignacionModificada):
+            obsoleta.save()
+        self.assertEqual(obsoleta.version, self.asignacion.version - 1)
+        asignacion = AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        self.assertEqual(asignacion.estado, 'CONFIRMADO')
+        self.assertEqual(asignacion.tutor_propuesto, self.asignacion.tutor_propuesto)
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+
+class BitacoraEntradaTests(TestCase):
+    """Bitácora como entradas independientes paginadas por fecha"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.etapa = crear_etapa(crear_aprendiz('8000'), self.empresa)
+        self.url = reverse('etp_practica:detalle_bitacora', args=[self.etapa.id])
+
+    def test_registrar_entrada(self):
+        respuesta = self.client.post(self.url, {'autor': 'Tutor', 'texto': 'Semana 1: inducción'})
+        self.assertRedirects(respuesta, self.url)
+        entrada = BitacoraEntrada.objects.get()
+        self.assertEqual(entrada.etapa, self.etapa)
+        self.assertEqual(entrada.texto, 'Semana 1: inducción')
+
+    def test_paginacion_por_cursor(self):
+        inicio = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        BitacoraEntrada.objects.bulk_create([
+            BitacoraEntrada(etapa=self.etapa, fecha=inicio + timedelta(days=dia), texto=f'Día {dia}')
+            for dia in range(25)
+        ])
+        respuesta = self.client.get(self.url)
+        pagina = respuesta.context['entradas']
+        self.assertEqual([entrada.texto for entrada in pagina][:2], ['Día 24', 'Día 23'])
+        self.assertEqual(len(pagina), 20)
+
+        respuesta = self.client.get(self.url, {'cursor': pagina.next_cursor})
+        self.assertEqual([entrada.texto for entrada in respuesta.context['entradas']][-1], 'Día 0')
+        self.assertEqual(len(respuesta.context['entradas']), 5)
+
+    def test_listado_de_etapas_no_lee_bitacora(self):
+        BitacoraEntrada.objects.create(etapa=self.etapa, texto='Texto largo')
+        with CaptureQueriesContext(connection) as consultas:
+            list(EtapaPractica.objects.filter(empresa=self.empresa))
+        self.assertFalse(any('bitacora' in consulta['sql'] for consulta in consultas.captured_queries))
+
+
+class AsignacionEventoTests(TestCase):
+    """Historial de transiciones y comentarios como filas independientes"""
+
+    def setUp(self):
+        self.asignacion = crear_asignacion(crear_aprendiz('9000'), crear_empresa(), observaciones='Nota')
+
+    def test_transicion_registra_evento_sin_reescribir_observaciones(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertTrue(self.asignacion.confirmar_asignacion('Todo en orden', 'coordinador'))
+        self.assertFalse(any(
+            'observaciones' in consulta['sql'] and consulta['sql'].startswith('UPDATE')
+            for consulta in consultas.captured_queries
+        ))
+
+        evento = self.asignacion.eventos.get()
+        self.assertEqual((evento.tipo, evento.texto, evento.usuario), ('CONFIRMAR', 'Todo en orden', 'coordinador'))
+        self.assertEqual(AsignacionAprendiz.objects.get(pk=self.asignacion.pk).observaciones, 'Nota')
+
+    def test_transicion_perdida_no_registra_evento(self):
+        obsoleta = AsignacionAprendiz.objects.get(pk=self.asignacion.pk)
+        self.asignacion.cancelar_asignacion('Primera')
+        self.assertFalse(obsoleta.cancelar_asignacion('Segunda'))
+        self.assertEqual(list(self.asignacion.eventos.values_list('texto', flat=True)), ['Primera'])
+
+    def test_ultimos_eventos_y_api_paginada(self):
+        inicio = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        AsignacionEvento.objects.bulk_create([
+            AsignacionEvento(
+                asignacion=self.asignacion,
+                tipo='COMENTARIO',
+                texto=f'Comentario {numero}',
+                fecha=inicio + timedelta(hours=numero)
+            )
+            for numero in range(15)
+        ])
+        ultimos = list(self.asignacion.ultimos_eventos(3))
+        self.assertEqual([evento.texto for evento in ultimos], ['Comentario 14', 'Comentario 13', 'Comentario 12'])
+
+        url = reverse('etp_practica:api_eventos_asignacion', args=[self.asignacion.id])
+        primera = self.client.get(url).json()
+        self.assertEqual(len(primera['eventos']), 10)
+        segunda = self.client.get(url, {'cursor': primera['siguiente']}).json()
+        self.assertEqual([evento['texto'] for evento in segunda['eventos']][-1], 'Comentario 0')
+        self.assertIsNone(segunda['siguiente'])
+
+    def test_comentar(self):
+        self.asignacion.comentar('Visita de seguimiento', 'tutor')
+        self.assertEqual(self.asignacion.eventos.get().tipo, 'COMENTARIO')
+
+
+class ExportacionAsignacionesTests(TestCase):
+    """Exportación CSV en streaming con los filtros de gestionar_asignaciones"""
+
+    def setUp(self):
+        self.empresa = crear_empresa(nombre='Ñandú S.A.S.')
+        for numero in range(3):
+            crear_asignacion(crear_aprendiz(str(9100 + numero)), self.empresa)
+        crear_asignacion(crear_aprendiz('9199'), self.empresa, estado='RECHAZADO')
+
+    def _leer(self, respuesta):
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(contenido.splitlines()))
+
+    def test_exporta_con_filtros_en_una_consulta(self):
+        url = reverse('etp_practica:exportar_asignaciones_empresa', args=[self.empresa.id])
+        respuesta = self.client.get(url, {'estado': 'ASIGNADO'})
+        self.assertTrue(respuesta.streaming)
+        self.assertIn('attachment;', respuesta['Content-Disposition'])
+
+        with CaptureQueriesContext(connection) as consultas:
+            filas = self._leer(respuesta)
+        self.assertEqual(len(consultas.captured_queries), 1)
+        self.assertEqual(filas[0][:3], ['ID', 'Documento', 'Nombre'])
+        self.assertEqual(len(filas), 4)
+        self.assertEqual({fila[4] for fila in filas[1:]}, {'Ñandú S.A.S.'})
+        self.assertEqual({fila[6] for fila in filas[1:]}, {'Asignado a empresa'})
+
+    def test_exporta_todas_sin_filtros(self):
+        filas = self._leer(self.client.get(reverse('etp_practica:exportar_asignaciones')))
+        self.assertEqual(len(filas), 5)
+
+
+class ImportarEmpresasTests(TestCase):
+    """Importación de empresas desde CSV con upsert por NIT"""
+
+    ENCABEZADO = 'Nombre,NIT,Dirección,Ciudad,Teléfono,Email\n'
+
+    def _csv(self, filas):
+        return self.ENCABEZADO + ''.join(f'{fila}\n' for fila in filas)
+
+    def test_crea_actualiza_y_reporta_errores(self):
+        existente = crear_empresa(nit='900', nombre='Nombre viejo')
+        contenido = self._csv([
+            'Nueva Uno,901,Calle 1,Cali,300,uno@empresa.com',
+            'Nombre nuevo,900,Calle 2,Bogotá,301,viejo@empresa.com',
+            'Sin correo,902,Calle 3,Cali,302,no-es-correo',
+            'Repetida,901,Calle 4,Cali,303,rep@empresa.com',
+            'Nueva Dos,903,Calle 5,Medellín,304,dos@empresa.com',
+        ])
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = importar_empresas(StringIO(contenido), tamano_lote=2)
+
+        self.assertEqual(resultado['filas'], 5)
+        self.assertEqual((resultado['creadas'], resultado['actualizadas']), (2, 1))
+        self.assertEqual([error['fila'] for error in resultado['errores']], [4, 5])
+        self.assertIn('email', resultado['errores'][0]['mensaje'])
+        self.assertIn('fila 2', resultado['errores'][1]['mensaje'])
+        # Dos lotes de cuatro consultas, sin importar cuántas filas traen
+        sentencias = [
+            consulta for consulta in consultas.captured_queries
+            if not consulta['sql'].startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+        self.assertEqual(len(sentencias), 8)
+
+        existente.refresh_from_db()
+        self.assertEqual(existente.nombre, 'Nombre nuevo')
+        nueva = Empresa.objects.get(nit='903')
+        self.assertEqual(nueva.ciudad, 'Medellín')
+        self.assertTrue(EmpresaEstadisticas.objects.filter(empresa=nueva).exists())
+        self.assertEqual(conciliar_estadisticas(aplicar=False), [])
+
+    def test_comando_y_columnas_faltantes(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as archivo:
+            archivo.write(self._csv(['Empresa CSV,950,Calle 1,Cali,300,csv@empresa.com']))
+        self.addCleanup(os.remove, archivo.name)
+        salida = StringIO()
+        call_command('importar_empresas', archivo.name, stdout=salida)
+        self.assertIn('1 creada(s)', salida.getvalue())
+        self.assertTrue(Empresa.objects.filter(nit='950').exists())
+
+        respuesta = self.client.post(reverse('etp_practica:importar_empresas'), {
+            'archivo': SimpleUploadedFile('empresas.csv', b'nombre,nit\nX,1\n', content_type='text/csv')
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Faltan columnas', str(respuesta.context['form'].errors))
+
+    def test_vista_importa_archivo(self):
+        contenido = self._csv(['Empresa Web,960,Calle 1,Cali,300,web@empresa.com'])
+        respuesta = self.client.post(reverse('etp_practica:importar_empresas'), {
+            'archivo': SimpleUploadedFile('empresas.csv', contenido.encode('utf-8-sig'), content_type='text/csv')
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['resultado']['creadas'], 1)
+        self.assertTrue(Empresa.objects.filter(nit='960').exists())
+
+
+class RecomendacionesTests(TestCase):
+    """Ranking de empresas y aprendices calculado en bloque"""
+
+    def setUp(self):
+        self.cali = crear_empresa(nombre='Cali presencial', nit='801', ciudad='Cali')
+        self.remota = crear_empresa(nombre='Bogotá remota', nit='802', ciudad='Bogotá')
+        self.bogota = crear_empresa(nombre='Bogotá presencial', nit='803', ciudad='Bogotá')
+        for numero in range(3):
+            crear_asignacion(
+                crear_aprendiz(str(9300 + numero)), self.remota,
+                modalidad='REMOTO', estado='CONFIRMADO'
+            )
+        crear_asignacion(crear_aprendiz('9310'), self.bogota, estado='RECHAZADO')
+        self.aprendiz = crear_aprendiz('9400', ciudad='  cali ')
+
+    def test_empresas_para_aprendiz(self):
+        with CaptureQueriesContext(connection) as consultas:
+            recomendaciones = recomendar_empresas(self.aprendiz)
+        self.assertEqual(len(consultas.captured_queries), 2)
+        self.assertEqual(
+            [recomendacion['empresa_id'] for recomendacion in recomendaciones],
+            [self.cali.id, self.remota.id, self.bogota.id]
+        )
+        self.assertEqual(recomendaciones[0]['componentes']['ciudad'], 1.0)
+
+    def test_aprendices_para_empresa(self):
+        crear_aprendiz('9401', ciudad='Medellín')
+        recomendaciones = recomendar_aprendices(self.cali, limite=2)
+        self.assertEqual(recomendaciones[0]['aprendiz_id'], self.aprendiz.id)
+        self.assertEqual(len(recomendaciones), 2)
+        ocupados = AsignacionActiva.objects.values_list('aprendiz_id', flat=True)
+        self.assertFalse({r['aprendiz_id'] for r in recomendaciones} & set(ocupados))
+
+    def test_todos_y_endpoints(self):
+        ids, empresas = recomendar_todos(limite=2)
+        fila = list(ids).index(self.aprendiz.id)
+        self.assertEqual(list(empresas[fila]), [self.cali.id, self.remota.id])
+
+        respuesta = self.client.get(
+            reverse('etp_practica:api_recomendaciones_aprendiz', args=[self.aprendiz.id]), {'limite': 1}
+        )
+        self.assertEqual([r['empresa_id'] for r in respuesta.json()['empresas']], [self.cali.id])
+        respuesta = self.client.get(reverse('etp_practica:api_recomendaciones_empresa', args=[self.cali.id]))
+        self.assertEqual(respuesta.json()['aprendices'][0]['aprendiz_id'], self.aprendiz.id)
+        respuesta = self.client.get(reverse('etp_practica:recomendaciones_empresa', args=[self.cali.id]))
+        self.assertContains(respuesta, self.aprendiz.documento_identidad)
+
+
+class OcupacionSemanalTests(TestCase):
+    """Ocupación por semana mantenida en cada escritura"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.lunes = date(2030, 3, 4)
+
+    def ocupacion(self, campo='asignaciones'):
+        return dict(
+            OcupacionSemanal.objects.filter(empresa=self.empresa)
+            .exclude(**{campo: 0})
+            .values_list('semana', campo)
+        )
+
+    def test_alta_cambio_de_fechas_y_transiciones(self):
+        asignacion = crear_asignacion(
+            crear_aprendiz('9500'), self.empresa,
+            fecha_inicio_propuesta=self.lunes + timedelta(days=2),
+            fecha_fin_propuesta=self.lunes + timedelta(days=15)
+        )
+        self.assertEqual(self.ocupacion(), {
+            self.lunes: 1,
+            self.lunes + timedelta(weeks=1): 1,
+            self.lunes + timedelta(weeks=2): 1,
+        })
+
+        asignacion.fecha_fin_propuesta = self.lunes + timedelta(days=5)
+        asignacion.save()
+        self.assertEqual(self.ocupacion(), {self.lunes: 1})
+
+        # Confirmar no cambia la ocupación; iniciar la pasa a la etapa
+        AsignacionAprendiz.objects.filter(pk=asignacion.pk).confirmar()
+        self.assertEqual(self.ocupacion(), {self.lunes: 1})
+        etapas = AsignacionAprendiz.objects.filter(pk=asignacion.pk).iniciar()
+        self.assertEqual(self.ocupacion(), {})
+        self.assertEqual(self.ocupacion('etapas'), {self.lunes: 1})
+
+        etapas[0].delete()
+        self.assertEqual(self.ocupacion('etapas'), {})
+        self.assertEqual(conciliar_ocupacion(), [])
+
+    def test_rechazo_borrado_y_asignacion_masiva(self):
+        asignacion = crear_asignacion(
+            crear_aprendiz('9501'), self.empresa,
+            fecha_inicio_propuesta=self.lunes,
+            fecha_fin_propuesta=self.lunes + timedelta(days=1)
+        )
+        asignacion.rechazar_asignacion('Sin cupo')
+        self.assertEqual(self.ocupacion(), {})
+
+        aprendices = [crear_aprendiz(str(9510 + numero)).id for numero in range(3)]
+        asignar_aprendices_masivo(self.empresa, aprendices, {
+            'fecha_inicio_propuesta': self.lunes,
+            'fecha_fin_propuesta': self.lunes + timedelta(days=1),
+            'tutor_propuesto': 'Tutor',
+        })
+        self.assertEqual(self.ocupacion(), {self.lunes: 3})
+
+        AsignacionAprendiz.objects.filter(aprendiz_id=aprendices[0]).delete()
+        self.assertEqual(self.ocupacion(), {self.lunes: 2})
+        self.assertEqual(conciliar_ocupacion(), [])
+
+    def test_etapa_sin_fecha_fin_y_conciliacion(self):
+        crear_etapa(crear_aprendiz('9520'), self.empresa, fecha_inicio=self.lunes)
+        self.assertEqual(len(self.ocupacion('etapas')), 27)
+
+        OcupacionSemanal.objects.filter(empresa=self.empresa, semana=self.lunes).update(etapas=5)
+        OcupacionSemanal.objects.filter(empresa=self.empresa, semana=self.lunes + timedelta(weeks=1)).delete()
+        diferencias = conciliar_ocupacion(aplicar=False)
+        self.assertEqual(len(diferencias), 2)
+        self.assertEqual(diferencias[0], (self.empresa.id, self.lunes, 'etapas', 5, 1))
+        conciliar_ocupacion()
+        self.assertEqual(conciliar_ocupacion(), [])
+
+    def test_linea_de_tiempo_en_una_consulta(self):
+        otra = crear_empresa(nombre='Otra', nit='901')
+        crear_asignacion(
+            crear_aprendiz('9530'), self.empresa,
+            fecha_inicio_propuesta=self.lunes, fecha_fin_propuesta=self.lunes + timedelta(weeks=1)
+        )
+        crear_etapa(crear_aprendiz('9531'), otra, fecha_inicio=self.lunes, fecha_fin=self.lunes)
+
+        with CaptureQueriesContext(connection) as consultas:
+            linea = linea_de_tiempo(self.lunes + timedelta(days=3))
+        self.assertEqual(len(consultas.captured_queries), 1)
+        self.assertEqual(len(linea['semanas']), 52)
+        self.assertEqual(linea['semanas'][0], self.lunes)
+        empresas = {empresa['empresa_id']: empresa for empresa in linea['empresas']}
+        self.assertEqual(empresas[self.empresa.id]['total'][:3], [1, 1, 0])
+        self.assertEqual(empresas[otra.id]['etapas'][:2], [1, 0])
+
+        asignaciones, etapas = ocupantes(otra.id, self.lunes)
+        self.assertEqual((len(asignaciones), len(etapas)), (0, 1))
+
+    def test_vistas(self):
+        crear_asignacion(
+            crear_aprendiz('9540'), self.empresa,
+            fecha_inicio_propuesta=self.lunes, fecha_fin_propuesta=self.lunes + timedelta(days=1)
+        )
+        parametros = {'desde': '2030-03-04', 'semanas': 4}
+
+        respuesta = self.client.get(reverse('etp_practica:api_ocupacion_empresa', args=[self.empresa.id]), parametros)
+        self.assertEqual(respuesta.json()['total'], [1, 0, 0, 0])
+        respuesta = self.client.get(reverse('etp_practica:api_ocupacion_empresas'), parametros)
+        self.assertEqual(respuesta.json()['empresas'][0]['empresa_id'], self.empresa.id)
+        respuesta = self.client.get(reverse('etp_practica:ocupacion_empresas'), parametros)
+        self.assertContains(respuesta, self.empresa.nombre)
+        respuesta = self.client.get(
+            reverse('etp_practica:ocupacion_empresa', args=[self.empresa.id]),
+            dict(parametros, semana='2030-03-05')
+        )
+        self.assertContains(respuesta, 'Aprendiz 9540')
+
+
+class ExpiracionAsignacionesTests(TestCase):
+    """Cancelación por lotes de asignaciones sin confirmar"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.vencidas = [
+            crear_asignacion(crear_aprendiz(str(9600 + numero)), self.empresa, estado=estado)
+            for numero, estado in enumerate(['ASIGNADO', 'ASIGNADO', 'PENDIENTE', 'CONFIRMADO'])
+        ]
+        AsignacionAprendiz.objects.update(fecha_asignacion=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        self.reciente = crear_asignacion(crear_aprendiz('9610'), self.empresa)
+
+    def test_expira_por_lotes_y_es_idempotente(self):
+        resultado = expirar_asignaciones(dias=30, tamano_lote=2)
+        self.assertEqual((resultado['expiradas'], resultado['lotes']), (3, 2))
+
+        estados = dict(AsignacionAprendiz.objects.values_list('id', 'estado'))
+        self.assertEqual(
+            [estados[asignacion.id] for asignacion in self.vencidas],
+            ['CANCELADO', 'CANCELADO', 'CANCELADO', 'CONFIRMADO']
+        )
+        self.assertEqual(estados[self.reciente.id], 'ASIGNADO')
+        self.assertEqual(AsignacionEvento.objects.filter(tipo='EXPIRAR').count(), 3)
+        self.assertFalse(AsignacionActiva.objects.filter(asignacion__estado='CANCELADO').exists())
+        self.assertEqual(conciliar_estadisticas(), [])
+        self.assertEqual(conciliar_ocupacion(), [])
+
+        self.assertEqual(expirar_asignaciones(dias=30)['expiradas'], 0)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('expirar_asignaciones', '--dry-run', stdout=salida)
+        self.assertIn('3 asignación(es)', salida.getvalue())
+        self.assertEqual(AsignacionAprendiz.objects.filter(estado='CANCELADO').count(), 0)
+
+        call_command('expirar_asignaciones', '--dias', '30', stdout=StringIO())
+        self.assertEqual(AsignacionAprendiz.objects.filter(estado='CANCELADO').count(), 3)
+
+
+class GetCondicionalEmpresaTests(TestCase):
+    """ETag y Last-Modified de las páginas de una empresa"""
+
+    def setUp(self):
+        self.empresa = crear_empresa()
+        self.asignacion = crear_asignacion(crear_aprendiz('9700'), self.empresa)
+        self.url = reverse('etp_practica:api_estadisticas_empresa', args=[self.empresa.id])
+
+    def get_condicional(self, respuesta):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+
+    def test_304_sin_cambios_con_una_consulta(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Last-Modified', respuesta)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_condicional(respuesta).status_code, 304)
+
+        for nombre in ('detalle_empresa', 'aprendices_asignados'):
+            url = reverse(f'etp_practica:{nombre}', args=[self.empresa.id])
+            pagina = self.client.get(url)
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=pagina['ETag']).status_code, 304)
+
+    def test_cambios_invalidan_la_marca(self):
+        respuesta = self.client.get(self.url)
+        AsignacionAprendiz.objects.filter(pk=self.asignacion.pk).confirmar()
+        respuesta = self.get_condicional(respuesta)
+        self.assertEqual(respuesta.status_code, 200)
+
+        crear_etapa(crear_aprendiz('9701'), self.empresa)
+        respuesta = self.get_condicional(respuesta)
+        self.assertEqual(respuesta.status_code, 200)
+
+        # Un borrado no cambia las fechas máximas pero sí los totales
+        EtapaPractica.objects.filter(empresa=self.empresa).delete()
+        respuesta = self.get_condicional(respuesta)
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.empresa.telefono = '3111111111'
+        self.empresa.save()
+        self.assertEqual(self.get_condicional(respuesta).status_code, 200)
+
+    def test_editar_aprendiz_invalida_las_paginas(self):
+        url = reverse('etp_practica:aprendices_asignados', args=[self.empresa.id])
+        pagina = self.client.get(url)
+        aprendiz = self.asignacion.aprendiz
+        aprendiz.nombre = 'Renombrado'
+        aprendiz.save()
+
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=pagina['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'Renombrado')
+
+    def test_empresa_inexistente(self):
+        url = reverse('etp_practica:api_estadisticas_empresa', args=[999999])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, 404)
+
+
+class EstadisticasVariasEmpresasTests(TestCase):
+    """API de estadísticas para muchas empresas a la vez"""
+
+    def setUp(self):
+        self.url = reverse('etp_practica:api_estadisticas_empresas')
+        self.empresas = [
+            crear_empresa(nombre=f'Empresa {numero}', nit=f'95{numero}', ciudad='Cali' if numero % 2 else 'Bogotá')
+            for numero in range(6)
+        ]
+        for numero, empresa in enumerate(self.empresas):
+            for indice in range(numero):
+                crear_asignacion(crear_aprendiz(f'98{numero}{indice}'), empresa)
+
+    def test_ids_con_consultas_constantes(self):
+        ids = [empresa.id for empresa in self.empresas[:2]]
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        ids = [empresa.id for empresa in self.empresas] + [999999]
+        with CaptureQueriesContext(connection) as muchas:
+            respuesta = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(len(pocas.captured_queries), len(muchas.captured_queries))
+
+        datos = respuesta.json()
+        self.assertEqual(datos['no_encontradas'], [999999])
+        por_empresa = {fila['empresa_id']: fila for fila in datos['empresas']}
+        unica = self.client.get(
+            reverse('etp_practica:api_estadisticas_empresa', args=[self.empresas[5].id])
+        ).json()
+        self.assertEqual(por_empresa[self.empresas[5].id]['asignaciones'], unica['asignaciones'])
+        self.assertEqual(unica['asignaciones']['total'], 5)
+
+    def test_post_y_ciudad(self):
+        respuesta = self.client.post(
+            self.url + '?ciudad=cali',
+            data={'ids': [empresa.id for empresa in self.empresas]},
+            content_type='application/json'
+        )
+        self.assertEqual(
+            [fila['empresa_id'] for fila in respuesta.json()['empresas']],
+            [empresa.id for empresa in self.empresas if empresa.ciudad == 'Cali']
+        )
+        self.assertEqual(self.client.get(self.url, {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(
+            self.client.post(self.url, data='[1]', content_type='application/json').status_code, 400
+        )
+
+    def test_todas_en_streaming(self):
+        EmpresaEstadisticas.objects.filter(empresa=self.empresas[3]).delete()
+        respuesta = self.client.get(self.url, {'ciudad': 'CALI'})
+        self.assertTrue(respuesta.streaming)
+        datos = json.loads(b''.join(respuesta.streaming_content))
+        totales = {fila['empresa_id']: fila['asignaciones']['total'] for fila in datos['empresas']}
+        self.assertEqual(totales, {self.empresas[n].id: n for n in (1, 3, 5)})
+
+
+@override_settings(CACHE_COMPARTIDA=True)
+class ListaEmpresasTests(TestCase):
+    """Listado paginado, filtrado y en caché"""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('etp_practica:lista_empresas')
+        for numero in range(45):
+            crear_empresa(
+                nombre=f'{"Acme" if numero % 3 == 0 else "Beta"} {numero:02d}',
+                nit=f'97{numero:03d}',
+                ciudad='Cali' if numero % 2 else 'Bogotá'
+            )
+
+    def test_pagina_y_filtros(self):
+        respuesta = self.client.get(self.url)
+        pagina = respuesta.context['lista_empresas']
+        self.assertEqual(len(pagina), 20)
+        self.assertEqual(pagina.paginator.num_pages, 3)
+        self.assertEqual(respuesta.context['ciudades'], ['Bogotá', 'Cali'])
+
+        respuesta = self.client.get(self.url, {'ciudad': 'Cali', 'nombre': 'acme', 'page': 2})
+        pagina = respuesta.context['lista_empresas']
+        nombres = [empresa['nombre'] for empresa in pagina]
+        self.assertEqual(pagina.paginator.count, 7)
+        self.assertEqual(pagina.number, 1)  # la página 2 no existe
+        self.assertEqual(nombres, sorted(nombres))
+        self.assertTrue(all(nombre.startswith('Acme') for nombre in nombres))
+
+        respuesta = self.client.get(self.url, {'nombre': 'BETA 1'})
+        self.assertEqual(respuesta.context['lista_empresas'].paginator.count, 7)
+
+    def test_filtro_de_nombre_usa_el_indice(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(self.url, {'nombre': 'acme'})
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {consultas.captured_queries[0]['sql']}")
+            plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn('SEARCH', plan)
+        self.assertIn('empresa_nombre_minusculas_idx', plan)
+
+    def test_cache_e_invalidacion(self):
+        self.client.get(self.url, {'ciudad': 'Cali'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'ciudad': 'Cali'})
+
+        empresa = Empresa.objects.filter(ciudad='Cali').order_by('nombre').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_asignacion(crear_aprendiz('9950'), empresa)
+        respuesta = self.client.get(self.url, {'ciudad': 'Cali'})
+        self.assertEqual(respuesta.context['lista_empresas'][0]['total_asignaciones'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa.nombre = 'AAA primera'
+            empresa.save()
+        respuesta = self.client.get(self.url, {'ciudad': 'Cali'})
+        self.assertEqual(respuesta.context['lista_empresas'][0]['nombre'], 'AAA primera')
+
+    @override_settings(CACHE_COMPARTIDA=False)
+    def test_sin_cache_compartida_no_guarda_nada(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
 
-# Create your tests here.
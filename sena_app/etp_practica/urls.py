@@ -7,10 +7,26 @@ urlpatterns = [
     path('', views.lista_empresas, name='lista_empresas'),
     path('empresa/<int:empresa_id>/', views.detalle_empresa, name='detalle_empresa'),
     path('empresa/nueva/', views.crear_empresa, name='crear_empresa'),
+    path('empresa/importar/', views.importar_empresas, name='importar_empresas'),
     path('empresa/<int:empresa_id>/editar/', views.editar_empresa, name='editar_empresa'),
     path('empresa/<int:empresa_id>/aprendices/', views.aprendices_asignados, name='aprendices_asignados'),
     path('empresa/<int:empresa_id>/bitacoras/', views.bitacoras, name='bitacoras'),
+    path('etapa/<int:etapa_id>/bitacora/', views.detalle_bitacora, name='detalle_bitacora'),
     path('empresa/<int:empresa_id>/asignar-aprendiz/', views.asignar_aprendiz, name='asignar_aprendiz'),
+    path('empresa/<int:empresa_id>/asignar-aprendices/', views.asignar_aprendices_masivo, name='asignar_aprendices_masivo'),
+    path('empresa/<int:empresa_id>/recomendaciones/', views.recomendaciones_empresa, name='recomendaciones_empresa'),
+    path('ocupacion/', views.ocupacion_empresas, name='ocupacion_empresas'),
+    path('empresa/<int:empresa_id>/ocupacion/', views.ocupacion_empresa, name='ocupacion_empresa'),
     path('asignaciones/', views.gestionar_asignaciones, name='gestionar_asignaciones'),
     path('empresa/<int:empresa_id>/asignaciones/', views.gestionar_asignaciones, name='asignaciones_empresa'),
+    path('asignaciones/exportar/', views.exportar_asignaciones, name='exportar_asignaciones'),
+    path('empresa/<int:empresa_id>/asignaciones/exportar/', views.exportar_asignaciones, name='exportar_asignaciones_empresa'),
+    path('api/aprendices-disponibles/', views.api_aprendices_disponibles, name='api_aprendices_disponibles'),
+    path('api/asignacion/<int:asignacion_id>/eventos/', views.api_eventos_asignacion, name='api_eventos_asignacion'),
+    path('api/empresa/<int:empresa_id>/recomendaciones/', views.api_recomendaciones_empresa, name='api_recomendaciones_empresa'),
+    path('api/aprendiz/<int:aprendiz_id>/recomendaciones/', views.api_recomendaciones_aprendiz, name='api_recomendaciones_aprendiz'),
+    path('api/empresa/<int:empresa_id>/estadisticas/', views.api_estadisticas_empresa, name='api_estadisticas_empresa'),
+    path('api/estadisticas/', views.api_estadisticas_empresas, name='api_estadisticas_empresas'),
+    path('api/ocupacion/', views.api_ocupacion_empresas, name='api_ocupacion_empresas'),
+    path('api/empresa/<int:empresa_id>/ocupacion/', views.api_ocupacion_empresa, name='api_ocupacion_empresa'),
 ]
\ No newline at end of file
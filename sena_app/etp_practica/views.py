@@ -1,19 +1,48 @@
+import io
+import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.db import IntegrityError
-from django.db.models import Q, Count
+from django.db.models import Sum
 from django.core.paginator import Paginator
-from django.http import JsonResponse
-from .models import Empresa, EtapaPractica, AsignacionAprendiz
-from aprendices.models import Aprendiz
+from django.http import JsonResponse, StreamingHttpResponse
+from .models import (
+    Empresa,
+    EmpresaEstadisticas,
+    EtapaPractica,
+    AsignacionAprendiz,
+    AsignacionActiva,
+    AsignacionModificada
+)
+from .stats import (
+    CLAVES_ASIGNACION,
+    contar_por_estado,
+    estadisticas_guardadas,
+    recorrer_estadisticas
+)
+from .paginacion import PaginadorCursor
+from .listado_empresas import ciudades_empresas, pagina_empresas
+from .condicional import condicional_empresa
+from .busqueda import buscar_asignaciones
+from .exportacion import generar_csv
 from .forms import (
     EmpresaForm, 
+    ImportarEmpresasForm,
     AsignacionAprendizForm, 
+    AsignacionMasivaForm,
+    BitacoraEntradaForm,
     FiltroAsignacionesForm,
     ConfirmarAsignacionForm
 )
+from . import asignacion_masiva
+from .importacion_empresas import importar_empresas as importar_empresas_csv
+from .recomendaciones import LIMITE_RECOMENDACIONES, recomendar_aprendices, recomendar_empresas
+from .ocupacion import SEMANAS_LINEA_DE_TIEMPO, linea_de_tiempo, ocupantes
 from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from aprendices.models import Aprendiz
 
 @csrf_protect
 def crear_empresa(request):
@@ -43,41 +72,77 @@ def crear_empresa(request):
         
     return render(request, 'etp_practica/crear_empresa.html', {'form': form})
 
+@csrf_protect
+def importar_empresas(request):
+    """Carga de un CSV de empresas: crea las nuevas y actualiza por NIT"""
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarEmpresasForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Se lee el archivo subido como texto sin cargarlo completo en memoria
+            archivo = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+            try:
+                resultado = importar_empresas_csv(archivo)
+            except (ValueError, UnicodeDecodeError) as e:
+                form.add_error('archivo', str(e))
+            else:
+                messages.success(
+                    request,
+                    f"{resultado['creadas']} empresa(s) creada(s) y "
+                    f"{resultado['actualizadas']} actualizada(s) en {resultado['duracion']:.1f}s."
+                )
+                if resultado['errores']:
+                    messages.warning(request, f"{len(resultado['errores'])} fila(s) con errores.")
+    else:
+        form = ImportarEmpresasForm()
+    
+    return render(request, 'etp_practica/importar_empresas.html', {'form': form, 'resultado': resultado})
+
 def lista_empresas(request):
-    empresas = Empresa.objects.annotate(
-        total_asignaciones=Count('asignaciones_aprendices'),
-        asignaciones_activas=Count('asignaciones_aprendices', 
-                                    filter=Q(asignaciones_aprendices__estado__in=['CONFIRMADO', 'INICIADO']))
-    ).order_by('nombre')
+    ciudad = request.GET.get('ciudad', '').strip()
+    nombre = request.GET.get('nombre', '').strip()
+    
+    # Página y ciudades salen de la caché mientras no cambien las empresas
+    # ni sus asignaciones
+    pagina = pagina_empresas(ciudad, nombre, request.GET.get('page'))
     
     return render(request, 'etp_practica/lista_empresas.html', {
-        'lista_empresas': empresas,
-        'total_empresas': empresas.count()
+        'lista_empresas': pagina,
+        'paginas': pagina.paginator.get_elided_page_range(pagina.number, on_each_side=2, on_ends=1),
+        'total_empresas': pagina.paginator.count,
+        'ciudades': ciudades_empresas(),
+        'ciudad': ciudad,
+        'nombre': nombre,
     })
     
+@condicional_empresa
 def detalle_empresa(request, empresa_id):
     empresa = get_object_or_404(Empresa, pk=empresa_id)
     etapas = EtapaPractica.objects.filter(empresa=empresa)
     asignaciones = AsignacionAprendiz.objects.filter(empresa=empresa)
     
+    estadisticas = estadisticas_guardadas(empresa.id)[empresa.id]
+    etapas_por_estado = estadisticas['etapas']
+    asignaciones_por_estado = estadisticas['asignaciones']
+    
     # Estadísticas de etapas prácticas
     stats_etapas = {
-        'total': etapas.count(),
-        'activos': etapas.filter(estado='PRODUCTIVA').count(),
-        'finalizados': etapas.filter(estado='FINALIZADO').count(),
-        'retirados': etapas.filter(estado='RETIRADO').count(),
-        'lectiva': etapas.filter(estado='LECTIVA').count(),
-        'aplazados': etapas.filter(estado='APLAZADO').count(),
+        'total': etapas_por_estado['total'],
+        'activos': etapas_por_estado['productivos'],
+        'finalizados': etapas_por_estado['finalizados'],
+        'retirados': etapas_por_estado['retirados'],
+        'lectiva': etapas_por_estado['lectivos'],
+        'aplazados': etapas_por_estado['aplazados'],
     }
     
     # Estadísticas de asignaciones
     stats_asignaciones = {
-        'total': asignaciones.count(),
-        'pendientes': asignaciones.filter(estado='PENDIENTE').count(),
-        'asignados': asignaciones.filter(estado='ASIGNADO').count(),
-        'confirmados': asignaciones.filter(estado='CONFIRMADO').count(),
-        'rechazados': asignaciones.filter(estado='RECHAZADO').count(),
-        'iniciados': asignaciones.filter(estado='INICIADO').count(),
+        'total': asignaciones_por_estado['total'],
+        'pendientes': asignaciones_por_estado['pendientes'],
+        'asignados': asignaciones_por_estado['asignados'],
+        'confirmados': asignaciones_por_estado['confirmados'],
+        'rechazados': asignaciones_por_estado['rechazados'],
+        'iniciados': asignaciones_por_estado['iniciados'],
     }
     
     return render(request, 'etp_practica/detalle_empresas.html', {
@@ -88,28 +153,33 @@ def detalle_empresa(request, empresa_id):
         'asignaciones_recientes': asignaciones.order_by('-fecha_asignacion')[:5]
     })
 
+@condicional_empresa
 def aprendices_asignados(request, empresa_id):
     empresa = get_object_or_404(Empresa, pk=empresa_id)
     
     # Obtener asignaciones y etapas prácticas
-    asignaciones = AsignacionAprendiz.objects.filter(empresa=empresa).select_related('aprendiz')
+    asignaciones = AsignacionAprendiz.objects.filter(empresa=empresa).select_related('aprendiz', 'empresa')
     etapas_practica = EtapaPractica.objects.filter(empresa=empresa).select_related('aprendiz')
     
+    estadisticas = estadisticas_guardadas(empresa.id)[empresa.id]
+    asignaciones_por_estado = estadisticas['asignaciones']
+    etapas_por_estado = estadisticas['etapas']
+    
     # Estadísticas de asignaciones
     stats_asignaciones = {
-        'total': asignaciones.count(),
-        'pendientes': asignaciones.filter(estado='PENDIENTE').count(),
-        'confirmados': asignaciones.filter(estado='CONFIRMADO').count(),
-        'rechazados': asignaciones.filter(estado='RECHAZADO').count(),
-        'iniciados': asignaciones.filter(estado='INICIADO').count(),
+        'total': asignaciones_por_estado['total'],
+        'pendientes': asignaciones_por_estado['pendientes'],
+        'confirmados': asignaciones_por_estado['confirmados'],
+        'rechazados': asignaciones_por_estado['rechazados'],
+        'iniciados': asignaciones_por_estado['iniciados'],
     }
     
     # Estadísticas de etapas prácticas
     stats_etapas = {
-        'productivos': etapas_practica.filter(estado='PRODUCTIVA').count(),
-        'finalizados': etapas_practica.filter(estado='FINALIZADO').count(),
-        'lectivos': etapas_practica.filter(estado='LECTIVA').count(),
-        'retirados': etapas_practica.filter(estado='RETIRADO').count(),
+        'productivos': etapas_por_estado['productivos'],
+        'finalizados': etapas_por_estado['finalizados'],
+        'lectivos': etapas_por_estado['lectivos'],
+        'retirados': etapas_por_estado['retirados'],
     }
     
     context = {
@@ -142,6 +212,10 @@ def asignar_aprendiz(request, empresa_id):
                 )
                 return redirect('etp_practica:aprendices_asignados', empresa_id=empresa.id)
                 
+            except IntegrityError as e:
+                if not form.agregar_error_integridad(e):
+                    raise
+                messages.error(request, 'Por favor, corrija los errores en el formulario.')
             except Exception as e:
                 messages.error(request, f'Error al crear la asignación: {str(e)}')
         else:
@@ -149,14 +223,8 @@ def asignar_aprendiz(request, empresa_id):
     else:
         form = AsignacionAprendizForm(empresa_id=empresa_id)
     
-    # Contar aprendices disponibles
-    aprendices_ocupados = AsignacionAprendiz.objects.filter(
-        estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
-    ).values_list('aprendiz_id', flat=True)
-    
-    aprendices_disponibles = Aprendiz.objects.exclude(
-        id__in=aprendices_ocupados
-    ).count()
+    # Contar aprendices disponibles (búsqueda indexada en AsignacionActiva)
+    aprendices_disponibles = AsignacionActiva.objects.aprendices_disponibles().count()
     
     context = {
         'empresa': empresa,
@@ -165,10 +233,99 @@ def asignar_aprendiz(request, empresa_id):
     }
     return render(request, 'etp_practica/asignar_aprendiz.html', context)
 
-def gestionar_asignaciones(request, empresa_id=None):
-    """Vista para gestionar todas las asignaciones (con filtros opcionales por empresa)"""
-    # Base queryset
-    asignaciones = AsignacionAprendiz.objects.select_related('aprendiz', 'empresa')
+@csrf_protect
+def asignar_aprendices_masivo(request, empresa_id):
+    """Vista para asignar un grupo de aprendices a una empresa en una sola solicitud"""
+    empresa = get_object_or_404(Empresa, pk=empresa_id)
+    resultados = None
+    
+    if request.method == 'POST':
+        form = AsignacionMasivaForm(request.POST)
+        if form.is_valid():
+            creado_por = request.user.username if request.user.is_authenticated else ''
+            resultados = asignacion_masiva.asignar_aprendices_masivo(
+                empresa,
+                form.cleaned_data['aprendices'],
+                form.datos_compartidos(),
+                creado_por=creado_por
+            )
+            asignados = sum(1 for fila in resultados if fila['resultado'] == asignacion_masiva.ASIGNADO)
+            rechazados = len(resultados) - asignados
+            if asignados:
+                messages.success(request, f'{asignados} aprendiz(ces) asignado(s) exitosamente.')
+            if rechazados:
+                messages.warning(request, f'{rechazados} aprendiz(ces) no pudieron asignarse.')
+        else:
+            messages.error(request, 'Por favor, corrija los errores en el formulario.')
+    else:
+        form = AsignacionMasivaForm()
+    
+    context = {
+        'empresa': empresa,
+        'form': form,
+        'resultados': resultados,
+        'aprendices_disponibles': AsignacionActiva.objects.aprendices_disponibles().order_by('apellido', 'nombre'),
+    }
+    return render(request, 'etp_practica/asignacion_masiva.html', context)
+
+def _usuario(request):
+    """Nombre del usuario autenticado para el historial, o vacío"""
+    return request.user.get_username() if request.user.is_authenticated else ''
+
+def _filtrar_asignaciones(asignaciones, form_filtros, empresa_id=None):
+    """Aplica los filtros de FiltroAsignacionesForm (ya validado) al queryset"""
+    # Filtro por búsqueda de texto (índice FTS5)
+    if form_filtros.cleaned_data.get('buscar'):
+        asignaciones = buscar_asignaciones(asignaciones, form_filtros.cleaned_data['buscar'])
+    
+    # Filtro por estado
+    if form_filtros.cleaned_data.get('estado'):
+        asignaciones = asignaciones.filter(estado=form_filtros.cleaned_data['estado'])
+    
+    # Filtro por modalidad
+    if form_filtros.cleaned_data.get('modalidad'):
+        asignaciones = asignaciones.filter(modalidad=form_filtros.cleaned_data['modalidad'])
+    
+    # Filtro por empresa (solo si no se especificó empresa_id)
+    if not empresa_id and form_filtros.cleaned_data.get('empresa'):
+        asignaciones = asignaciones.filter(empresa=form_filtros.cleaned_data['empresa'])
+    
+    # Filtros por fecha
+    if form_filtros.cleaned_data.get('fecha_desde'):
+        asignaciones = asignaciones.filter(fecha_asignacion__gte=form_filtros.cleaned_data['fecha_desde'])
+    
+    if form_filtros.cleaned_data.get('fecha_hasta'):
+        asignaciones = asignaciones.filter(fecha_asignacion__lte=form_filtros.cleaned_data['fecha_hasta'])
+    
+    return asignaciones
+
+def _estimar_total_asignaciones(empresa, form_filtros):
+    """
+    Total aproximado sin recorrer las asignaciones: se lee de
+    EmpresaEstadisticas cuando solo se filtra por empresa y/o estado.
+    Devuelve None si los filtros activos no permiten estimarlo.
+    """
+    datos = form_filtros.cleaned_data if form_filtros.is_valid() else {}
+    if any(datos.get(campo) for campo in ('buscar', 'modalidad', 'fecha_desde', 'fecha_hasta')):
+        return None
+    
+    campo = 'asignaciones_total'
+    if datos.get('estado'):
+        campo = f"asignaciones_{CLAVES_ASIGNACION[datos['estado']]}"
+    
+    estadisticas = EmpresaEstadisticas.objects.all()
+    empresa = empresa or datos.get('empresa')
+    if empresa:
+        estadisticas = estadisticas.filter(empresa=empresa)
+    return estadisticas.aggregate(total=Sum(campo))['total'] or 0
+
+def _asignaciones_filtradas(request, empresa_id=None):
+    """
+    Asignaciones de la empresa (si se indica) con los filtros de
+    FiltroAsignacionesForm tomados de request.GET.
+    Devuelve (queryset, empresa, form_filtros).
+    """
+    asignaciones = AsignacionAprendiz.objects.all()
     
     # Si se especifica empresa, filtrar por ella
     empresa = None
@@ -179,61 +336,72 @@ def gestionar_asignaciones(request, empresa_id=None):
     # Procesar filtros
     form_filtros = FiltroAsignacionesForm(request.GET)
     if form_filtros.is_valid():
-        # Filtro por búsqueda de texto
-        if form_filtros.cleaned_data.get('buscar'):
-            buscar = form_filtros.cleaned_data['buscar']
-            asignaciones = asignaciones.filter(
-                Q(aprendiz__nombre__icontains=buscar) |
-                Q(aprendiz__documento__icontains=buscar) |
-                Q(empresa__nombre__icontains=buscar) |
-                Q(tutor_propuesto__icontains=buscar)
-            )
-        
-        # Filtro por estado
-        if form_filtros.cleaned_data.get('estado'):
-            asignaciones = asignaciones.filter(estado=form_filtros.cleaned_data['estado'])
-        
-        # Filtro por modalidad
-        if form_filtros.cleaned_data.get('modalidad'):
-            asignaciones = asignaciones.filter(modalidad=form_filtros.cleaned_data['modalidad'])
-        
-        # Filtro por empresa (solo si no se especificó empresa_id)
-        if not empresa_id and form_filtros.cleaned_data.get('empresa'):
-            asignaciones = asignaciones.filter(empresa=form_filtros.cleaned_data['empresa'])
-        
-        # Filtros por fecha
-        if form_filtros.cleaned_data.get('fecha_desde'):
-            asignaciones = asignaciones.filter(fecha_asignacion__gte=form_filtros.cleaned_data['fecha_desde'])
+        asignaciones = _filtrar_asignaciones(asignaciones, form_filtros, empresa_id)
+    
+    return asignaciones, empresa, form_filtros
+
+def gestionar_asignaciones(request, empresa_id=None):
+    """
+    Vista para gestionar todas las asignaciones (con filtros opcionales por empresa).
+    
+    Con ?paginacion=cursor (o un ?cursor=...) se pagina por (fecha_asignacion, id)
+    sin OFFSET; en ese modo el conteo exacto solo se calcula con ?contar=1 y,
+    si no, se estima a partir de EmpresaEstadisticas.
+    """
+    asignaciones, empresa, form_filtros = _asignaciones_filtradas(request, empresa_id)
+    asignaciones = asignaciones.select_related('aprendiz', 'empresa')
+    
+    modo_cursor = request.GET.get('paginacion') == 'cursor' or 'cursor' in request.GET
+    total_estimado = False
+    
+    if modo_cursor:
+        # Paginación por cursor: el costo no depende de la profundidad
+        page_obj = PaginadorCursor(asignaciones, 10).get_page(request.GET.get('cursor'))
+        if request.GET.get('contar') == '1':
+            stats = contar_por_estado(asignaciones, CLAVES_ASIGNACION)
+            total_resultados = stats['total']
+        else:
+            stats = None
+            total_resultados = _estimar_total_asignaciones(empresa, form_filtros)
+            total_estimado = True
+    else:
+        # Paginación
+        paginator = Paginator(asignaciones.order_by('-fecha_asignacion'), 10)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
         
-        if form_filtros.cleaned_data.get('fecha_hasta'):
-            asignaciones = asignaciones.filter(fecha_asignacion__lte=form_filtros.cleaned_data['fecha_hasta'])
-    
-    # Paginación
-    paginator = Paginator(asignaciones.order_by('-fecha_asignacion'), 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Estadísticas
-    stats = {
-        'total': asignaciones.count(),
-        'pendientes': asignaciones.filter(estado='PENDIENTE').count(),
-        'asignados': asignaciones.filter(estado='ASIGNADO').count(),
-        'confirmados': asignaciones.filter(estado='CONFIRMADO').count(),
-        'rechazados': asignaciones.filter(estado='RECHAZADO').count(),
-        'iniciados': asignaciones.filter(estado='INICIADO').count(),
-        'cancelados': asignaciones.filter(estado='CANCELADO').count(),
-    }
+        # Estadísticas (una sola consulta agrupada por estado)
+        stats = contar_por_estado(asignaciones, CLAVES_ASIGNACION)
+        total_resultados = stats['total']
     
     context = {
         'asignaciones': page_obj,
         'form_filtros': form_filtros,
         'stats': stats,
         'empresa': empresa,
-        'total_resultados': asignaciones.count()
+        'total_resultados': total_resultados,
+        'total_estimado': total_estimado,
+        'modo_cursor': modo_cursor,
     }
     
     return render(request, 'etp_practica/gestionar_asignaciones.html', context)
 
+def exportar_asignaciones(request, empresa_id=None):
+    """
+    Exporta a CSV las asignaciones con los mismos filtros de
+    gestionar_asignaciones. Las filas se envían a medida que se leen, así
+    que la memoria no crece con el tamaño de la exportación.
+    """
+    asignaciones, empresa, form_filtros = _asignaciones_filtradas(request, empresa_id)
+    
+    nombre = f"asignaciones_{timezone.localdate():%Y%m%d}.csv"
+    if empresa:
+        nombre = f"asignaciones_{empresa.nit}_{timezone.localdate():%Y%m%d}.csv"
+    
+    respuesta = StreamingHttpResponse(generar_csv(asignaciones), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return respuesta
+
 @csrf_protect
 def confirmar_asignacion(request, asignacion_id):
     """Vista para que la empresa confirme o rechace una asignación"""
@@ -251,16 +419,13 @@ def confirmar_asignacion(request, asignacion_id):
             observaciones = form.cleaned_data.get('observaciones', '')
             
             if accion == 'confirmar':
-                if asignacion.confirmar_asignacion():
-                    if observaciones:
-                        asignacion.observaciones += f"\nConfirmado: {observaciones}"
-                        asignacion.save()
+                if asignacion.confirmar_asignacion(observaciones, _usuario(request)):
                     messages.success(request, 'Asignación confirmada exitosamente.')
                 else:
                     messages.error(request, 'No se pudo confirmar la asignación.')
             
             elif accion == 'rechazar':
-                if asignacion.rechazar_asignacion(observaciones):
+                if asignacion.rechazar_asignacion(observaciones, _usuario(request)):
                     messages.success(request, 'Asignación rechazada.')
                 else:
                     messages.error(request, 'No se pudo rechazar la asignación.')
@@ -275,6 +440,10 @@ def confirmar_asignacion(request, asignacion_id):
     }
     return render(request, 'etp_practica/confirmar_asignacion.html', context)
 
+# Eventos del historial que se muestran en el detalle; el resto se pide
+# página por página a api_eventos_asignacion
+EVENTOS_DETALLE = 10
+
 def detalle_asignacion(request, asignacion_id):
     """Vista para ver el detalle completo de una asignación"""
     asignacion = get_object_or_404(
@@ -290,6 +459,7 @@ def detalle_asignacion(request, asignacion_id):
     context = {
         'asignacion': asignacion,
         'etapa_practica': etapa_practica,
+        'eventos': asignacion.ultimos_eventos(EVENTOS_DETALLE),
         'puede_confirmar': asignacion.estado == 'ASIGNADO',
         'puede_iniciar': asignacion.estado == 'CONFIRMADO',
     }
@@ -306,7 +476,7 @@ def iniciar_etapa_practica(request, asignacion_id):
     
     if request.method == 'POST':
         try:
-            etapa_practica = asignacion.iniciar_etapa_practica()
+            etapa_practica = asignacion.iniciar_etapa_practica(_usuario(request))
             if etapa_practica:
                 messages.success(
                     request, 
@@ -336,6 +506,18 @@ def editar_asignacion(request, asignacion_id):
                 form.save()
                 messages.success(request, 'Asignación actualizada exitosamente.')
                 return redirect('etp_practica:detalle_asignacion', asignacion_id=asignacion.id)
+            except AsignacionModificada:
+                # Otro usuario la cambió (p. ej. la confirmó) mientras se editaba
+                messages.error(
+                    request,
+                    'La asignación fue modificada por otro usuario mientras la editaba. '
+                    'Revise su estado actual antes de volver a editarla.'
+                )
+                return redirect('etp_practica:detalle_asignacion', asignacion_id=asignacion.id)
+            except IntegrityError as e:
+                if not form.agregar_error_integridad(e):
+                    raise
+                messages.error(request, 'Por favor, corrija los errores en el formulario.')
             except Exception as e:
                 messages.error(request, f'Error al actualizar la asignación: {str(e)}')
     else:
@@ -352,16 +534,15 @@ def cancelar_asignacion(request, asignacion_id):
     """Vista para cancelar una asignación"""
     asignacion = get_object_or_404(AsignacionAprendiz, pk=asignacion_id)
     
-    if asignacion.estado in ['INICIADO', 'CANCELADO']:
+    if not asignacion.puede('cancelar'):
         messages.error(request, 'Esta asignación no puede ser cancelada.')
         return redirect('etp_practica:detalle_asignacion', asignacion_id=asignacion.id)
     
     if request.method == 'POST':
         motivo = request.POST.get('motivo', '')
-        asignacion.estado = 'CANCELADO'
-        if motivo:
-            asignacion.observaciones += f"\nCancelado: {motivo}"
-        asignacion.save()
+        if not asignacion.cancelar_asignacion(motivo, _usuario(request)):
+            messages.error(request, 'La asignación cambió mientras se procesaba; no se pudo cancelar.')
+            return redirect('etp_practica:detalle_asignacion', asignacion_id=asignacion.id)
         
         messages.success(request, 'Asignación cancelada exitosamente.')
         return redirect('etp_practica:aprendices_asignados', empresa_id=asignacion.empresa.id)
@@ -375,11 +556,13 @@ def bitacoras(request, empresa_id):
     empresa = get_object_or_404(Empresa, id=empresa_id)
     etapas = EtapaPractica.objects.filter(empresa=empresa).select_related('aprendiz')
     
-    sin_iniciar = etapas.filter(estado='LECTIVA').count()
-    desertaron = etapas.filter(estado='RETIRADO').count()
-    enviadas = etapas.filter(estado='PRODUCTIVA').count()
-    revisadas = etapas.filter(estado='FINALIZADO').count()
-    con_observaciones = etapas.filter(estado='APLAZADO').count()
+    etapas_por_estado = estadisticas_guardadas(empresa.id)[empresa.id]['etapas']
+    
+    sin_iniciar = etapas_por_estado['lectivos']
+    desertaron = etapas_por_estado['retirados']
+    enviadas = etapas_por_estado['productivos']
+    revisadas = etapas_por_estado['finalizados']
+    con_observaciones = etapas_por_estado['aplazados']
     
     context = {
         'empresa': empresa,
@@ -392,13 +575,35 @@ def bitacoras(request, empresa_id):
     }
     return render(request, 'etp_practica/bitacoras.html', context)
 
+@csrf_protect
 def detalle_bitacora(request, etapa_id):
-    etapa = get_object_or_404(EtapaPractica, id=etapa_id)
+    """Entradas de la bitácora de una etapa, paginadas por fecha"""
+    etapa = get_object_or_404(
+        EtapaPractica.objects.select_related('aprendiz', 'empresa'),
+        id=etapa_id
+    )
+    
+    if request.method == 'POST':
+        form = BitacoraEntradaForm(request.POST)
+        if form.is_valid():
+            entrada = form.save(commit=False)
+            entrada.etapa = etapa
+            entrada.save()
+            messages.success(request, 'Entrada registrada en la bitácora.')
+            return redirect('etp_practica:detalle_bitacora', etapa_id=etapa.id)
+    else:
+        form = BitacoraEntradaForm()
+    
+    # Búsqueda por el índice (etapa, fecha): solo se leen las entradas de la página
+    paginador = PaginadorCursor(etapa.entradas_bitacora.all(), 20, campo_fecha='fecha')
+    entradas = paginador.get_page(request.GET.get('cursor'))
     
     context = {
         'etapa': etapa,
         'empresa': etapa.empresa,
         'aprendiz': etapa.aprendiz,
+        'entradas': entradas,
+        'form': form,
     }
     return render(request, 'etp_practica/detalle_bitacora.html', context)
 
@@ -474,40 +679,257 @@ def eliminar_empresa(request, empresa_id):
 
 def api_aprendices_disponibles(request):
     """API endpoint para obtener aprendices disponibles"""
-    aprendices_ocupados = AsignacionAprendiz.objects.filter(
-        estado__in=['PENDIENTE', 'ASIGNADO', 'CONFIRMADO', 'INICIADO']
-    ).values_list('aprendiz_id', flat=True)
-    
-    aprendices = Aprendiz.objects.exclude(
-        id__in=aprendices_ocupados
-    ).values('id', 'nombre', 'documento')
+    aprendices = list(
+        AsignacionActiva.objects.aprendices_disponibles()
+        .order_by('nombre')
+        .values('id', 'nombre', 'apellido', 'documento_identidad')
+    )
     
     return JsonResponse({
-        'aprendices': list(aprendices),
-        'total': aprendices.count()
+        'aprendices': aprendices,
+        'total': len(aprendices)
     })
 
+@condicional_empresa
 def api_estadisticas_empresa(request, empresa_id):
     """API endpoint para obtener estadísticas actualizadas de una empresa"""
     empresa = get_object_or_404(Empresa, pk=empresa_id)
     
-    asignaciones = AsignacionAprendiz.objects.filter(empresa=empresa)
-    etapas = EtapaPractica.objects.filter(empresa=empresa)
+    return JsonResponse(_datos_estadisticas_api(estadisticas_guardadas(empresa.id)[empresa.id]))
+
+# Máximo de empresas por solicitud de ?ids= (sin ids se recorren todas)
+MAXIMO_IDS_ESTADISTICAS = 2000
+
+def _datos_estadisticas_api(estadisticas):
+    """Subconjunto de contadores que exponen las APIs de estadísticas"""
+    asignaciones = estadisticas['asignaciones']
+    etapas = estadisticas['etapas']
     
-    datos = {
+    return {
         'asignaciones': {
-            'total': asignaciones.count(),
-            'pendientes': asignaciones.filter(estado='PENDIENTE').count(),
-            'confirmados': asignaciones.filter(estado='CONFIRMADO').count(),
-            'rechazados': asignaciones.filter(estado='RECHAZADO').count(),
-            'iniciados': asignaciones.filter(estado='INICIADO').count(),
+            'total': asignaciones['total'],
+            'pendientes': asignaciones['pendientes'],
+            'confirmados': asignaciones['confirmados'],
+            'rechazados': asignaciones['rechazados'],
+            'iniciados': asignaciones['iniciados'],
         },
         'etapas': {
-            'total': etapas.count(),
-            'productivos': etapas.filter(estado='PRODUCTIVA').count(),
-            'finalizados': etapas.filter(estado='FINALIZADO').count(),
-            'retirados': etapas.filter(estado='RETIRADO').count(),
+            'total': etapas['total'],
+            'productivos': etapas['productivos'],
+            'finalizados': etapas['finalizados'],
+            'retirados': etapas['retirados'],
         }
     }
+
+def _ids_estadisticas(request):
+    """
+    Ids pedidos en ?ids=1,2,3 o en un cuerpo JSON {"ids": [...]}. None si
+    no se pidieron; lanza ValueError si no son enteros o son demasiados.
+    """
+    if request.method == 'POST':
+        try:
+            ids = json.loads(request.body or b'{}').get('ids')
+        except (json.JSONDecodeError, AttributeError):
+            raise ValueError('El cuerpo debe ser un objeto JSON con la lista "ids".')
+        if ids is not None and not isinstance(ids, list):
+            raise ValueError('"ids" debe ser una lista.')
+    else:
+        texto = request.GET.get('ids', '').strip()
+        ids = [valor for valor in texto.split(',') if valor.strip()] if texto else None
+    
+    if ids is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(valor) for valor in ids))
+    except (TypeError, ValueError):
+        raise ValueError('Los ids deben ser números enteros.')
+    if len(ids) > MAXIMO_IDS_ESTADISTICAS:
+        raise ValueError(f'No se pueden pedir más de {MAXIMO_IDS_ESTADISTICAS} empresas por solicitud.')
+    return ids
+
+def _json_estadisticas(filas):
+    """Genera {"empresas": [...]} por partes para StreamingHttpResponse"""
+    yield '{"empresas": ['
+    separador = ''
+    for empresa_id, estadisticas in filas:
+        datos = dict(empresa_id=empresa_id, **_datos_estadisticas_api(estadisticas))
+        yield separador + json.dumps(datos)
+        separador = ','
+    yield ']}'
+
+# Solo lectura: el POST existe para enviar listas de ids largas en el cuerpo
+@csrf_exempt
+def api_estadisticas_empresas(request):
+    """
+    API endpoint con las estadísticas de varias empresas (mismo formato
+    que api_estadisticas_empresa). Con ?ids= o un cuerpo JSON responde
+    esas empresas con un número fijo de consultas; sin ids transmite las
+    de todas. ?ciudad= filtra en ambos casos.
+    """
+    try:
+        ids = _ids_estadisticas(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    ciudad = request.GET.get('ciudad', '').strip()
+    
+    if ids is None:
+        return StreamingHttpResponse(
+            _json_estadisticas(recorrer_estadisticas(ciudad)),
+            content_type='application/json'
+        )
+    
+    empresas = Empresa.objects.filter(id__in=ids)
+    if ciudad:
+        empresas = empresas.filter(ciudad__iexact=ciudad)
+    encontradas = set(empresas.values_list('id', flat=True))
+    estadisticas = estadisticas_guardadas([empresa_id for empresa_id in ids if empresa_id in encontradas])
+    
+    return JsonResponse({
+        'empresas': [
+            dict(empresa_id=empresa_id, **_datos_estadisticas_api(datos))
+            for empresa_id, datos in estadisticas.items()
+        ],
+        'no_encontradas': [empresa_id for empresa_id in ids if empresa_id not in encontradas],
+    })
+
+def _limite_recomendaciones(request):
+    """?limite= entre 1 y 100"""
+    try:
+        limite = int(request.GET.get('limite', LIMITE_RECOMENDACIONES))
+    except ValueError:
+        limite = LIMITE_RECOMENDACIONES
+    return max(1, min(limite, 100))
+
+def recomendaciones_empresa(request, empresa_id):
+    """Aprendices disponibles sugeridos para una empresa"""
+    empresa = get_object_or_404(Empresa, pk=empresa_id)
+    
+    context = {
+        'empresa': empresa,
+        'recomendaciones': recomendar_aprendices(empresa, _limite_recomendaciones(request)),
+    }
+    return render(request, 'etp_practica/recomendaciones_empresa.html', context)
+
+def api_recomendaciones_empresa(request, empresa_id):
+    """API endpoint con los aprendices disponibles sugeridos para una empresa"""
+    empresa = get_object_or_404(Empresa, pk=empresa_id)
     
-    return JsonResponse(datos)
\ No newline at end of file
+    return JsonResponse({
+        'empresa_id': empresa.id,
+        'aprendices': recomendar_aprendices(empresa, _limite_recomendaciones(request)),
+    })
+
+def api_recomendaciones_aprendiz(request, aprendiz_id):
+    """API endpoint con las empresas sugeridas para un aprendiz"""
+    aprendiz = get_object_or_404(Aprendiz, pk=aprendiz_id)
+    
+    return JsonResponse({
+        'aprendiz_id': aprendiz.id,
+        'empresas': recomendar_empresas(aprendiz, _limite_recomendaciones(request)),
+    })
+
+def api_eventos_asignacion(request, asignacion_id):
+    """API endpoint con el historial de una asignación, paginado por cursor"""
+    asignacion = get_object_or_404(AsignacionAprendiz.objects.only('id'), pk=asignacion_id)
+    
+    paginador = PaginadorCursor(asignacion.eventos.all(), EVENTOS_DETALLE, campo_fecha='fecha')
+    pagina = paginador.get_page(request.GET.get('cursor'))
+    
+    return JsonResponse({
+        'eventos': [
+            {
+                'tipo': evento.tipo,
+                'tipo_display': evento.get_tipo_display(),
+                'texto': evento.texto,
+                'usuario': evento.usuario,
+                'fecha': evento.fecha.isoformat(),
+            }
+            for evento in pagina
+        ],
+        'siguiente': pagina.next_cursor,
+        'anterior': pagina.previous_cursor,
+    })
+
+def _fecha_parametro(request, nombre):
+    """Fecha AAAA-MM-DD de la URL o None si falta o no es válida"""
+    try:
+        return parse_date(request.GET.get(nombre, ''))
+    except ValueError:
+        return None
+
+def _parametros_ocupacion(request):
+    """?desde= (hoy por defecto) y ?semanas= entre 1 y 104"""
+    try:
+        semanas = int(request.GET.get('semanas', SEMANAS_LINEA_DE_TIEMPO))
+    except ValueError:
+        semanas = SEMANAS_LINEA_DE_TIEMPO
+    return _fecha_parametro(request, 'desde') or timezone.localdate(), max(1, min(semanas, 104))
+
+def ocupacion_empresas(request):
+    """Línea de tiempo de ocupación semanal de todas las empresas"""
+    desde, semanas = _parametros_ocupacion(request)
+    
+    context = {
+        'linea': linea_de_tiempo(desde, semanas),
+        'desde': desde,
+        'semanas': semanas,
+    }
+    return render(request, 'etp_practica/ocupacion_empresas.html', context)
+
+def ocupacion_empresa(request, empresa_id):
+    """Ocupación semanal de una empresa y, con ?semana=, quién ocupa esa semana"""
+    empresa = get_object_or_404(Empresa, pk=empresa_id)
+    desde, semanas = _parametros_ocupacion(request)
+    linea = linea_de_tiempo(desde, semanas, empresa_ids=[empresa.id])
+    
+    semana = _fecha_parametro(request, 'semana')
+    asignaciones = etapas = None
+    if semana:
+        asignaciones, etapas = ocupantes(empresa.id, semana)
+    
+    filas = []
+    if linea['empresas']:
+        ocupacion = linea['empresas'][0]
+        filas = [
+            {'semana': lunes, 'asignaciones': asignadas, 'etapas': en_etapa, 'total': total}
+            for lunes, asignadas, en_etapa, total in zip(
+                linea['semanas'], ocupacion['asignaciones'], ocupacion['etapas'], ocupacion['total']
+            )
+        ]
+    
+    context = {
+        'empresa': empresa,
+        'filas': filas,
+        'desde': desde,
+        'semanas': semanas,
+        'semana': semana,
+        'asignaciones': asignaciones,
+        'etapas': etapas,
+    }
+    return render(request, 'etp_practica/ocupacion_empresa.html', context)
+
+def api_ocupacion_empresas(request):
+    """API endpoint con la ocupación semanal de todas las empresas"""
+    desde, semanas = _parametros_ocupacion(request)
+    linea = linea_de_tiempo(desde, semanas)
+    
+    return JsonResponse({
+        'semanas': [semana.isoformat() for semana in linea['semanas']],
+        'empresas': linea['empresas'],
+    })
+
+def api_ocupacion_empresa(request, empresa_id):
+    """API endpoint con la ocupación semanal de una empresa"""
+    empresa = get_object_or_404(Empresa.objects.only('id'), pk=empresa_id)
+    desde, semanas = _parametros_ocupacion(request)
+    linea = linea_de_tiempo(desde, semanas, empresa_ids=[empresa.id])
+    
+    vacia = [0] * semanas
+    ocupacion = linea['empresas'][0] if linea['empresas'] else {}
+    return JsonResponse({
+        'empresa_id': empresa.id,
+        'semanas': [semana.isoformat() for semana in linea['semanas']],
+        'asignaciones': ocupacion.get('asignaciones', vacia),
+        'etapas': ocupacion.get('etapas', vacia),
+        'total': ocupacion.get('total', vacia),
+    })